@@ -63,7 +63,7 @@ resource "google_cloud_run_v2_service" "fastapi_app" {
 
       startup_probe {
         http_get {
-          path = "/health"
+          path = "/api/v1/health/ready"
           port = 8000
         }
         failure_threshold = 3
@@ -73,7 +73,7 @@ resource "google_cloud_run_v2_service" "fastapi_app" {
 
       liveness_probe {
         http_get {
-          path = "/health"
+          path = "/api/v1/health/live"
           port = 8000
         }
         failure_threshold = 3
@@ -27,6 +27,8 @@ class Settings(BaseSettings):
     HOST: str = Field(default="0.0.0.0")
     PORT: int = Field(default=8000)
     WORKERS: int = Field(default=1)
+    # Shared Prometheus value files when running more than one worker
+    METRICS_MULTIPROC_DIR: str = Field(default="/tmp/shipthis-metrics")
 
     # --- Database ---
     MONGODB_URI: str = Field(default="mongodb://localhost:27017")
@@ -40,6 +42,24 @@ class Settings(BaseSettings):
     REDIS_PASSWORD: str | None = Field(default=None)
     REDIS_DB: int = Field(default=0)
     CACHE_TTL: int = Field(default=3600)
+    CACHE_LOCAL_MAXSIZE: int = Field(default=1024)  # per-process LRU entries
+    CACHE_LOCAL_TTL: float = Field(default=5.0)  # bounds cross-worker staleness
+    CACHE_COMPRESS_MIN_BYTES: int = Field(default=1024)
+    CACHE_EARLY_REFRESH_BETA: float = Field(default=1.0)  # >1 refreshes earlier
+    CACHE_TAG_GENERATION_TTL: int = Field(default=86400)  # > longest cache TTL
+    AUTH_PRINCIPAL_CACHE_TTL: int = Field(default=300)
+
+    # --- Search History ---
+    SEARCH_EXPORT_BATCH_SIZE: int = Field(default=500)
+    SEARCH_EXPORT_CHUNK_BYTES: int = Field(default=65536)  # 64KB
+    SEARCH_GEOMETRY_ENCODING: bool = Field(default=False)
+    SEARCH_GEOMETRY_PRECISION: int = Field(default=6)  # ~0.11 m
+    SEARCH_GEOMETRY_COMPRESSION: bool = Field(default=True)  # zstd, if installed
+    SEARCH_GEOMETRY_COMPRESSION_LEVEL: int = Field(default=3)
+    # Searches younger than this are left for the next rollup run (clock skew)
+    SEARCH_ROLLUP_SETTLE_SECONDS: int = Field(default=60)
+    SEARCH_ROLLUP_INTERVAL_SECONDS: int = Field(default=300)
+    SEARCH_ARCHIVE_AFTER_DAYS: int = Field(default=180)
 
     # --- External API Keys ---
     MAPBOX_TOKEN: str = Field(default="your_mapbox_token_here")
@@ -54,17 +74,71 @@ class Settings(BaseSettings):
     LOG_COMPRESSION: str = Field(default="zip")
     LOG_BACKTRACE: bool = Field(default=True)
     LOG_DIAGNOSE: bool = Field(default=False)
+    LOG_QUEUE_SIZE: int = Field(default=10000)  # records; beyond this, drop
+    LOG_BATCH_SIZE: int = Field(default=256)  # records per write
+    LOG_BLOCK_SECONDS: float = Field(default=0.05)  # ERROR+ wait for queue room
+    LOG_MAX_FIELD_CHARS: int = Field(default=2048)
+    LOG_MAX_LINE_BYTES: int = Field(default=16384)
+    # 4xx logs: repeats per route+error logged once per window, new ones rate-limited
+    ERROR_LOG_RATE: float = Field(default=5.0)  # lines per second
+    ERROR_LOG_BURST: int = Field(default=20)
+    ERROR_LOG_DEDUPE_SECONDS: float = Field(default=60.0)
 
     # --- Rate Limiting ---
     RATE_LIMIT_ENABLED: bool = Field(default=True)
     RATE_LIMIT_REQUESTS: int = Field(default=100)
     RATE_LIMIT_PERIOD: int = Field(default=60)
+    # "METHOD /path/prefix" -> (requests, period seconds); replaces the default budget
+    RATE_LIMIT_ROUTES: dict[str, tuple[int, int]] = Field(
+        default_factory=lambda: {
+            "POST /api/v1/routes/calculate": (10, 60),
+            "POST /api/v1/auth/login": (10, 60),
+            "POST /api/v1/auth/register": (5, 60),
+        }
+    )
+    RATE_LIMIT_LEASE_SIZE: int = Field(default=5)  # tokens a worker takes per Redis call
+    RATE_LIMIT_LEASE_SECONDS: float = Field(default=1.0)
+    # Client IP header set by the proxy in front of the app (e.g. "x-forwarded-for");
+    # unset uses the socket peer, so all anonymous callers share the proxy's IP
+    RATE_LIMIT_CLIENT_IP_HEADER: str | None = Field(default=None)
+    RATE_LIMIT_TRUSTED_PROXIES: int = Field(default=1)  # proxies appending to it
+
+    # --- Health Checks ---
+    HEALTH_SAMPLE_INTERVAL_SECONDS: float = Field(default=10.0)
+    HEALTH_CHECK_TIMEOUT_SECONDS: float = Field(default=2.0)  # per check
+
+    # --- Response Compression ---
+    COMPRESSION_MINIMUM_SIZE: int = Field(default=1024)  # bytes
+    # Server preference order; zstd/br are skipped unless the extra is installed
+    COMPRESSION_ENCODINGS: list[str] = Field(default_factory=lambda: ["zstd", "br", "gzip"])
+
+    # --- Request Deadlines ---
+    REQUEST_TIMEOUT_SECONDS: float = Field(default=30)
+    # "METHOD /path/prefix" -> seconds; downstream calls share this budget
+    REQUEST_TIMEOUT_ROUTES: dict[str, float] = Field(
+        default_factory=lambda: {
+            "POST /api/v1/routes/calculate": 25,
+            "GET /api/v1/searches/export": 600,
+        }
+    )
+    MAPBOX_TIMEOUT_SECONDS: float = Field(default=20)  # upper bound per call
 
     # --- JWT Authentication ---
     JWT_SECRET_KEY: str = Field(default="super-secret-change-this-in-production")
     JWT_ALGORITHM: str = Field(default="HS256")
     JWT_ACCESS_TOKEN_EXPIRE_MINUTES: int = Field(default=10080)  # 7 days
     JWT_REFRESH_TOKEN_EXPIRE_MINUTES: int = Field(default=10080)  # 7 days
+    JWT_BACKEND: str = Field(default="jose")  # "jose" or "pyjwt"
+    JWT_CLAIMS_CACHE_SIZE: int = Field(default=4096)  # 0 disables
+
+    # --- Password Hashing ---
+    PASSWORD_SCHEME: str = Field(default="bcrypt")  # "bcrypt" or "argon2"
+    BCRYPT_ROUNDS: int = Field(default=12)
+    ARGON2_TIME_COST: int = Field(default=3)
+    ARGON2_MEMORY_COST: int = Field(default=65536)  # KiB
+    ARGON2_PARALLELISM: int = Field(default=4)
+    PASSWORD_HASH_WORKERS: int = Field(default=4)
+    PASSWORD_HASH_MAX_PENDING: int = Field(default=64)  # beyond this, 503
 
     # --- File Upload ---
     MAX_UPLOAD_SIZE: int = Field(default=10485760)  # 10MB
@@ -16,7 +16,7 @@ async def create_mongo_client(uri: str, db_name: str, document_models: list):
         maxIdleTimeMS=30_000,
         # Timeouts
         serverSelectionTimeoutMS=5_000,
-        socketTimeoutMS=45_000,
+        socketTimeoutMS=45_000,  # inside requests, the deadline (pymongo.timeout) applies instead
         # Read / write behavior (use string for readPreference with Motor)
         readPreference="secondaryPreferred",
         readConcernLevel="majority",
@@ -1,11 +1,47 @@
 # app/db/redis_connect.py
+import asyncio
+
 from fastapi import Request
 from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
 from redis.backoff import ExponentialBackoff
 from redis.retry import Retry
 
+from app.utils.cache import ServiceCache
+from app.utils.deadline import current_deadline, waiting_on
+
+
+class DeadlinePipeline(Pipeline):
+    async def execute(self, raise_on_error: bool = True):
+        if current_deadline() is None:
+            return await super().execute(raise_on_error)
+        with waiting_on("redis") as timeout:
+            async with asyncio.timeout(timeout):
+                return await super().execute(raise_on_error)
+
 
-def create_redis_client(url: str) -> Redis:
+class DeadlineRedis(Redis):
+    """
+    Redis client whose commands stop at the request deadline.
+
+    socket_timeout still bounds each read; inside a request, a command (or
+    pipeline) is also cancelled once the request's deadline passes.
+    """
+
+    async def execute_command(self, *args, **options):
+        if current_deadline() is None:
+            return await super().execute_command(*args, **options)
+        with waiting_on("redis") as timeout:
+            async with asyncio.timeout(timeout):
+                return await super().execute_command(*args, **options)
+
+    def pipeline(self, transaction: bool = True, shard_hint: str | None = None) -> Pipeline:
+        return DeadlinePipeline(
+            self.connection_pool, self.response_callbacks, transaction, shard_hint
+        )
+
+
+def create_redis_client(url: str, *, decode_responses: bool = True) -> DeadlineRedis:
     """
     Create and return a configured async Redis client.
     The client is connection-pooled and intended to live
@@ -26,7 +62,7 @@ def create_redis_client(url: str) -> Redis:
     #     max_connections=50,
     # )
 
-    return Redis.from_url(
+    return DeadlineRedis.from_url(
         url,
         db=0,
         # Connection & command timeouts
@@ -42,10 +78,14 @@ def create_redis_client(url: str) -> Redis:
         retry=retry_strategy,
         retry_on_timeout=True,
         # Encoding
-        decode_responses=True,
+        decode_responses=decode_responses,
         # Health check
         health_check_interval=30,
     )
 
 def get_redis(request: Request) -> Redis:
     return request.app.state.redis
+
+
+def get_cache(request: Request) -> ServiceCache:
+    return request.app.state.cache
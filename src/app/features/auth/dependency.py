@@ -1,19 +1,19 @@
 # app/features/auth/dependency.py
 from fastapi import Depends, HTTPException
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from jose import JWTError, jwt
 
 from app.connections.mongodb import get_db
-from app.connections.redis import get_redis
+from app.connections.redis import get_cache, get_redis
+from app.features.auth.jwt_backend import TokenError
 from app.features.auth.repository import RefreshTokenRepository, UserRepository
-from app.features.auth.security import ALGORITHM, SECRET_KEY
+from app.features.auth.security import decode_token
 from app.features.auth.service import AuthService
 
 security = HTTPBearer()
 
 
-def get_user_repository(db=Depends(get_db)) -> UserRepository:
-    return UserRepository(db)
+def get_user_repository(db=Depends(get_db), cache=Depends(get_cache)) -> UserRepository:
+    return UserRepository(db, cache)
 
 
 def get_refresh_token_repository(redis=Depends(get_redis)) -> RefreshTokenRepository:
@@ -32,18 +32,14 @@ async def get_current_user(
     user_repo: UserRepository = Depends(get_user_repository),
 ):
     try:
-        payload = jwt.decode(
-            creds.credentials,
-            SECRET_KEY,
-            algorithms=[ALGORITHM],
-        )
-    except JWTError:
+        payload = decode_token(creds.credentials)
+    except TokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
     if payload.get("type") != "access":
         raise HTTPException(status_code=401, detail="Invalid token type")
 
-    user = await user_repo.get_by_id(payload["sub"])
+    user = await user_repo.get_principal(user_id=payload["sub"])
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
 
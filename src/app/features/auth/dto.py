@@ -26,3 +26,16 @@ class UserResponse(BaseModel):
 
 class LogoutResponse(BaseModel):
     detail: str
+
+
+class LogoutAllResponse(BaseModel):
+    detail: str
+    revoked: int
+
+
+class SessionResponse(BaseModel):
+    id: str
+    created_at: int
+    expires_at: int
+    user_agent: str | None = None
+    ip: str | None = None
@@ -0,0 +1,127 @@
+"""
+Password hashing off the event loop.
+
+bcrypt/argon2 take 100+ ms of CPU per call by design; run inline they stall
+every request on the worker. PasswordHasher runs them on a small dedicated
+thread pool (both libraries release the GIL) and sheds load with a 503 once
+too many calls are queued, instead of letting a login burst build an
+unbounded backlog.
+
+The scheme is configurable (PASSWORD_SCHEME: "bcrypt" or "argon2", the latter
+needs the `argon2` extra). Hashes made with the other scheme or weaker
+parameters still verify, and verify_and_update() returns a replacement hash
+so callers can upgrade them on login.
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+from prometheus_client import Counter, Gauge, Histogram
+
+from app.utils.metrics import metrics_registry
+
+SCHEMES = ("bcrypt", "argon2")
+
+password_hash_seconds = Histogram(
+    "password_hash_seconds",
+    "Time spent hashing or verifying a password on the hash pool",
+    ["op"],
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 1.0, 2.0),
+    registry=metrics_registry,
+)
+password_hash_wait_seconds = Histogram(
+    "password_hash_wait_seconds",
+    "Time a password hash call waited for a free hash pool thread",
+    ["op"],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0),
+    registry=metrics_registry,
+)
+password_hash_pending = Gauge(
+    "password_hash_pending",
+    "Password hash calls running or queued",
+    multiprocess_mode="livesum",
+    registry=metrics_registry,
+)
+password_hash_rejected_total = Counter(
+    "password_hash_rejected_total",
+    "Password hash calls rejected because the queue was full",
+    ["op"],
+    registry=metrics_registry,
+)
+
+
+def build_context(
+    scheme: str,
+    *,
+    bcrypt_rounds: int,
+    argon2_time_cost: int,
+    argon2_memory_cost: int,
+    argon2_parallelism: int,
+) -> CryptContext:
+    if scheme not in SCHEMES:
+        raise ValueError(f"Unknown password scheme {scheme!r}, expected one of {SCHEMES}")
+    return CryptContext(
+        schemes=list(SCHEMES),
+        default=scheme,
+        # The non-default scheme is deprecated, so its hashes get upgraded
+        deprecated="auto",
+        bcrypt__rounds=bcrypt_rounds,
+        bcrypt__min_rounds=bcrypt_rounds,
+        argon2__type="ID",
+        argon2__time_cost=argon2_time_cost,
+        argon2__memory_cost=argon2_memory_cost,
+        argon2__parallelism=argon2_parallelism,
+    )
+
+
+class PasswordHasher:
+    def __init__(self, context: CryptContext, *, workers: int, max_pending: int):
+        self.context = context
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="password-hash"
+        )
+        self._pending = 0
+
+    async def _run(self, op: str, fn, *args):
+        if self._pending >= self.max_pending:
+            password_hash_rejected_total.labels(op).inc()
+            raise HTTPException(
+                status_code=503,
+                detail="Too many authentication requests, retry shortly",
+                headers={"Retry-After": "1"},
+            )
+
+        submitted = time.perf_counter()
+
+        def timed():
+            started = time.perf_counter()
+            password_hash_wait_seconds.labels(op).observe(started - submitted)
+            try:
+                return fn(*args)
+            finally:
+                password_hash_seconds.labels(op).observe(time.perf_counter() - started)
+
+        self._pending += 1
+        password_hash_pending.set(self._pending)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, timed)
+        finally:
+            self._pending -= 1
+            password_hash_pending.set(self._pending)
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", self.context.hash, password)
+
+    async def verify(self, password: str, hash: str) -> bool:
+        return await self._run("verify", self.context.verify, password, hash)
+
+    async def verify_and_update(self, password: str, hash: str) -> tuple[bool, str | None]:
+        """Verify, and return a new hash if the stored one uses outdated settings."""
+        return await self._run("verify", self.context.verify_and_update, password, hash)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
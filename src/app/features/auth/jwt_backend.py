@@ -0,0 +1,113 @@
+"""
+Pluggable JWT encode/decode with a cache of verified claims.
+
+Backends share one interface and raise TokenError on any verification
+failure, so callers don't depend on a particular library:
+
+- "jose":  python-jose (default, always installed)
+- "pyjwt": PyJWT; install the `jwt` extra
+
+Selected with JWT_BACKEND; compare them on the deployment's interpreter with
+tests/performance/bench_jwt.py. TokenVerifier caches the claims of tokens that
+already passed verification, keyed by a digest of the token, until their
+`exp`, so a client reusing an access token pays for signature checking once.
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Protocol
+
+
+class TokenError(Exception):
+    """Token is malformed, expired or has a bad signature."""
+
+
+class JWTBackend(Protocol):
+    name: str
+
+    def encode(self, payload: dict[str, Any], key: str, algorithm: str) -> str: ...
+
+    def decode(self, token: str, key: str, algorithms: list[str]) -> dict[str, Any]: ...
+
+
+class JoseBackend:
+    name = "jose"
+
+    def __init__(self):
+        from jose import JWTError, jwt
+
+        self._jwt = jwt
+        self._error = JWTError
+
+    def encode(self, payload, key, algorithm):
+        return self._jwt.encode(payload, key, algorithm=algorithm)
+
+    def decode(self, token, key, algorithms):
+        try:
+            return self._jwt.decode(token, key, algorithms=algorithms)
+        except self._error as e:
+            raise TokenError(str(e)) from e
+
+
+class PyJWTBackend:
+    name = "pyjwt"
+
+    def __init__(self):
+        import jwt
+
+        self._jwt = jwt
+        self._error = jwt.PyJWTError
+
+    def encode(self, payload, key, algorithm):
+        return self._jwt.encode(payload, key, algorithm=algorithm)
+
+    def decode(self, token, key, algorithms):
+        try:
+            # Same claim checks as jose: exp/nbf/iat are verified when present
+            return self._jwt.decode(token, key, algorithms=algorithms)
+        except self._error as e:
+            raise TokenError(str(e)) from e
+
+
+BACKENDS: dict[str, type] = {"jose": JoseBackend, "pyjwt": PyJWTBackend}
+
+
+def get_backend(name: str) -> JWTBackend:
+    try:
+        backend = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown JWT backend {name!r}, expected one of {sorted(BACKENDS)}")
+    try:
+        return backend()
+    except ImportError as e:
+        raise RuntimeError(f"JWT backend {name!r} is not installed") from e
+
+
+class TokenVerifier:
+    """Decode tokens through a backend, caching verified claims until exp."""
+
+    def __init__(self, backend: JWTBackend, key: str, algorithms: list[str], maxsize: int = 4096):
+        self.backend = backend
+        self.key = key
+        self.algorithms = algorithms
+        self.maxsize = maxsize
+        self._claims: OrderedDict[bytes, tuple[float, dict[str, Any]]] = OrderedDict()
+
+    def decode(self, token: str) -> dict[str, Any]:
+        digest = hashlib.blake2b(token.encode(), digest_size=16).digest()
+        hit = self._claims.get(digest)
+        if hit is not None:
+            expires_at, claims = hit
+            if expires_at > time.time():
+                self._claims.move_to_end(digest)
+                return dict(claims)
+            del self._claims[digest]
+
+        claims = self.backend.decode(token, self.key, self.algorithms)
+        exp = claims.get("exp")
+        if self.maxsize and isinstance(exp, (int, float)):
+            self._claims[digest] = (exp, claims)
+            if len(self._claims) > self.maxsize:
+                self._claims.popitem(last=False)
+        return dict(claims)
@@ -1,8 +1,8 @@
 from datetime import datetime, timezone
 from typing import Annotated
 
-from beanie import Document, Indexed
-from pydantic import EmailStr
+from beanie import Document, Indexed, PydanticObjectId
+from pydantic import BaseModel, ConfigDict, EmailStr, Field
 
 
 class User(Document):
@@ -14,3 +14,13 @@ class User(Document):
 
     class Settings:
         name = "users"
+
+
+class Principal(BaseModel):
+    """Lean view of an authenticated user (no password hash), safe to cache."""
+
+    model_config = ConfigDict(populate_by_name=True)
+
+    id: PydanticObjectId = Field(alias="_id")
+    email: str
+    full_name: str
@@ -1,12 +1,92 @@
+import time
+from datetime import datetime, timezone
+
+import orjson
+from beanie import PydanticObjectId
+from bson.errors import InvalidId
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from redis.asyncio import Redis
 
-from app.features.auth.model import User
+from app.config.settings import get_settings
+from app.features.auth.model import Principal, User
+from app.utils.cache import ServiceCache, cached, invalidates
+
+# Cache tag for everything derived from a user document
+PRINCIPAL_TAG = "user:{user_id}:principal"
+
+# Refresh tokens are `refresh_token:{jti}` -> user id. Each user also has a
+# session index: `user_sessions:{user_id}` (zset jti -> expiry epoch) and
+# `user_sessions:{user_id}:meta` (hash jti -> JSON metadata), so listing and
+# revoking every session never needs a keyspace SCAN. Expired members are
+# pruned whenever a session is added.
+
+# Shared by the store/rotate scripts: prune expired sessions, index a new one.
+# Expects locals: sessions, session_meta (keys), ttl, now, jti, meta.
+_INDEX_SESSION = """
+local expired = redis.call('ZRANGEBYSCORE', sessions, '-inf', now)
+if #expired > 0 then
+    redis.call('ZREM', sessions, unpack(expired))
+    redis.call('HDEL', session_meta, unpack(expired))
+end
+redis.call('ZADD', sessions, now + ttl, jti)
+redis.call('HSET', session_meta, jti, meta)
+redis.call('EXPIRE', sessions, ttl)
+redis.call('EXPIRE', session_meta, ttl)
+"""
+
+# KEYS: token, zset, hash; ARGV: user id, ttl, now, jti, meta
+STORE_REFRESH_TOKEN_SCRIPT = (
+    """
+local sessions, session_meta = KEYS[2], KEYS[3]
+local ttl, now, jti, meta = tonumber(ARGV[2]), tonumber(ARGV[3]), ARGV[4], ARGV[5]
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ttl)
+"""
+    + _INDEX_SESSION
+)
+
+# Revoke the presented refresh token and store its replacement atomically.
+# KEYS: old token, new token, zset, hash;
+# ARGV: user id, new token TTL, now, old jti, new jti, meta
+ROTATE_REFRESH_TOKEN_SCRIPT = (
+    """
+local sessions, session_meta = KEYS[3], KEYS[4]
+local ttl, now, jti, meta = tonumber(ARGV[2]), tonumber(ARGV[3]), ARGV[5], ARGV[6]
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+redis.call('DEL', KEYS[1])
+redis.call('ZREM', sessions, ARGV[4])
+redis.call('HDEL', session_meta, ARGV[4])
+redis.call('SET', KEYS[2], ARGV[1], 'EX', ttl)
+"""
+    + _INDEX_SESSION
+    + """
+return 1
+"""
+)
+
+# KEYS: zset, hash. Deletes every indexed refresh token and the index itself
+# in one atomic step, so a rotation can't slip a new token past it. Token keys
+# are derived from the index: fine on standalone Redis (Memorystore), would
+# need per-user hash tags under Redis Cluster.
+REVOKE_ALL_SCRIPT = """
+local jtis = redis.call('ZRANGE', KEYS[1], 0, -1)
+for i = 1, #jtis, 500 do
+    local batch = {}
+    for j = i, math.min(i + 499, #jtis) do
+        batch[#batch + 1] = 'refresh_token:' .. jtis[j]
+    end
+    redis.call('DEL', unpack(batch))
+end
+redis.call('DEL', KEYS[1], KEYS[2])
+return #jtis
+"""
 
 
 class UserRepository:
-    def __init__(self, db: AsyncIOMotorDatabase):
+    def __init__(self, db: AsyncIOMotorDatabase, cache: ServiceCache | None = None):
         self.db = db
+        self.cache = cache
 
     async def get_by_email(self, email: str) -> User | None:
         return await User.find_one({"email": email})
@@ -18,16 +98,101 @@ class UserRepository:
         await user.insert()
         return user
 
+    async def get_principal(self, *, user_id: str) -> Principal | None:
+        """Authenticated-user lookup; served from the cache in steady state."""
+        data = await self._principal(user_id=user_id)
+        return Principal.model_validate(data) if data else None
+
+    @cached("auth.principal", ttl=get_settings().AUTH_PRINCIPAL_CACHE_TTL, tags=(PRINCIPAL_TAG,))
+    async def _principal(self, *, user_id: str) -> dict | None:
+        try:
+            oid = PydanticObjectId(user_id)
+        except (InvalidId, TypeError):
+            return None
+        principal = await User.find_one({"_id": oid}, projection_model=Principal)
+        return principal.model_dump(mode="json") if principal else None
+
+    # User writes go through here so cached principals are dropped
+
+    @invalidates(PRINCIPAL_TAG)
+    async def update(self, *, user_id: str, fields: dict) -> None:
+        await User.find_one({"_id": PydanticObjectId(user_id)}).update(
+            {"$set": {**fields, "updated_at": datetime.now(timezone.utc)}}
+        )
+
+    @invalidates(PRINCIPAL_TAG)
+    async def delete(self, *, user_id: str) -> None:
+        await User.find_one({"_id": PydanticObjectId(user_id)}).delete()
+
 
 class RefreshTokenRepository:
     def __init__(self, redis: Redis):
         self.redis = redis
+        self._store = redis.register_script(STORE_REFRESH_TOKEN_SCRIPT)
+        self._rotate = redis.register_script(ROTATE_REFRESH_TOKEN_SCRIPT)
+        self._revoke_all = redis.register_script(REVOKE_ALL_SCRIPT)
+
+    def _session_keys(self, user_id: str) -> list[str]:
+        return [f"user_sessions:{user_id}", f"user_sessions:{user_id}:meta"]
+
+    def _session_meta(self, meta: dict | None) -> bytes:
+        return orjson.dumps({**(meta or {}), "created_at": int(time.time())})
+
+    async def store(self, jti: str, user_id: str, ttl_seconds: int, meta: dict | None = None):
+        await self._store(
+            keys=[f"refresh_token:{jti}", *self._session_keys(user_id)],
+            args=[user_id, ttl_seconds, int(time.time()), jti, self._session_meta(meta)],
+        )
+
+    async def revoke(self, jti: str, user_id: str) -> bool:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(f"refresh_token:{jti}")
+            sessions, meta = self._session_keys(user_id)
+            pipe.zrem(sessions, jti)
+            pipe.hdel(meta, jti)
+            deleted, _, _ = await pipe.execute()
+        return deleted == 1
 
-    async def store(self, jti: str, user_id: str, ttl_seconds: int):
-        await self.redis.setex(f"refresh_token:{jti}", ttl_seconds, user_id)
+    async def rotate(
+        self,
+        old_jti: str,
+        new_jti: str,
+        user_id: str,
+        ttl_seconds: int,
+        meta: dict | None = None,
+    ) -> bool:
+        """Swap old_jti for new_jti in one call; False if old_jti was already used."""
+        rotated = await self._rotate(
+            keys=[
+                f"refresh_token:{old_jti}",
+                f"refresh_token:{new_jti}",
+                *self._session_keys(user_id),
+            ],
+            args=[
+                user_id,
+                ttl_seconds,
+                int(time.time()),
+                old_jti,
+                new_jti,
+                self._session_meta(meta),
+            ],
+        )
+        return rotated == 1
 
-    async def exists(self, jti: str) -> bool:
-        return await self.redis.exists(f"refresh_token:{jti}") == 1
+    async def revoke_all(self, user_id: str) -> int:
+        """Revoke every refresh token of the user; returns how many there were."""
+        return await self._revoke_all(keys=self._session_keys(user_id))
 
-    async def revoke(self, jti: str):
-        await self.redis.delete(f"refresh_token:{jti}")
+    async def list_sessions(self, user_id: str) -> list[dict]:
+        """Live sessions, newest first, with the metadata stored at login."""
+        sessions, meta = self._session_keys(user_id)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.zrevrangebyscore(sessions, "+inf", int(time.time()), withscores=True)
+            pipe.hgetall(meta)
+            live, metadata = await pipe.execute()
+        result = []
+        for jti, expires_at in live:
+            info = orjson.loads(metadata[jti]) if jti in metadata else {}
+            result.append({"id": jti, **info, "expires_at": int(expires_at)})
+        result.sort(key=lambda session: session.get("created_at", 0), reverse=True)
+        return result
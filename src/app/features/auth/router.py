@@ -1,12 +1,14 @@
 # app/features/auth/router.py
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 
 from app.features.auth.dependency import get_auth_service, get_current_user
 from app.features.auth.dto import (
     LoginRequest,
+    LogoutAllResponse,
     LogoutResponse,
     RegisterRequest,
+    SessionResponse,
     TokenResponse,
 )
 from app.features.auth.service import AuthService
@@ -15,6 +17,14 @@ router = APIRouter(prefix="/api/v1/auth", tags=["Auth"])
 security = HTTPBearer()
 
 
+def _session_meta(request: Request) -> dict:
+    """Client details stored with a refresh token, shown in session listings."""
+    return {
+        "user_agent": request.headers.get("user-agent"),
+        "ip": request.client.host if request.client else None,
+    }
+
+
 @router.post("/register")
 async def register(
     data: RegisterRequest,
@@ -34,17 +44,19 @@ async def register(
 @router.post("/login", response_model=TokenResponse)
 async def login(
     data: LoginRequest,
+    request: Request,
     service: AuthService = Depends(get_auth_service),
 ):
-    return await service.login(data.email, data.password)
+    return await service.login(data.email, data.password, _session_meta(request))
 
 
 @router.post("/refresh", response_model=TokenResponse)
 async def refresh(
+    request: Request,
     creds: HTTPAuthorizationCredentials = Depends(security),
     service: AuthService = Depends(get_auth_service),
 ):
-    return await service.refresh(creds.credentials)
+    return await service.refresh(creds.credentials, _session_meta(request))
 
 
 @router.post("/logout", response_model=LogoutResponse)
@@ -56,6 +68,23 @@ async def logout(
     return {"detail": "Logged out successfully"}
 
 
+@router.post("/logout-all", response_model=LogoutAllResponse)
+async def logout_all(
+    user=Depends(get_current_user),
+    service: AuthService = Depends(get_auth_service),
+):
+    revoked = await service.logout_all(str(user.id))
+    return {"detail": "Logged out of all sessions", "revoked": revoked}
+
+
+@router.get("/sessions", response_model=list[SessionResponse])
+async def list_sessions(
+    user=Depends(get_current_user),
+    service: AuthService = Depends(get_auth_service),
+):
+    return await service.list_sessions(str(user.id))
+
+
 @router.get("/me")
 async def me(user=Depends(get_current_user)):
     return {
@@ -2,34 +2,57 @@
 from datetime import datetime, timedelta, timezone
 from uuid import uuid4
 
-from jose import jwt
-from passlib.context import CryptContext
-
 from app.config.settings import get_settings
+from app.features.auth.hashing import PasswordHasher, build_context
+from app.features.auth.jwt_backend import TokenVerifier, get_backend
 
 settings = get_settings()
 
 SECRET_KEY = settings.JWT_SECRET_KEY
 ALGORITHM = settings.JWT_ALGORITHM
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+jwt_backend = get_backend(settings.JWT_BACKEND)
+token_verifier = TokenVerifier(
+    jwt_backend,
+    SECRET_KEY,
+    [ALGORITHM],
+    maxsize=settings.JWT_CLAIMS_CACHE_SIZE,
+)
 
+pwd_context = build_context(
+    settings.PASSWORD_SCHEME,
+    bcrypt_rounds=settings.BCRYPT_ROUNDS,
+    argon2_time_cost=settings.ARGON2_TIME_COST,
+    argon2_memory_cost=settings.ARGON2_MEMORY_COST,
+    argon2_parallelism=settings.ARGON2_PARALLELISM,
+)
+password_hasher = PasswordHasher(
+    pwd_context,
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+)
 
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
 
+async def hash_password(password: str) -> str:
+    return await password_hasher.hash(password)
 
-def verify_password(password: str, hash: str) -> bool:
-    return pwd_context.verify(password, hash)
 
+async def verify_password(password: str, hash: str) -> bool:
+    return await password_hasher.verify(password, hash)
 
-def create_token(
+
+async def verify_and_update_password(password: str, hash: str) -> tuple[bool, str | None]:
+    return await password_hasher.verify_and_update(password, hash)
+
+
+def issue_token(
     *,
     user_id: str,
     email: str,
     token_type: str,
     expires_minutes: int,
-):
+) -> tuple[str, dict]:
+    """Encode a new token and return it with its claims."""
     now = datetime.now(timezone.utc)
     payload = {
         "sub": user_id,
@@ -39,4 +62,25 @@ def create_token(
         "iat": int(now.timestamp()),
         "exp": int((now + timedelta(minutes=expires_minutes)).timestamp()),
     }
-    return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
+    return jwt_backend.encode(payload, SECRET_KEY, ALGORITHM), payload
+
+
+def create_token(
+    *,
+    user_id: str,
+    email: str,
+    token_type: str,
+    expires_minutes: int,
+):
+    token, _ = issue_token(
+        user_id=user_id,
+        email=email,
+        token_type=token_type,
+        expires_minutes=expires_minutes,
+    )
+    return token
+
+
+def decode_token(token: str) -> dict:
+    """Verify a token and return its claims; raises TokenError."""
+    return token_verifier.decode(token)
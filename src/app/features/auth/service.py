@@ -1,18 +1,18 @@
 from datetime import datetime, timezone
 
 from fastapi import HTTPException
-from jose import JWTError, jwt
 
 from app.config.settings import get_settings
 from app.features.auth.dto import RegisterRequest
+from app.features.auth.jwt_backend import TokenError
 from app.features.auth.model import User
 from app.features.auth.repository import RefreshTokenRepository, UserRepository
 from app.features.auth.security import (
-    ALGORITHM,
-    SECRET_KEY,
     create_token,
+    decode_token,
     hash_password,
-    verify_password,
+    issue_token,
+    verify_and_update_password,
 )
 from app.utils.logger import logger
 
@@ -31,7 +31,7 @@ class AuthService:
 
             user = User(
                 email=data.email,
-                password_hash=hash_password(data.password),
+                password_hash=await hash_password(data.password),
                 full_name=data.full_name,
             )
             await self.user_repo.create(user)
@@ -44,32 +44,28 @@ class AuthService:
             logger.error(f"Unexpected error during registration for {data.email}: {str(e)}", exc_info=True)
             raise
 
-    async def login(self, email: str, password: str):
+    async def login(self, email: str, password: str, meta: dict | None = None):
         try:
             user = await self.user_repo.get_by_email(email)
-            if not user or not verify_password(password, user.password_hash):
+            valid, new_hash = False, None
+            if user:
+                valid, new_hash = await verify_and_update_password(password, user.password_hash)
+            if not valid:
                 logger.warning(f"Failed login attempt for email: {email}")
                 raise HTTPException(status_code=401, detail="Invalid credentials")
 
-            access = create_token(
-                user_id=str(user.id),
-                email=user.email,
-                token_type="access",
-                expires_minutes=settings.JWT_ACCESS_TOKEN_EXPIRE_MINUTES,
-            )
+            if new_hash:
+                # Stored hash uses an outdated scheme or cost; upgrade it
+                await self.user_repo.update(
+                    user_id=str(user.id), fields={"password_hash": new_hash}
+                )
+                logger.info(f"Password hash upgraded for user: {email}")
 
-            refresh = create_token(
-                user_id=str(user.id),
-                email=user.email,
-                token_type="refresh",
-                expires_minutes=settings.JWT_REFRESH_TOKEN_EXPIRE_MINUTES,
+            access, refresh, claims = self._issue_pair(str(user.id), user.email)
+            await self.refresh_token_repo.store(
+                claims["jti"], claims["sub"], self._ttl(claims), meta
             )
 
-            payload = jwt.decode(refresh, SECRET_KEY, algorithms=[ALGORITHM])
-            ttl = payload["exp"] - int(datetime.now(tz=timezone.utc).timestamp())
-
-            await self.refresh_token_repo.store(payload["jti"], payload["sub"], ttl)
-
             logger.info(f"User logged in successfully: {email}")
             return {
                 "access_token": access,
@@ -83,11 +79,30 @@ class AuthService:
             logger.error(f"Unexpected error during login for {email}: {str(e)}", exc_info=True)
             raise
 
-    async def refresh(self, refresh_token: str):
+    def _issue_pair(self, user_id: str, email: str) -> tuple[str, str, dict]:
+        """Encode an access/refresh pair; returns the refresh token's claims too."""
+        access = create_token(
+            user_id=user_id,
+            email=email,
+            token_type="access",
+            expires_minutes=settings.JWT_ACCESS_TOKEN_EXPIRE_MINUTES,
+        )
+        refresh, claims = issue_token(
+            user_id=user_id,
+            email=email,
+            token_type="refresh",
+            expires_minutes=settings.JWT_REFRESH_TOKEN_EXPIRE_MINUTES,
+        )
+        return access, refresh, claims
+
+    def _ttl(self, claims: dict) -> int:
+        return claims["exp"] - int(datetime.now(tz=timezone.utc).timestamp())
+
+    async def refresh(self, refresh_token: str, meta: dict | None = None):
         try:
             logger.info("Attempting to refresh token")
-            payload = jwt.decode(refresh_token, SECRET_KEY, algorithms=[ALGORITHM])
-        except JWTError as e:
+            payload = decode_token(refresh_token)
+        except TokenError as e:
             logger.warning(f"Invalid refresh token - JWT decode failed: {str(e)}")
             raise HTTPException(status_code=401, detail="Invalid refresh token")
         except Exception as e:
@@ -99,21 +114,27 @@ class AuthService:
                 logger.warning(f"Invalid token type: {payload.get('type')}")
                 raise HTTPException(status_code=401, detail="Invalid token type")
 
-            if not await self.refresh_token_repo.exists(payload["jti"]):
-                logger.warning(f"Refresh token revoked or not found: {payload['jti']}")
-                raise HTTPException(status_code=401, detail="Refresh token revoked")
-
-            # 🔁 ROTATION: revoke old refresh token
-            await self.refresh_token_repo.revoke(payload["jti"])
-
-            user = await self.user_repo.get_by_id(payload["sub"])
+            user = await self.user_repo.get_principal(user_id=payload["sub"])
             if not user:
                 logger.warning(f"User not found for token refresh: {payload['sub']}")
                 raise HTTPException(status_code=401, detail="User not found")
 
-            # issue new tokens
+            # 🔁 ROTATION: revoke the old refresh token and store the new one atomically
+            access, refresh, claims = self._issue_pair(payload["sub"], user.email)
+            rotated = await self.refresh_token_repo.rotate(
+                payload["jti"], claims["jti"], payload["sub"], self._ttl(claims), meta
+            )
+            if not rotated:
+                logger.warning(f"Refresh token revoked or not found: {payload['jti']}")
+                raise HTTPException(status_code=401, detail="Refresh token revoked")
+
             logger.info(f"Token refreshed successfully for user: {user.email}")
-            return await self.login(user.email, user.password_hash)
+            return {
+                "access_token": access,
+                "refresh_token": refresh,
+                "user": user,
+                "token_type": "bearer",
+            }
         except HTTPException:
             raise
         except Exception as e:
@@ -122,13 +143,21 @@ class AuthService:
 
     async def logout(self, refresh_token: str):
         try:
-            payload = jwt.decode(refresh_token, SECRET_KEY, algorithms=[ALGORITHM])
+            payload = decode_token(refresh_token)
             if payload.get("jti"):
-                await self.refresh_token_repo.revoke(payload["jti"])
+                await self.refresh_token_repo.revoke(payload["jti"], payload["sub"])
                 logger.info(f"User logged out successfully: {payload.get('sub')}")
-        except JWTError as e:
+        except TokenError as e:
             logger.warning(f"Logout with invalid token (idempotent): {str(e)}")
             return  # idempotent logout
         except Exception as e:
             logger.error(f"Unexpected error during logout: {str(e)}", exc_info=True)
             return  # idempotent logout
+
+    async def logout_all(self, user_id: str) -> int:
+        revoked = await self.refresh_token_repo.revoke_all(user_id)
+        logger.info(f"Revoked all sessions for user: {user_id}", revoked=revoked)
+        return revoked
+
+    async def list_sessions(self, user_id: str) -> list[dict]:
+        return await self.refresh_token_repo.list_sessions(user_id)
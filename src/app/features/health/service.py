@@ -1,20 +1,25 @@
 """Health check service functions."""
 
+import asyncio
 import os
 import time
+from collections.abc import Awaitable, Callable
 from typing import Any
 
 import psutil
 from motor.motor_asyncio import AsyncIOMotorClient
 from redis.asyncio import Redis
 
+from app.utils.logger import logger
+
 # Store startup time
 _start_time = time.time()
 
 
 def get_system_health() -> dict[str, Any]:
     """Get system health metrics."""
-    cpu_percent = psutil.cpu_percent(interval=1)
+    # Usage since the previous call; the sampler calls this on an interval
+    cpu_percent = psutil.cpu_percent(interval=None)
     memory = psutil.virtual_memory()
 
     return {
@@ -134,3 +139,128 @@ def check_disk() -> dict[str, Any]:
             "accessible": False,
             "error": str(e),
         }
+
+
+def overall_status(checks: dict[str, dict[str, Any]]) -> str:
+    if any(check.get("status") == "unhealthy" for check in checks.values()):
+        return "unhealthy"
+    if any(check.get("status") == "warning" for check in checks.values()):
+        return "degraded"
+    return "healthy"
+
+
+class HealthSampler:
+    """
+    Refreshes a health snapshot in the background so probes never wait.
+
+    Every `interval` seconds the dependency and system checks run
+    concurrently, each bounded by `check_timeout` (sync psutil checks run on
+    a thread), and the result replaces `snapshot`. Endpoints serve the last
+    snapshot; readiness also requires it to be recent.
+    """
+
+    def __init__(
+        self,
+        mongo_client: AsyncIOMotorClient | None,
+        redis_client: Redis | None,
+        *,
+        interval: float = 10.0,
+        check_timeout: float = 2.0,
+    ):
+        self.mongo_client = mongo_client
+        self.redis_client = redis_client
+        self.interval = interval
+        self.check_timeout = check_timeout
+        self.snapshot: dict[str, Any] | None = None
+        self.sampled_at = 0.0
+        self.stopping = False
+        self._task: asyncio.Task | None = None
+        # Prime cpu_percent so the first sample covers a real interval
+        psutil.cpu_percent(interval=None)
+
+    async def _check(
+        self, name: str, check: Callable[..., Any], *args: Any
+    ) -> tuple[str, dict[str, Any]]:
+        try:
+            if asyncio.iscoroutinefunction(check):
+                result: Awaitable = check(*args)
+            else:
+                result = asyncio.to_thread(check, *args)
+            return name, await asyncio.wait_for(result, self.check_timeout)
+        except TimeoutError:
+            return name, {
+                "status": "unhealthy",
+                "state": "timeout",
+                "error": f"no response within {self.check_timeout}s",
+            }
+        except Exception as e:
+            return name, {"status": "unhealthy", "state": "error", "error": str(e)}
+
+    async def refresh(self) -> dict[str, Any]:
+        not_configured = {"status": "unknown", "state": "not_configured"}
+        checks = [
+            self._check("memory", check_memory),
+            self._check("disk", check_disk),
+            self._check("system", get_system_health),
+            self._check("application", get_application_health),
+        ]
+        if self.mongo_client is not None:
+            checks.append(self._check("database", check_database, self.mongo_client))
+        if self.redis_client is not None:
+            checks.append(self._check("redis", check_redis, self.redis_client))
+        results = dict(await asyncio.gather(*checks))
+
+        dependency_checks = {
+            "database": results.get("database", not_configured),
+            "redis": results.get("redis", not_configured),
+            "memory": results["memory"],
+            "disk": results["disk"],
+        }
+        self.snapshot = {
+            "status": overall_status(dependency_checks),
+            "sampledAt": time.time(),
+            "application": results["application"],
+            "system": results["system"],
+            "checks": dependency_checks,
+        }
+        self.sampled_at = time.monotonic()
+        return self.snapshot
+
+    def age(self) -> float:
+        return time.monotonic() - self.sampled_at
+
+    def is_ready(self) -> tuple[bool, str]:
+        """Ready when a recent snapshot shows MongoDB reachable (Redis is optional)."""
+        if self.stopping:
+            return False, "shutting down"
+        if self.snapshot is None:
+            return False, "no health sample yet"
+        if self.age() > 3 * self.interval:
+            return False, "health sample is stale"
+        database = self.snapshot["checks"]["database"]
+        if database.get("status") == "unhealthy":
+            return False, f"database {database.get('state', 'unhealthy')}"
+        return True, "ready"
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning(f"Health sampling failed: {e}")
+
+    async def start(self) -> None:
+        """Take a first sample, then keep refreshing in the background."""
+        await self.refresh()
+        self._task = asyncio.create_task(self._run(), name="health-sampler")
+
+    async def stop(self) -> None:
+        self.stopping = True
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
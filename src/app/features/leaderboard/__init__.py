@@ -0,0 +1,3 @@
+"""CO2 savings leaderboards feature."""
+
+__all__ = []
@@ -0,0 +1,15 @@
+from fastapi import Depends
+
+from app.connections.redis import get_redis
+from app.features.leaderboard.repository import LeaderboardRepository
+from app.features.leaderboard.service import LeaderboardService
+
+
+def get_leaderboard_repository(redis=Depends(get_redis)) -> LeaderboardRepository:
+    return LeaderboardRepository(redis)
+
+
+def get_leaderboard_service(
+    repo=Depends(get_leaderboard_repository),
+) -> LeaderboardService:
+    return LeaderboardService(repo)
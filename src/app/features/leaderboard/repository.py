@@ -0,0 +1,117 @@
+from datetime import datetime, timedelta, timezone
+
+from redis.asyncio import Redis
+
+from app.utils.text import tokenize
+
+WINDOWS = ("all", "day", "week")
+
+# Windowed keys outlive their window a little so "yesterday" stays readable
+WINDOW_TTL = {
+    "day": timedelta(days=2),
+    "week": timedelta(days=14),
+}
+
+# Take one search's savings off a member, dropping the member once nothing is
+# left. Atomic, so a concurrent ZINCRBY can't land between check and ZREM.
+SUBTRACT_SCRIPT = """
+local score = tonumber(redis.call('ZINCRBY', KEYS[1], ARGV[1], ARGV[2]))
+if score <= 0 then
+    redis.call('ZREM', KEYS[1], ARGV[2])
+end
+return tostring(score)
+"""
+
+
+def window_id(window: str, at: datetime) -> str:
+    if window == "day":
+        return at.strftime("%Y-%m-%d")
+    if window == "week":
+        year, week, _ = at.isocalendar()
+        return f"{year}-W{week:02d}"
+    return "all"
+
+
+def window_end(window: str, at: datetime) -> datetime:
+    day = datetime(at.year, at.month, at.day, tzinfo=timezone.utc)
+    if window == "week":
+        return day + timedelta(days=7 - day.weekday())
+    return day + timedelta(days=1)
+
+
+def corridor(origin: str, destination: str) -> str:
+    """Stable member name for a lane: "São Paulo" -> "sao paulo"."""
+    return f"{' '.join(tokenize(origin))} -> {' '.join(tokenize(destination))}"
+
+
+class LeaderboardRepository:
+    """
+    CO2-saved leaderboards in Redis sorted sets.
+
+    Keys are `leaderboard:{board}:{window id}`: one all-time set per board plus
+    day/week sets that expire on their own. Every write touches all windows
+    in a single pipeline round trip.
+    """
+
+    def __init__(self, redis: Redis):
+        self.redis = redis
+        self._subtract = redis.register_script(SUBTRACT_SCRIPT)
+
+    def key(self, board: str, window: str, at: datetime | None = None) -> str:
+        at = at or datetime.now(timezone.utc)
+        return f"leaderboard:{board}:{window_id(window, at)}"
+
+    def _members(self, doc: dict) -> dict[str, str]:
+        return {
+            "users": str(doc["user_id"]),
+            "corridors": corridor(doc["origin"]["name"], doc["destination"]["name"]),
+        }
+
+    async def record(self, doc: dict, co2_saved_kg: float, *, sign: int = 1) -> None:
+        """Add (sign=1) or remove (sign=-1) one search's CO2 savings."""
+        at = doc["created_at"]
+        if at.tzinfo is None:
+            at = at.replace(tzinfo=timezone.utc)
+        now = datetime.now(timezone.utc)
+        members = self._members(doc)
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for window in WINDOWS:
+                ttl = WINDOW_TTL.get(window)
+                expires_at = window_end(window, at) + ttl if ttl else None
+                if expires_at and expires_at <= now:
+                    continue  # that window's key is already gone
+                for board, member in members.items():
+                    key = self.key(board, window, at)
+                    if sign < 0:
+                        await self._subtract(
+                            keys=[key], args=[-co2_saved_kg, member], client=pipe
+                        )
+                    else:
+                        pipe.zincrby(key, co2_saved_kg, member)
+                    if expires_at:
+                        pipe.expireat(key, expires_at)
+            await pipe.execute()
+
+    async def top(self, *, board: str, window: str, limit: int):
+        entries = await self.redis.zrevrange(
+            self.key(board, window), 0, limit - 1, withscores=True
+        )
+        return [
+            {"rank": rank, "member": member, "co2_saved_kg": score}
+            for rank, (member, score) in enumerate(entries, start=1)
+        ]
+
+    async def rank(self, *, board: str, window: str, member: str):
+        key = self.key(board, window)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.zrevrank(key, member)
+            pipe.zscore(key, member)
+            pipe.zcard(key)
+            rank, score, size = await pipe.execute()
+        return {
+            "member": member,
+            "rank": rank + 1 if rank is not None else None,
+            "co2_saved_kg": score or 0.0,
+            "total_members": size,
+        }
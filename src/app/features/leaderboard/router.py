@@ -0,0 +1,45 @@
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Query
+
+from app.features.auth.dependency import get_current_user
+from app.features.leaderboard.dependency import get_leaderboard_service
+
+router = APIRouter(prefix="/api/v1/leaderboards", tags=["Leaderboards"])
+
+Window = Literal["all", "day", "week"]
+
+
+@router.get("/users/me")
+async def my_rank(
+    window: Window = "all",
+    user=Depends(get_current_user),
+    service=Depends(get_leaderboard_service),
+):
+    return await service.user_rank(user_id=user.id, window=window)
+
+
+@router.get("/corridors/rank")
+async def corridor_rank(
+    origin: str = Query(..., min_length=1),
+    destination: str = Query(..., min_length=1),
+    window: Window = "all",
+    user=Depends(get_current_user),
+    service=Depends(get_leaderboard_service),
+):
+    return await service.corridor_rank(
+        origin=origin,
+        destination=destination,
+        window=window,
+    )
+
+
+@router.get("/{board}")
+async def top(
+    board: Literal["users", "corridors"],
+    window: Window = "all",
+    limit: int = Query(10, ge=1, le=100),
+    user=Depends(get_current_user),
+    service=Depends(get_leaderboard_service),
+):
+    return await service.top(board=board, window=window, limit=limit)
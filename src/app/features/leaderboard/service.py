@@ -0,0 +1,37 @@
+from app.features.leaderboard.repository import LeaderboardRepository, corridor
+from app.utils.logger import logger
+
+
+class LeaderboardService:
+    def __init__(self, repo: LeaderboardRepository):
+        self.repo = repo
+
+    async def record_saved(self, doc: dict, co2_saved_kg: float) -> None:
+        await self._record(doc, co2_saved_kg, sign=1)
+
+    async def record_deleted(self, doc: dict, co2_saved_kg: float) -> None:
+        await self._record(doc, co2_saved_kg, sign=-1)
+
+    async def _record(self, doc: dict, co2_saved_kg: float, *, sign: int) -> None:
+        # Leaderboards are derived data: never fail the search write over them
+        try:
+            await self.repo.record(doc, co2_saved_kg, sign=sign)
+        except Exception as e:
+            logger.warning(f"Leaderboard update failed: {e}")
+
+    async def top(self, *, board, window, limit):
+        return {
+            "board": board,
+            "window": window,
+            "entries": await self.repo.top(board=board, window=window, limit=limit),
+        }
+
+    async def user_rank(self, *, user_id, window):
+        return await self.repo.rank(board="users", window=window, member=str(user_id))
+
+    async def corridor_rank(self, *, origin, destination, window):
+        return await self.repo.rank(
+            board="corridors",
+            window=window,
+            member=corridor(origin, destination),
+        )
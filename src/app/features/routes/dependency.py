@@ -3,14 +3,20 @@ from fastapi import Depends
 
 from app.config.settings import get_settings
 from app.connections.mongodb import get_db
+from app.connections.redis import get_cache
+from app.features.leaderboard.dependency import get_leaderboard_service
 from app.features.routes.mapbox import MapboxClient
 from app.features.routes.repository import RouteRepository
 from app.features.routes.service import RouteService
 # from app.utils.logger import logger
 
 
-def get_route_service(db=Depends(get_db)) -> RouteService:
+def get_route_service(
+    db=Depends(get_db),
+    leaderboard=Depends(get_leaderboard_service),
+    cache=Depends(get_cache),
+) -> RouteService:
     settings = get_settings()
-    mapbox = MapboxClient(settings.MAPBOX_TOKEN)
+    mapbox = MapboxClient(settings.MAPBOX_TOKEN, timeout=settings.MAPBOX_TIMEOUT_SECONDS)
     repo = RouteRepository(db)
-    return RouteService(mapbox, repo)
+    return RouteService(mapbox, repo, leaderboard, cache)
@@ -11,6 +11,9 @@ class PointIn(BaseModel):
     def to_coordinates(self):
         return [self.lng, self.lat]
 
+    def to_geojson(self):
+        return {"type": "Point", "coordinates": self.to_coordinates()}
+
 
 class RouteCalculateRequest(BaseModel):
     origin: PointIn
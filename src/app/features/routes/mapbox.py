@@ -1,10 +1,13 @@
 import httpx
 
+from app.utils.deadline import waiting_on
+
 
 class MapboxClient:
-    def __init__(self, token: str):
+    def __init__(self, token: str, timeout: float = 20):
         self.base_url = "https://api.mapbox.com/directions/v5/mapbox"
         self.token = token
+        self.timeout = timeout
 
     async def get_directions(
         self,
@@ -24,10 +27,12 @@ class MapboxClient:
             "access_token": self.token,
         }
 
-        async with httpx.AsyncClient(timeout=20) as client:
-            resp = await client.get(
-                f"{self.base_url}/{profile}/{coord_str}",
-                params=params,
-            )
-            resp.raise_for_status()
-            return resp.json()
+        # Never wait longer than the request has left
+        with waiting_on("mapbox", self.timeout, (httpx.TimeoutException,)) as timeout:
+            async with httpx.AsyncClient(timeout=timeout) as client:
+                resp = await client.get(
+                    f"{self.base_url}/{profile}/{coord_str}",
+                    params=params,
+                )
+        resp.raise_for_status()
+        return resp.json()
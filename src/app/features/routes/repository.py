@@ -1,9 +1,15 @@
 from datetime import datetime
 
+from app.config.settings import get_settings
+from app.features.search.geometry_codec import encode_routes
+from app.features.search.repository import SearchStatsRepository
+from app.features.search.tokens import place_tokens
+
 
 class RouteRepository:
     def __init__(self, db):
         self.collection = db.searches
+        self.stats = SearchStatsRepository(db)
 
     async def save(
         self,
@@ -13,21 +19,35 @@ class RouteRepository:
         shortest,
         efficient,
     ):
-        await self.collection.insert_one(
-            {
-                "user_id": user_id,
-                "origin": {
-                    "name": payload.origin.name,
-                    "coordinates": payload.origin.to_coordinates(),
-                },
-                "destination": {
-                    "name": payload.destination.name,
-                    "coordinates": payload.destination.to_coordinates(),
-                },
-                "cargo_weight_kg": payload.cargo_weight_kg,
-                "transport_mode": payload.transport_mode,
-                "shortest_route": shortest,
-                "efficient_route": efficient,
-                "created_at": datetime.utcnow(),
-            }
-        )
+        document = {
+            "user_id": user_id,
+            "origin": {
+                "name": payload.origin.name,
+                "coordinates": payload.origin.to_coordinates(),
+            },
+            "destination": {
+                "name": payload.destination.name,
+                "coordinates": payload.destination.to_coordinates(),
+            },
+            "origin_point": payload.origin.to_geojson(),
+            "destination_point": payload.destination.to_geojson(),
+            "place_tokens": place_tokens(payload.origin.name, payload.destination.name),
+            "cargo_weight_kg": payload.cargo_weight_kg,
+            "transport_mode": payload.transport_mode,
+            "shortest_route": shortest,
+            "efficient_route": efficient,
+            "created_at": datetime.utcnow(),
+        }
+
+        settings = get_settings()
+        if settings.SEARCH_GEOMETRY_ENCODING:
+            document = encode_routes(
+                document,
+                precision=settings.SEARCH_GEOMETRY_PRECISION,
+                compress=settings.SEARCH_GEOMETRY_COMPRESSION,
+                level=settings.SEARCH_GEOMETRY_COMPRESSION_LEVEL,
+            )
+
+        await self.collection.insert_one(document)
+        await self.stats.record(document)
+        return document
@@ -1,13 +1,18 @@
 from app.features.routes.emissions import EmissionCalculator
+from app.features.search.service import SEARCHES_TAG
+from app.utils.cache import invalidates
 from app.utils.logger import logger
 
 
 class RouteService:
-    def __init__(self, mapbox, repo):
+    def __init__(self, mapbox, repo, leaderboard, cache=None):
         self.mapbox = mapbox
         self.repo = repo
+        self.leaderboard = leaderboard
+        self.cache = cache
         self.emissions = EmissionCalculator()
 
+    @invalidates(SEARCHES_TAG)
     async def calculate(self, *, user_id, payload):
         origin = payload.origin.to_coordinates()
         dest = payload.destination.to_coordinates()
@@ -42,7 +47,7 @@ class RouteService:
         shortest = min(routes, key=lambda r: r["distance_km"])
         efficient = min(routes, key=lambda r: r["co2_emissions_kg"])
 
-        await self.repo.save(
+        saved = await self.repo.save(
             user_id=user_id,
             payload=payload,
             shortest=shortest,
@@ -50,6 +55,7 @@ class RouteService:
         )
 
         savings = shortest["co2_emissions_kg"] - efficient["co2_emissions_kg"]
+        await self.leaderboard.record_saved(saved, savings)
         percent = (savings / shortest["co2_emissions_kg"]) * 100
 
         efficient["savings"] = {
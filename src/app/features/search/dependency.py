@@ -1,7 +1,8 @@
 from fastapi import Depends
 
 from app.connections.mongodb import get_db
-from app.connections.redis import get_redis
+from app.connections.redis import get_cache, get_redis
+from app.features.leaderboard.dependency import get_leaderboard_service
 from app.features.search.repository import SearchRepository
 from app.features.search.service import SearchService
 
@@ -13,5 +14,7 @@ def get_search_repository(db=Depends(get_db)) -> SearchRepository:
 def get_search_service(
     repo=Depends(get_search_repository),
     redis=Depends(get_redis),
+    leaderboard=Depends(get_leaderboard_service),
+    cache=Depends(get_cache),
 ) -> SearchService:
-    return SearchService(repo, redis)
+    return SearchService(repo, redis, leaderboard, cache)
@@ -0,0 +1,139 @@
+"""
+Compact storage encoding for route geometries.
+
+A GeoJSON LineString stored as-is costs ~27 bytes per [lng, lat] pair in BSON
+(array header, index keys, two typed doubles). The encoded form stores:
+
+    {
+        "type": "LineString",
+        "codec": "delta-i32",
+        "precision": 6,
+        "compression": "zstd" | None,
+        "count": <points>,
+        "data": Binary(...),
+    }
+
+where `data` is the first point quantized to 10^-precision degrees followed by
+per-point deltas, packed as little-endian int32 and optionally zstd-compressed.
+Precision 6 is ~0.11 m at the equator, well below Mapbox geometry accuracy.
+A geometry whose values don't fit int32 at the requested precision (at 7,
+a delta across the antimeridian) is stored as plain GeoJSON instead.
+
+decode_geometry() accepts both shapes, so reads are transparent while a
+collection holds a mix of encoded and plain documents.
+"""
+
+import struct
+from itertools import accumulate
+from typing import Any
+
+from bson.binary import Binary
+
+try:
+    import zstandard
+except ImportError:  # optional dependency (pip install .[compression])
+    zstandard = None
+
+CODEC = "delta-i32"
+BINARY_SUBTYPE = 0x80  # user-defined
+INT32_MIN, INT32_MAX = -(2**31), 2**31 - 1
+
+_ROUTE_KEYS = ("shortest_route", "efficient_route")
+
+
+def is_encoded(geometry: Any) -> bool:
+    return isinstance(geometry, dict) and geometry.get("codec") == CODEC
+
+
+def zstd_available() -> bool:
+    return zstandard is not None
+
+
+def encode_geometry(
+    geometry: dict,
+    *,
+    precision: int = 6,
+    compress: bool = True,
+    level: int = 3,
+) -> dict:
+    """
+    Encode a GeoJSON LineString; other geometry types are returned unchanged.
+    """
+    if not 0 <= precision <= 7:
+        # int32 range: 180 * 10^7 still fits, 10^8 does not
+        raise ValueError(f"Geometry precision must be 0-7, got {precision}")
+    if geometry.get("type") != "LineString" or is_encoded(geometry):
+        return geometry
+
+    coordinates = geometry.get("coordinates") or []
+    if any(len(point) != 2 for point in coordinates):
+        return geometry
+
+    scale = 10**precision
+    flat = [round(value * scale) for point in coordinates for value in point]
+    deltas = flat[:2] + [flat[i] - flat[i - 2] for i in range(2, len(flat))]
+    if deltas and not INT32_MIN <= min(deltas) <= max(deltas) <= INT32_MAX:
+        # e.g. a 360 degree longitude jump at precision 7
+        return geometry
+    data = struct.pack(f"<{len(deltas)}i", *deltas)
+
+    compression = None
+    if compress and zstandard is not None:
+        data = zstandard.ZstdCompressor(level=level).compress(data)
+        compression = "zstd"
+
+    return {
+        "type": "LineString",
+        "codec": CODEC,
+        "precision": precision,
+        "compression": compression,
+        "count": len(coordinates),
+        "data": Binary(data, BINARY_SUBTYPE),
+    }
+
+
+def decode_geometry(geometry: Any) -> Any:
+    """Return plain GeoJSON for an encoded geometry, anything else unchanged."""
+    if not is_encoded(geometry):
+        return geometry
+
+    data = bytes(geometry["data"])
+    if geometry.get("compression") == "zstd":
+        if zstandard is None:
+            raise RuntimeError(
+                "zstandard is required to read zstd-compressed route geometries"
+            )
+        data = zstandard.ZstdDecompressor().decompress(data)
+
+    count = geometry["count"]
+    scale = 10 ** geometry["precision"]
+    deltas = struct.unpack(f"<{count * 2}i", data)
+    lngs = accumulate(deltas[0::2])
+    lats = accumulate(deltas[1::2])
+
+    return {
+        "type": "LineString",
+        "coordinates": [[lng / scale, lat / scale] for lng, lat in zip(lngs, lats)],
+    }
+
+
+def encode_routes(doc: dict, **options) -> dict:
+    """Copy of a search document with both route geometries encoded."""
+    encoded = dict(doc)
+    for key in _ROUTE_KEYS:
+        route = doc.get(key)
+        if route and "geometry" in route:
+            encoded[key] = {
+                **route,
+                "geometry": encode_geometry(route["geometry"], **options),
+            }
+    return encoded
+
+
+def decode_routes(doc: dict) -> dict:
+    """Decode both route geometries of a search document in place."""
+    for key in _ROUTE_KEYS:
+        route = doc.get(key)
+        if route and "geometry" in route:
+            route["geometry"] = decode_geometry(route["geometry"])
+    return doc
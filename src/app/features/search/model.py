@@ -1,11 +1,12 @@
 from datetime import datetime, timezone
 from enum import Enum
-from typing import Annotated
+from typing import Annotated, Literal
 
 from beanie import Document, Indexed, PydanticObjectId
 
 # from bson import ObjectId
 from pydantic import BaseModel, Field
+from pymongo import ASCENDING, DESCENDING, GEOSPHERE, IndexModel
 
 
 class TransportMode(str, Enum):
@@ -19,6 +20,11 @@ class Location(BaseModel):
     coordinates: list[float]  # [longitude, latitude]
 
 
+class GeoPoint(BaseModel):
+    type: Literal["Point"] = "Point"
+    coordinates: list[float]  # [longitude, latitude]
+
+
 class RouteInfo(BaseModel):
     distance_km: float
     duration_hours: float
@@ -35,6 +41,11 @@ class Search(Document):
     user_id: Annotated[PydanticObjectId, Indexed()]
     origin: Location
     destination: Location
+    # GeoJSON copies of origin/destination coordinates for 2dsphere queries
+    origin_point: GeoPoint | None = None
+    destination_point: GeoPoint | None = None
+    # Normalized origin/destination name tokens for `q` prefix search
+    place_tokens: list[str] = Field(default_factory=list)
     cargo_weight_kg: float
     transport_mode: TransportMode
     shortest_route: RouteInfo
@@ -46,3 +57,34 @@ class Search(Document):
 
     class Settings:
         name = "searches"
+        indexes = [
+            IndexModel(
+                [("user_id", ASCENDING), ("origin_point", GEOSPHERE)],
+                name="user_origin_2dsphere",
+            ),
+            IndexModel(
+                [("user_id", ASCENDING), ("destination_point", GEOSPHERE)],
+                name="user_destination_2dsphere",
+            ),
+            IndexModel(
+                [
+                    ("user_id", ASCENDING),
+                    ("place_tokens", ASCENDING),
+                    ("created_at", DESCENDING),
+                ],
+                name="user_place_tokens",
+            ),
+        ]
+
+
+class ArchivedSearch(Search):
+    """
+    Cold tier: searches older than SEARCH_ARCHIVE_AFTER_DAYS, same shape as
+    Search but with route geometries always stored compactly encoded.
+    """
+
+    archived_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+    class Settings:
+        name = "searches_archive"
+        indexes = Search.Settings.indexes
@@ -0,0 +1,163 @@
+"""
+Raw BSON read path for search documents.
+
+Search documents are dominated by route geometries (thousands of [lng, lat]
+pairs). Decoding them into nested dicts/lists and then re-encoding to JSON is
+the bulk of the read cost, so this module renders JSON directly from the
+RawBSONDocument bytes:
+
+- small top-level fields are decoded lazily and dumped with orjson
+- LineString coordinates are validated and sliced out of the BSON buffer with
+  compiled byte patterns and unpacked in C with struct.iter_unpack, without
+  walking the nested BSON arrays in Python
+"""
+
+import re
+import struct
+
+import bson
+import orjson
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
+
+from app.features.search.geometry_codec import decode_geometry
+
+_INT32 = struct.Struct("<i")
+_BSON_ARRAY = 0x04
+# One array element holding a [double, double] pair. The embedded array is
+# always 27 bytes: int32 size, two (type, key, double) elements, terminator.
+# The capture keeps "lng, second element header, lat" -> unpacked as "<d3xd".
+_LINE_POINT_PATTERN = (
+    rb"\x04[0-9]+\x00\x1b\x00\x00\x00\x010\x00(.{8}\x011\x00.{8})\x00"
+)
+_LINE_POINT = re.compile(_LINE_POINT_PATTERN, re.DOTALL)
+_LINE_POINTS = re.compile(rb"(?:" + _LINE_POINT_PATTERN + rb")+", re.DOTALL)
+_POINT = struct.Struct("<d3xd")
+
+_ROUTE_KEYS = ("shortest_route", "efficient_route")
+
+
+def raw_codec_options(codec_options: CodecOptions) -> CodecOptions:
+    """Same codec options (tz_aware etc.), but yielding RawBSONDocument."""
+    return codec_options.with_options(document_class=RawBSONDocument)
+
+
+def _element_end(buf: bytes, pos: int) -> int:
+    """Return the offset of the element key terminator starting at `pos`."""
+    return buf.index(b"\x00", pos + 1)
+
+
+def _line_coordinates_json(buf: bytes, start: int) -> bytes | None:
+    """
+    Render a BSON array of [lng, lat] double pairs starting at `start` as JSON.
+
+    Returns None when the array does not have the expected shape (non-double
+    values, 3D points, ...) so the caller can fall back to a full decode.
+    """
+    body = buf[start + 4 : start + _INT32.unpack_from(buf, start)[0] - 1]
+    if not body:
+        return b"[]"
+    if not _LINE_POINTS.fullmatch(body):
+        return None
+
+    packed = b"".join(_LINE_POINT.findall(body))
+    return orjson.dumps(list(_POINT.iter_unpack(packed)))
+
+
+def _element_size(buf: bytes, element_type: int, value: int) -> int | None:
+    """Size in bytes of a BSON element value, None for types we don't walk."""
+    if element_type in (0x02, 0x03, 0x04):  # string, document, array
+        size = _INT32.unpack_from(buf, value)[0]
+        return size + 4 if element_type == 0x02 else size
+    if element_type in (0x01, 0x09, 0x11, 0x12):  # double, datetime, ts, int64
+        return 8
+    if element_type == 0x10:  # int32
+        return 4
+    if element_type == 0x08:  # bool
+        return 1
+    if element_type == 0x0A:  # null
+        return 0
+    if element_type == 0x05:  # binary
+        return _INT32.unpack_from(buf, value)[0] + 5
+    return None
+
+
+def geometry_json(geometry: RawBSONDocument) -> bytes:
+    """Render a GeoJSON geometry sub-document as JSON bytes."""
+    # Walk the raw bytes instead of indexing the RawBSONDocument: any key
+    # access inflates the whole document, coordinates included.
+    buf = bytes(geometry.raw)
+    geometry_type = None
+    coordinates_at = None
+    pos = 4
+    while buf[pos] != 0:
+        element_type = buf[pos]
+        key_end = _element_end(buf, pos)
+        key = buf[pos + 1 : key_end]
+        value = key_end + 1
+        if key == b"type" and element_type == 0x02:
+            size = _INT32.unpack_from(buf, value)[0]
+            geometry_type = buf[value + 4 : value + 3 + size]
+        elif key == b"coordinates" and element_type == _BSON_ARRAY:
+            coordinates_at = value
+        size = _element_size(buf, element_type, value)
+        if size is None:
+            return _decoded_geometry_json(buf)
+        pos = value + size
+
+    if geometry_type == b"LineString" and coordinates_at is not None:
+        coordinates = _line_coordinates_json(buf, coordinates_at)
+        if coordinates is not None:
+            return b'{"type":"LineString","coordinates":' + coordinates + b"}"
+
+    return _decoded_geometry_json(buf)
+
+
+def _decoded_geometry_json(buf: bytes) -> bytes:
+    """Slow path: full decode (also expands compactly stored geometries)."""
+    return orjson.dumps(decode_geometry(bson.decode(buf)))
+
+
+def _route_json(route: RawBSONDocument) -> bytes:
+    fields = {key: _plain(route[key]) for key in route if key != "geometry"}
+    body = orjson.dumps(fields)
+    geometry = route.get("geometry")
+    if geometry is None:
+        return body
+    separator = b"," if fields else b""
+    return body[:-1] + separator + b'"geometry":' + geometry_json(geometry) + b"}"
+
+
+def search_json(doc: RawBSONDocument) -> bytes:
+    """
+    Render a raw search document as JSON bytes.
+
+    Produces the same shape as SearchService._serialize_search.
+    """
+    head = orjson.dumps(
+        {
+            "id": str(doc["_id"]),
+            "user_id": str(doc["user_id"]),
+            "origin": _plain(doc["origin"]),
+            "destination": _plain(doc["destination"]),
+            "cargo_weight_kg": doc["cargo_weight_kg"],
+            "transport_mode": doc["transport_mode"],
+        }
+    )
+    tail = orjson.dumps(
+        {
+            "metadata": _plain(doc.get("metadata", {})),
+            "created_at": doc["created_at"],
+        }
+    )
+    routes = b"".join(
+        b',"' + key.encode() + b'":' + _route_json(doc[key]) for key in _ROUTE_KEYS
+    )
+    return head[:-1] + routes + b"," + tail[1:]
+
+
+def _plain(value):
+    """Decode a small embedded document fully (orjson can't walk RawBSONDocument)."""
+    if isinstance(value, RawBSONDocument):
+        return bson.decode(value.raw)
+    return value
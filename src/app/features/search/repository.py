@@ -1,11 +1,391 @@
 
+import asyncio
+import heapq
+from datetime import datetime, timedelta, timezone
+from math import asin, cos, radians, sin, sqrt
+from uuid import uuid4
+
 from bson import ObjectId
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReadPreference, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from app.features.search.raw import raw_codec_options
+from app.features.search.tokens import place_query
+
+ARCHIVE_COLLECTION = "searches_archive"
+
+GEO_FIELDS = {"origin": "origin_point", "destination": "destination_point"}
+EARTH_RADIUS_M = 6_371_008.8
+
+# Geo results are lists of shipments: never ship route geometries back
+SUMMARY_PROJECTION = {
+    "origin": 1,
+    "destination": 1,
+    "cargo_weight_kg": 1,
+    "transport_mode": 1,
+    "shortest_route.distance_km": 1,
+    "shortest_route.co2_emissions_kg": 1,
+    "efficient_route.distance_km": 1,
+    "efficient_route.co2_emissions_kg": 1,
+    "created_at": 1,
+}
+
+# Fields a search contributes to stats, rollups and leaderboards
+STATS_PROJECTION = {
+    "user_id": 1,
+    "origin.name": 1,
+    "destination.name": 1,
+    "cargo_weight_kg": 1,
+    "transport_mode": 1,
+    "shortest_route.co2_emissions_kg": 1,
+    "efficient_route.co2_emissions_kg": 1,
+    "created_at": 1,
+}
+
+STATS_GROUP = {
+    "total_searches": {"$sum": 1},
+    "total_cargo_weight": {"$sum": "$cargo_weight_kg"},
+    "total_co2_saved": {
+        "$sum": {
+            "$subtract": [
+                "$shortest_route.co2_emissions_kg",
+                "$efficient_route.co2_emissions_kg",
+            ]
+        }
+    },
+}
+
+
+ROLLUP_UNITS = ("day", "week", "month")
+# $merge whenMatched: the bucket already includes the incoming window
+FOLDED = {"$gte": [{"$ifNull": ["$folded_until", None]}, "$$new.folded_until"]}
+ROLLUP_SUMS = {
+    "searches": 1,
+    "cargo_weight_kg": "$cargo_weight_kg",
+    "shortest_co2_kg": "$shortest_route.co2_emissions_kg",
+    "efficient_co2_kg": "$efficient_route.co2_emissions_kg",
+    "co2_saved_kg": {
+        "$subtract": [
+            "$shortest_route.co2_emissions_kg",
+            "$efficient_route.co2_emissions_kg",
+        ]
+    },
+}
+
+
+def co2_saved(doc: dict) -> float:
+    return (
+        doc["shortest_route"]["co2_emissions_kg"]
+        - doc["efficient_route"]["co2_emissions_kg"]
+    )
+
+
+def tiered_match(match: dict) -> list[dict]:
+    """Pipeline prefix matching `match` in both the hot and archive tiers."""
+    return [
+        {"$match": match},
+        {"$unionWith": {"coll": ARCHIVE_COLLECTION, "pipeline": [{"$match": match}]}},
+    ]
+
+
+def _distance_m(coordinates: list[float], lng: float, lat: float) -> float:
+    """Great-circle distance (haversine), matching $nearSphere ordering."""
+    lng1, lat1, lng2, lat2 = map(radians, (coordinates[0], coordinates[1], lng, lat))
+    h = sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * cos(lat2) * sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * asin(sqrt(h))
+
+
+def rollup_bucket(created_at: datetime, unit: str) -> datetime:
+    """UTC start of the day/week (Monday)/month containing created_at."""
+    created_at = created_at.astimezone(timezone.utc)
+    day = datetime(created_at.year, created_at.month, created_at.day, tzinfo=timezone.utc)
+    if unit == "week":
+        return day - timedelta(days=day.weekday())
+    if unit == "month":
+        return day.replace(day=1)
+    return day
+
+
+def rollup_id(user_id, unit: str, bucket: datetime, mode: str) -> str:
+    return f"{user_id}:{unit}:{bucket:%Y-%m-%d}:{mode}"
+
+
+class SearchStatsRepository:
+    """
+    Materialized per-user search totals, one `search_stats` document per user.
+
+    Kept current with $inc on save/delete. A missing or `stale` document means
+    "not built yet": the next read rebuilds it from the aggregation, so new and
+    pre-existing users converge without a separate backfill. An increment on a
+    missing document creates it as stale rather than being dropped, and every
+    increment bumps `version`; a rebuild only writes its totals if the version
+    is still the one it saw before aggregating, so a save or delete racing the
+    rebuild is never lost (the document stays stale and is rebuilt again).
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.collection = db.search_stats
+
+    async def record(self, doc: dict, *, sign: int = 1) -> None:
+        """Apply one saved (sign=1) or deleted (sign=-1) search to the totals."""
+        await self.collection.update_one(
+            {"_id": doc["user_id"]},
+            {
+                "$inc": {
+                    "total_searches": sign,
+                    "total_cargo_weight": sign * doc["cargo_weight_kg"],
+                    "total_co2_saved": sign * co2_saved(doc),
+                    "version": 1,
+                },
+                "$setOnInsert": {"stale": True},
+                "$currentDate": {"updated_at": True},
+            },
+            upsert=True,
+        )
+
+    async def get(self, *, user_id: ObjectId):
+        return await self.collection.find_one({"_id": user_id})
+
+    async def put(
+        self, *, user_id: ObjectId, totals: dict | None, seen: dict | None
+    ) -> None:
+        """
+        Store rebuilt totals unless the document changed since `seen` (the
+        document, or None, read before aggregating).
+        """
+        totals = totals or {}
+        version = seen.get("version") if seen else None
+        try:
+            await self.collection.update_one(
+                {
+                    "_id": user_id,
+                    "version": version if version is not None else {"$exists": False},
+                },
+                {
+                    "$set": {
+                        "total_searches": totals.get("total_searches", 0),
+                        "total_cargo_weight": totals.get("total_cargo_weight", 0),
+                        "total_co2_saved": totals.get("total_co2_saved", 0),
+                    },
+                    "$unset": {"stale": ""},
+                    "$inc": {"version": 1},
+                    "$currentDate": {"updated_at": True},
+                },
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            # Changed meanwhile: the upsert collided with the existing _id and
+            # the document stays stale for the next read to rebuild
+            pass
+
+
+class EmissionsRollupRepository:
+    """
+    Pre-aggregated CO2 buckets per user, time unit and transport mode.
+
+    `_id` is "<user_id>:<unit>:<YYYY-MM-DD>:<mode>", so a user's trend over a
+    date range is one _id range scan with no extra index. Refresh is
+    incremental: each unit keeps a created_at watermark in
+    `search_rollup_state` and only searches in (watermark, until] are grouped
+    and $merge'd into the existing buckets.
+
+    Folding a window is idempotent, so a run that dies between the $merge and
+    the watermark write can't add the window twice: the window end is saved as
+    `pending` before merging and reused by the next run, and every bucket
+    records the window end it was last folded up to (`folded_until`), so a
+    re-merge skips buckets that already include the window. State is read from
+    the primary. Refresh from a single scheduler (app.jobs.rollup_emissions);
+    concurrent refreshes would double count.
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.collection = db.search_rollups
+        # A lagging secondary would hand back an old watermark or window
+        self.state = db.search_rollup_state.with_options(
+            read_preference=ReadPreference.PRIMARY
+        )
+        self.searches = db.searches.with_options(read_preference=ReadPreference.PRIMARY)
+
+    async def watermarks(self) -> dict[str, dict]:
+        """Per unit: {"watermark": ..., "pending": ...} (either may be missing)."""
+        docs = await self.state.find({}).to_list(length=None)
+        return {doc["_id"]: doc for doc in docs}
+
+    def _refresh_pipeline(self, unit: str, since: datetime | None, until: datetime):
+        created_at: dict = {"$lte": until}
+        if since is not None:
+            created_at["$gt"] = since
+
+        trunc = {"date": "$created_at", "unit": unit, "timezone": "UTC"}
+        if unit == "week":
+            trunc["startOfWeek"] = "monday"
+
+        return [
+            *tiered_match({"created_at": created_at}),
+            {
+                "$group": {
+                    "_id": {
+                        "user_id": "$user_id",
+                        "mode": "$transport_mode",
+                        "bucket": {"$dateTrunc": trunc},
+                    },
+                    **{field: {"$sum": expr} for field, expr in ROLLUP_SUMS.items()},
+                }
+            },
+            {
+                "$project": {
+                    "_id": {
+                        "$concat": [
+                            {"$toString": "$_id.user_id"},
+                            f":{unit}:",
+                            {"$dateToString": {"date": "$_id.bucket", "format": "%Y-%m-%d"}},
+                            ":",
+                            "$_id.mode",
+                        ]
+                    },
+                    "user_id": "$_id.user_id",
+                    "unit": {"$literal": unit},
+                    "bucket": "$_id.bucket",
+                    "transport_mode": "$_id.mode",
+                    "folded_until": {"$literal": until},
+                    **{field: 1 for field in ROLLUP_SUMS},
+                }
+            },
+            {
+                "$merge": {
+                    "into": self.collection.name,
+                    "on": "_id",
+                    "whenMatched": [
+                        {
+                            "$set": {
+                                # Already folded up to this window's end: keep
+                                **{
+                                    field: {
+                                        "$cond": [
+                                            FOLDED,
+                                            f"${field}",
+                                            {"$add": [f"${field}", f"$$new.{field}"]},
+                                        ]
+                                    }
+                                    for field in ROLLUP_SUMS
+                                },
+                                "folded_until": {
+                                    "$cond": [FOLDED, "$folded_until", "$$new.folded_until"]
+                                },
+                            }
+                        }
+                    ],
+                    "whenNotMatched": "insert",
+                }
+            },
+        ]
+
+    async def _fold(self, unit: str, since: datetime | None, until: datetime) -> None:
+        await self.state.update_one(
+            {"_id": unit}, {"$set": {"pending": until}}, upsert=True
+        )
+        await self.searches.aggregate(
+            self._refresh_pipeline(unit, since, until)
+        ).to_list(length=None)
+        await self.state.update_one(
+            {"_id": unit},
+            {"$set": {"watermark": until}, "$unset": {"pending": ""}},
+        )
+
+    async def refresh(self, *, until: datetime) -> None:
+        """Fold searches created up to `until` into the buckets."""
+        marks = await self.watermarks()
+        for unit in ROLLUP_UNITS:
+            since = marks.get(unit, {}).get("watermark")
+            pending = marks.get(unit, {}).get("pending")
+            if pending is not None:
+                # Finish the interrupted window with the same end first
+                await self._fold(unit, since, pending)
+                since = pending
+            if since is not None and since >= until:
+                continue
+            await self._fold(unit, since, until)
+
+    async def record_deleted(self, doc: dict) -> None:
+        """Subtract a deleted search from buckets that already include it."""
+        marks = await self.watermarks()
+        created_at = doc["created_at"]
+        updates = []
+        for unit in ROLLUP_UNITS:
+            state = marks.get(unit, {})
+            mark = state.get("watermark")
+            latest = max(filter(None, (mark, state.get("pending"))), default=None)
+            if latest is None or created_at > latest:
+                continue  # not rolled up yet, the next refresh won't see it
+            bucket = rollup_bucket(created_at, unit)
+            # Only if this bucket's last fold covered the search (buckets from
+            # before folded_until existed are covered up to the watermark)
+            included: list[dict] = [{"folded_until": {"$gte": created_at}}]
+            if mark is not None and created_at <= mark:
+                included.append({"folded_until": {"$exists": False}})
+            updates.append(
+                UpdateOne(
+                    {
+                        "_id": rollup_id(doc["user_id"], unit, bucket, doc["transport_mode"]),
+                        "$or": included,
+                    },
+                    {
+                        "$inc": {
+                            "searches": -1,
+                            "cargo_weight_kg": -doc["cargo_weight_kg"],
+                            "shortest_co2_kg": -doc["shortest_route"]["co2_emissions_kg"],
+                            "efficient_co2_kg": -doc["efficient_route"]["co2_emissions_kg"],
+                            "co2_saved_kg": -co2_saved(doc),
+                        }
+                    },
+                )
+            )
+        if updates:
+            await self.collection.bulk_write(updates, ordered=False)
+
+    async def buckets(
+        self,
+        *,
+        user_id: ObjectId,
+        unit: str,
+        start: datetime,
+        end: datetime,
+        mode: str | None,
+    ):
+        # "~" sorts after every mode name, making `end` inclusive
+        filter_q: dict = {
+            "_id": {
+                "$gte": f"{user_id}:{unit}:{start:%Y-%m-%d}",
+                "$lte": f"{user_id}:{unit}:{end:%Y-%m-%d}:~",
+            }
+        }
+        if mode:
+            filter_q["transport_mode"] = mode
+        return await self.collection.find(filter_q).sort("_id", 1).to_list(length=None)
 
 
 class SearchRepository:
+    """
+    Searches across two tiers: `searches` (hot) and `searches_archive` (cold).
+
+    The archiver moves the oldest searches first, so every archived search is
+    older than every hot one; newest-first reads can page through the hot tier
+    and continue into the archive without merging.
+    """
+
     def __init__(self, db: AsyncIOMotorDatabase):
         self.collection = db.searches
+        self.archive = db[ARCHIVE_COLLECTION]
+        self.stats_repo = SearchStatsRepository(db)
+        self.rollup_repo = EmissionsRollupRepository(db)
+        # Same collections, but documents come back as undecoded RawBSONDocument
+        self.raw_collection = self.collection.with_options(
+            codec_options=raw_codec_options(self.collection.codec_options)
+        )
+        self.raw_archive = self.archive.with_options(
+            codec_options=raw_codec_options(self.archive.codec_options)
+        )
 
     async def list(
         self,
@@ -15,55 +395,237 @@ class SearchRepository:
         limit: int,
         sort: str,
         mode: str | None,
+        q: str | None = None,
+        raw: bool = False,
     ):
         filter_q: dict = {"user_id": user_id}
         if mode:
             filter_q["transport_mode"] = mode
+        if q and (text_filter := place_query(q)):
+            filter_q.update(text_filter)
 
-        total = await self.collection.count_documents(filter_q)
+        hot, archive = (
+            (self.raw_collection, self.raw_archive)
+            if raw
+            else (self.collection, self.archive)
+        )
+        hot_total, archive_total = await asyncio.gather(
+            self.collection.count_documents(filter_q),
+            self.archive.count_documents(filter_q),
+        )
+        total = hot_total + archive_total
         skip = (page - 1) * limit
 
         sort_field = sort.lstrip("-")
         direction = -1 if sort.startswith("-") else 1
 
+        if not archive_total or sort == "-created_at":
+            # Hot page, continued from the top of the archive if it runs out
+            data = []
+            if skip < hot_total:
+                data = await self._find_page(
+                    hot, filter_q, sort_field, direction, skip, limit
+                )
+            if archive_total and len(data) < limit:
+                data += await self._find_page(
+                    archive,
+                    filter_q,
+                    sort_field,
+                    direction,
+                    max(0, skip - hot_total),
+                    limit - len(data),
+                )
+            return data, total
+
+        pipeline = [
+            *tiered_match(filter_q),
+            {"$sort": {sort_field: direction}},
+            {"$skip": skip},
+            {"$limit": limit},
+        ]
+        data = await hot.aggregate(pipeline).to_list(length=limit)
+        return data, total
+
+    async def _find_page(self, collection, filter_q, sort_field, direction, skip, limit):
         cursor = (
-            self.collection.find(filter_q)
+            collection.find(filter_q)
             .sort(sort_field, direction)
             .skip(skip)
             .limit(limit)
         )
+        return await cursor.to_list(length=limit)
 
-        data = await cursor.to_list(length=limit)
-        return data, total
+    def export_cursors(
+        self,
+        *,
+        user_id: ObjectId,
+        mode: str | None,
+        batch_size: int,
+        include_geometry: bool = True,
+    ):
+        filter_q: dict = {"user_id": user_id}
+        if mode:
+            filter_q["transport_mode"] = mode
 
-    async def get(self, *, search_id: ObjectId, user_id: ObjectId):
-        return await self.collection.find_one({"_id": search_id, "user_id": user_id})
+        projection = None
+        if not include_geometry:
+            projection = {
+                "shortest_route.geometry": 0,
+                "efficient_route.geometry": 0,
+            }
 
-    async def delete(self, *, search_id: ObjectId, user_id: ObjectId):
-        result = await self.collection.delete_one(
-            {"_id": search_id, "user_id": user_id}
+        # No skip: one forward cursor per tier over the (user_id, created_at)
+        # order, fetched from the server in batch_size chunks. Hot first, then
+        # the (strictly older) archive.
+        return [
+            collection.find(filter_q, projection)
+            .sort("created_at", -1)
+            .batch_size(batch_size)
+            for collection in (self.collection, self.archive)
+        ]
+
+    async def near(
+        self,
+        *,
+        user_id: ObjectId,
+        field: str,
+        lng: float,
+        lat: float,
+        max_distance_m: float,
+        skip: int,
+        limit: int,
+    ):
+        """Searches whose origin/destination is within max_distance_m, nearest first."""
+        filter_q = {
+            "user_id": user_id,
+            GEO_FIELDS[field]: {
+                "$nearSphere": {
+                    "$geometry": {"type": "Point", "coordinates": [lng, lat]},
+                    "$maxDistance": max_distance_m,
+                }
+            },
+        }
+        # Each tier returns its own nearest-first list; merge them by distance.
+        # (The summary projection keeps `origin`/`destination` coordinates.)
+        window = skip + limit
+        hot, archived = await asyncio.gather(
+            *(
+                collection.find(filter_q, SUMMARY_PROJECTION)
+                .limit(window)
+                .to_list(length=window)
+                for collection in (self.collection, self.archive)
+            )
+        )
+        merged = heapq.merge(
+            hot,
+            archived,
+            key=lambda doc: _distance_m(doc[field]["coordinates"], lng, lat),
+        )
+        return list(merged)[skip:window]
+
+    async def within_box(
+        self,
+        *,
+        user_id: ObjectId,
+        field: str,
+        min_lng: float,
+        min_lat: float,
+        max_lng: float,
+        max_lat: float,
+        skip: int,
+        limit: int,
+    ):
+        """Searches whose origin/destination lies inside a lng/lat bounding box."""
+        # A planar box on the point's [lng, lat]: a GeoJSON Polygon would have
+        # geodesic edges (bulging poleward) and break for boxes >= 180 degrees
+        # wide. Boxes crossing the antimeridian are rejected by the router.
+        coordinates = f"{GEO_FIELDS[field]}.coordinates"
+        filter_q = {
+            "user_id": user_id,
+            f"{coordinates}.0": {"$gte": min_lng, "$lte": max_lng},
+            f"{coordinates}.1": {"$gte": min_lat, "$lte": max_lat},
+        }
+        pipeline = [
+            *tiered_match(filter_q),
+            {"$project": SUMMARY_PROJECTION},
+            {"$sort": {"created_at": -1}},
+            {"$skip": skip},
+            {"$limit": limit},
+        ]
+        return await self.collection.aggregate(pipeline).to_list(length=limit)
+
+    async def get(self, *, search_id: ObjectId, user_id: ObjectId, raw: bool = False):
+        tiers = (
+            (self.raw_collection, self.raw_archive)
+            if raw
+            else (self.collection, self.archive)
         )
-        return result.deleted_count == 1
+        for collection in tiers:
+            doc = await collection.find_one({"_id": search_id, "user_id": user_id})
+            if doc:
+                return doc
+        return None
+
+    async def delete(self, *, search_id: ObjectId, user_id: ObjectId):
+        for collection in (self.collection, self.archive):
+            deleted = await collection.find_one_and_delete(
+                {"_id": search_id, "user_id": user_id},
+                projection=STATS_PROJECTION,
+            )
+            if deleted:
+                break
+        else:
+            return None
+        await self.stats_repo.record(deleted, sign=-1)
+        await self.rollup_repo.record_deleted(deleted)
+        return deleted
+
+    async def aggregate_stats(self, *, user_id: ObjectId):
+        """Full-history totals for one user (source of truth for rebuilds)."""
+        pipeline = [
+            *tiered_match({"user_id": user_id}),
+            {"$group": {"_id": None, **STATS_GROUP}},
+        ]
+
+        result = await self.collection.aggregate(pipeline).to_list(1)
+        return result[0] if result else None
 
     async def stats(self, *, user_id: ObjectId):
+        totals = await self.stats_repo.get(user_id=user_id)
+        if totals is None or totals.get("stale"):
+            totals = await self.rebuild_stats(user_id=user_id)
+        if not totals or not totals["total_searches"]:
+            return None
+        return {
+            "total_searches": totals["total_searches"],
+            "total_co2_saved": totals["total_co2_saved"],
+            "avg_cargo_weight": totals["total_cargo_weight"] / totals["total_searches"],
+        }
+
+    async def rebuild_stats(self, *, user_id: ObjectId):
+        # Read before aggregating: put() only applies if nothing changed since
+        seen = await self.stats_repo.get(user_id=user_id)
+        totals = await self.aggregate_stats(user_id=user_id)
+        await self.stats_repo.put(user_id=user_id, totals=totals, seen=seen)
+        return totals
+
+    async def rebuild_all_stats(self) -> None:
+        """Recompute every user's stats document in one server-side $merge."""
+        run_id = uuid4().hex
         pipeline = [
-            {"$match": {"user_id": user_id}},
+            *tiered_match({}),
+            {"$group": {"_id": "$user_id", **STATS_GROUP}},
+            {"$set": {"updated_at": "$$NOW", "reconcile_run": run_id}},
             {
-                "$group": {
-                    "_id": None,
-                    "total_searches": {"$sum": 1},
-                    "avg_cargo_weight": {"$avg": "$cargo_weight_kg"},
-                    "total_co2_saved": {
-                        "$sum": {
-                            "$subtract": [
-                                "$shortest_route.co2_emissions_kg",
-                                "$efficient_route.co2_emissions_kg",
-                            ]
-                        }
-                    },
+                "$merge": {
+                    "into": self.stats_repo.collection.name,
+                    "whenMatched": "replace",
+                    "whenNotMatched": "insert",
                 }
             },
         ]
-
-        result = await self.collection.aggregate(pipeline).to_list(1)
-        return result[0] if result else None
+        await self.collection.aggregate(pipeline).to_list(None)
+        # Users whose searches are all gone weren't part of this run
+        await self.stats_repo.collection.delete_many(
+            {"reconcile_run": {"$ne": run_id}}
+        )
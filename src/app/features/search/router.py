@@ -1,7 +1,13 @@
+from datetime import date, timedelta
+from typing import Literal
+
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import Response, StreamingResponse
 
+from app.config.settings import get_settings
 from app.features.auth.dependency import get_current_user
 from app.features.search.dependency import get_search_service
+from app.middleware.compression import PrecompressedResponse
 
 router = APIRouter(prefix="/api/v1/searches", tags=["Searches"])
 
@@ -12,15 +18,130 @@ async def list_searches(
     limit: int = Query(20, le=100),
     sort: str = "-created_at",
     mode: str | None = None,
+    q: str | None = Query(None, min_length=1, max_length=100),
     user=Depends(get_current_user),
     service=Depends(get_search_service),
 ):
-    return await service.list_searches(
+    body = await service.list_searches_json(
         user_id=user.id,
         page=page,
         limit=limit,
         sort=sort,
         mode=mode,
+        q=q,
+    )
+    return Response(content=body, media_type="application/json")
+
+
+@router.get("/stats")
+async def search_stats(
+    user=Depends(get_current_user),
+    service=Depends(get_search_service),
+):
+    return await service.get_stats(user_id=user.id)
+
+
+TREND_DEFAULT_DAYS = {"day": 30, "week": 182, "month": 365}
+
+
+@router.get("/trends")
+async def search_trends(
+    granularity: Literal["day", "week", "month"] = "week",
+    start: date | None = None,
+    end: date | None = None,
+    mode: str | None = None,
+    user=Depends(get_current_user),
+    service=Depends(get_search_service),
+):
+    end = end or date.today()
+    start = start or end - timedelta(days=TREND_DEFAULT_DAYS[granularity])
+    if start > end:
+        raise HTTPException(422, "start must not be after end")
+    return await service.get_trends(
+        user_id=user.id,
+        granularity=granularity,
+        start=start,
+        end=end,
+        mode=mode,
+    )
+
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+@router.get("/export")
+async def export_searches(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    mode: str | None = None,
+    user=Depends(get_current_user),
+    service=Depends(get_search_service),
+):
+    settings = get_settings()
+    stream = service.export_searches(
+        user_id=user.id,
+        fmt=format,
+        mode=mode,
+        batch_size=settings.SEARCH_EXPORT_BATCH_SIZE,
+        chunk_bytes=settings.SEARCH_EXPORT_CHUNK_BYTES,
+    )
+    return StreamingResponse(
+        stream,
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="searches.{format}"',
+        },
+    )
+
+
+@router.get("/near")
+async def searches_near(
+    lng: float = Query(..., ge=-180, le=180),
+    lat: float = Query(..., ge=-90, le=90),
+    radius_km: float = Query(50, gt=0, le=20_000),
+    field: Literal["origin", "destination"] = "origin",
+    page: int = Query(1, ge=1),
+    limit: int = Query(20, ge=1, le=100),
+    user=Depends(get_current_user),
+    service=Depends(get_search_service),
+):
+    return await service.searches_near(
+        user_id=user.id,
+        field=field,
+        lng=lng,
+        lat=lat,
+        radius_km=radius_km,
+        page=page,
+        limit=limit,
+    )
+
+
+@router.get("/within")
+async def searches_within(
+    min_lng: float = Query(..., ge=-180, le=180),
+    min_lat: float = Query(..., ge=-90, le=90),
+    max_lng: float = Query(..., ge=-180, le=180),
+    max_lat: float = Query(..., ge=-90, le=90),
+    field: Literal["origin", "destination"] = "origin",
+    page: int = Query(1, ge=1),
+    limit: int = Query(20, ge=1, le=100),
+    user=Depends(get_current_user),
+    service=Depends(get_search_service),
+):
+    if min_lng >= max_lng or min_lat >= max_lat:
+        # Also rules out boxes crossing the antimeridian (min_lng > max_lng)
+        raise HTTPException(422, "Bounding box min values must be below max values")
+    return await service.searches_within(
+        user_id=user.id,
+        field=field,
+        min_lng=min_lng,
+        min_lat=min_lat,
+        max_lng=max_lng,
+        max_lat=max_lat,
+        page=page,
+        limit=limit,
     )
 
 
@@ -30,13 +151,14 @@ async def get_search(
     user=Depends(get_current_user),
     service=Depends(get_search_service),
 ):
-    result = await service.get_search(
+    body = await service.get_search_json(
         search_id=search_id,
         user_id=user.id,
     )
-    if not result:
+    if not body:
         raise HTTPException(404, "Search not found")
-    return result
+    # Geometry-heavy and served repeatedly from the cache: compress once
+    return PrecompressedResponse(content=body, media_type="application/json")
 
 
 @router.delete("/{search_id}", status_code=204)
@@ -51,11 +173,3 @@ async def delete_search(
     )
     if not deleted:
         raise HTTPException(404, "Search not found")
-
-
-@router.get("/stats")
-async def search_stats(
-    user=Depends(get_current_user),
-    service=Depends(get_search_service),
-):
-    return await service.get_stats(user_id=user.id)
@@ -1,14 +1,54 @@
+import csv
+import io
+from collections.abc import AsyncIterator
+from datetime import datetime, time, timezone
 from math import ceil
 
+import orjson
 from bson import ObjectId
 
+from app.config.settings import get_settings
+from app.features.search.geometry_codec import decode_geometry
+from app.features.search.raw import search_json
+from app.features.search.repository import co2_saved, rollup_bucket
+from app.utils.cache import cached, invalidates
 from app.utils.logger import logger
 
+TREND_FIELDS = ("searches", "cargo_weight_kg", "co2_saved_kg")
+
+# Cache tag covering every cached read of a user's search history
+SEARCHES_TAG = "user:{user_id}:searches"
+CACHE_TTL = get_settings().CACHE_TTL
+# Trends only move when the rollup job runs
+TRENDS_CACHE_TTL = get_settings().SEARCH_ROLLUP_INTERVAL_SECONDS
+
+EXPORT_CSV_COLUMNS = [
+    "id",
+    "origin_name",
+    "origin_lng",
+    "origin_lat",
+    "destination_name",
+    "destination_lng",
+    "destination_lat",
+    "cargo_weight_kg",
+    "transport_mode",
+    "shortest_distance_km",
+    "shortest_duration_hours",
+    "shortest_co2_emissions_kg",
+    "efficient_distance_km",
+    "efficient_duration_hours",
+    "efficient_co2_emissions_kg",
+    "co2_saved_kg",
+    "created_at",
+]
+
 
 class SearchService:
-    def __init__(self, repo, redis):
+    def __init__(self, repo, redis, leaderboard=None, cache=None):
         self.repo = repo
         self.redis = redis
+        self.leaderboard = leaderboard
+        self.cache = cache
 
     def _serialize_search(self, doc):
         """Convert MongoDB document to serializable dict"""
@@ -21,56 +61,249 @@ class SearchService:
             "destination": doc["destination"],
             "cargo_weight_kg": doc["cargo_weight_kg"],
             "transport_mode": doc["transport_mode"],
+            "shortest_route": self._decode_route(doc["shortest_route"]),
+            "efficient_route": self._decode_route(doc["efficient_route"]),
+            "metadata": doc.get("metadata", {}),
+            "created_at": doc["created_at"],
+        }
+
+    def _serialize_summary(self, doc):
+        """Geometry-free view of a search (see SUMMARY_PROJECTION)."""
+        return {
+            "id": str(doc["_id"]),
+            "origin": doc["origin"],
+            "destination": doc["destination"],
+            "cargo_weight_kg": doc["cargo_weight_kg"],
+            "transport_mode": doc["transport_mode"],
             "shortest_route": doc["shortest_route"],
             "efficient_route": doc["efficient_route"],
-            "metadata": doc.get("metadata", {}),
             "created_at": doc["created_at"],
         }
 
-    async def list_searches(self, *, user_id, page, limit, sort, mode):
-        # logger.info(
-        #     "Listing searches",
-        #     user_id=user_id,
-        #     page=page,
-        #     limit=limit,
-        #     sort=sort,
-        #     mode=mode,
-        # )
+    def _decode_route(self, route):
+        """Expand a compactly stored geometry back to GeoJSON."""
+        if "geometry" not in route:
+            return route
+        return {**route, "geometry": decode_geometry(route["geometry"])}
+
+    def _csv_row(self, doc) -> list:
+        origin = doc["origin"]
+        destination = doc["destination"]
+        shortest = doc["shortest_route"]
+        efficient = doc["efficient_route"]
+        return [
+            str(doc["_id"]),
+            origin["name"],
+            origin["coordinates"][0],
+            origin["coordinates"][1],
+            destination["name"],
+            destination["coordinates"][0],
+            destination["coordinates"][1],
+            doc["cargo_weight_kg"],
+            doc["transport_mode"],
+            shortest["distance_km"],
+            shortest["duration_hours"],
+            shortest["co2_emissions_kg"],
+            efficient["distance_km"],
+            efficient["duration_hours"],
+            efficient["co2_emissions_kg"],
+            shortest["co2_emissions_kg"] - efficient["co2_emissions_kg"],
+            doc["created_at"].isoformat(),
+        ]
+
+    async def export_searches(
+        self,
+        *,
+        user_id,
+        fmt: str,
+        mode: str | None,
+        batch_size: int,
+        chunk_bytes: int,
+    ) -> AsyncIterator[bytes]:
+        """
+        Stream the user's full search history as NDJSON or CSV.
+
+        Documents are encoded one at a time as the cursors yield them and
+        flushed in ~chunk_bytes pieces, so memory stays bounded by one cursor
+        batch plus one chunk regardless of history size.
+        """
+        cursors = self.repo.export_cursors(
+            user_id=user_id,
+            mode=mode,
+            batch_size=batch_size,
+            include_geometry=fmt == "ndjson",
+        )
+        buffer = bytearray()
+        count = 0
+
+        if fmt == "csv":
+            line = io.StringIO()
+            writer = csv.writer(line)
+            writer.writerow(EXPORT_CSV_COLUMNS)
+            buffer += line.getvalue().encode()
+
+            def encode(doc) -> bytes:
+                line.seek(0)
+                line.truncate()
+                writer.writerow(self._csv_row(doc))
+                return line.getvalue().encode()
+        else:
+
+            def encode(doc) -> bytes:
+                return orjson.dumps(
+                    self._serialize_search(doc),
+                    option=orjson.OPT_APPEND_NEWLINE,
+                )
+
+        try:
+            for cursor in cursors:
+                async for doc in cursor:
+                    buffer += encode(doc)
+                    count += 1
+                    if len(buffer) >= chunk_bytes:
+                        yield bytes(buffer)
+                        buffer.clear()
+            if buffer:
+                yield bytes(buffer)
+        finally:
+            for cursor in cursors:
+                await cursor.close()
+            logger.info(
+                "Search export finished",
+                user_id=str(user_id),
+                format=fmt,
+                exported=count,
+            )
+
+    @cached("search.list", ttl=CACHE_TTL, tags=(SEARCHES_TAG,))
+    async def list_searches_json(
+        self, *, user_id, page, limit, sort, mode, q=None
+    ) -> bytes:
+        """One page of the user's searches, rendered straight from raw BSON."""
         data, total = await self.repo.list(
             user_id=user_id,
             page=page,
             limit=limit,
             sort=sort,
             mode=mode,
+            q=q,
+            raw=True,
+        )
+        return (
+            b'{"data":['
+            + b",".join(search_json(doc) for doc in data)
+            + b'],"pagination":'
+            + orjson.dumps(self._pagination(page, limit, total))
+            + b"}"
         )
-        # logger.info(f"Retrieved {len(data)} searches", data=data)
 
+    def _pagination(self, page, limit, total) -> dict:
         total_pages = ceil(total / limit) if total else 0
+        return {
+            "page": page,
+            "limit": limit,
+            "total": total,
+            "total_pages": total_pages,
+            "has_next": page < total_pages,
+        }
 
+    async def _geo_page(self, query, *, page, limit, **kwargs):
+        # Fetch one extra row instead of counting: $nearSphere can't be counted
+        docs = await query(skip=(page - 1) * limit, limit=limit + 1, **kwargs)
         return {
-            "data": [self._serialize_search(doc) for doc in data],
+            "data": [self._serialize_summary(doc) for doc in docs[:limit]],
             "pagination": {
                 "page": page,
                 "limit": limit,
-                "total": total,
-                "total_pages": total_pages,
-                "has_next": page < total_pages,
+                "has_next": len(docs) > limit,
             },
         }
 
-    async def get_search(self, *, search_id, user_id):
+    async def searches_near(
+        self, *, user_id, field, lng, lat, radius_km, page, limit
+    ):
+        return await self._geo_page(
+            self.repo.near,
+            page=page,
+            limit=limit,
+            user_id=user_id,
+            field=field,
+            lng=lng,
+            lat=lat,
+            max_distance_m=radius_km * 1000,
+        )
+
+    async def searches_within(
+        self, *, user_id, field, min_lng, min_lat, max_lng, max_lat, page, limit
+    ):
+        return await self._geo_page(
+            self.repo.within_box,
+            page=page,
+            limit=limit,
+            user_id=user_id,
+            field=field,
+            min_lng=min_lng,
+            min_lat=min_lat,
+            max_lng=max_lng,
+            max_lat=max_lat,
+        )
+
+    @cached("search.get", ttl=CACHE_TTL, tags=(SEARCHES_TAG,))
+    async def get_search_json(self, *, search_id, user_id) -> bytes | None:
+        """One search as JSON rendered straight from raw BSON, or None."""
         doc = await self.repo.get(
             search_id=ObjectId(search_id),
             user_id=user_id,
+            raw=True,
         )
-        return self._serialize_search(doc)
+        return search_json(doc) if doc else None
 
+    @invalidates(SEARCHES_TAG)
     async def delete_search(self, *, search_id, user_id):
-        return await self.repo.delete(
+        deleted = await self.repo.delete(
             search_id=ObjectId(search_id),
             user_id=user_id,
         )
+        if deleted and self.leaderboard:
+            await self.leaderboard.record_deleted(deleted, co2_saved(deleted))
+        return deleted is not None
+
+    @cached("search.trends", ttl=TRENDS_CACHE_TTL, tags=(SEARCHES_TAG,))
+    async def get_trends(self, *, user_id, granularity, start, end, mode):
+        """CO2 trend series and per-mode breakdown, read from rollup buckets."""
+        start = rollup_bucket(datetime.combine(start, time(), timezone.utc), granularity)
+        end = datetime.combine(end, time(), timezone.utc)
+        buckets = await self.repo.rollup_repo.buckets(
+            user_id=user_id,
+            unit=granularity,
+            start=start,
+            end=end,
+            mode=mode,
+        )
+
+        series: dict[datetime, dict] = {}
+        by_mode: dict[str, dict] = {}
+        for doc in buckets:
+            point = series.setdefault(
+                doc["bucket"],
+                {"bucket": doc["bucket"], **dict.fromkeys(TREND_FIELDS, 0)},
+            )
+            totals = by_mode.setdefault(
+                doc["transport_mode"], dict.fromkeys(TREND_FIELDS, 0)
+            )
+            for field in TREND_FIELDS:
+                point[field] += doc[field]
+                totals[field] += doc[field]
+
+        return {
+            "granularity": granularity,
+            "from": start,
+            "to": end,
+            "series": list(series.values()),
+            "by_mode": by_mode,
+        }
 
+    @cached("search.stats", ttl=CACHE_TTL, tags=(SEARCHES_TAG,))
     async def get_stats(self, *, user_id):
         stats = await self.repo.stats(user_id=user_id)
         return {
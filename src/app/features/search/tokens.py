@@ -0,0 +1,28 @@
+"""Normalized place-name tokens for indexed prefix search over search history."""
+
+import re
+
+from app.utils.text import tokenize
+
+
+def place_tokens(*names: str) -> list[str]:
+    """Distinct tokens of the given place names, stored as `place_tokens`."""
+    return sorted({token for name in names for token in tokenize(name)})
+
+
+def place_query(q: str) -> dict | None:
+    """
+    Filter on `place_tokens` for a user query.
+
+    Every word must match a token; the last one as a prefix, so "ham" and
+    "new yo" find Hamburg and New York while the user is still typing. Prefix
+    regexes are anchored and case-sensitive on normalized data, which keeps
+    them index-bounded.
+    """
+    words = tokenize(q)
+    if not words:
+        return None
+    *exact, prefix = words
+    clauses: list[dict] = [{"place_tokens": word} for word in exact]
+    clauses.append({"place_tokens": {"$regex": f"^{re.escape(prefix)}"}})
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
@@ -0,0 +1 @@
+"""Maintenance jobs, run as `python -m app.jobs.<name>`."""
@@ -0,0 +1,96 @@
+"""
+Move searches older than SEARCH_ARCHIVE_AFTER_DAYS into the archive tier.
+
+Usage:
+    python -m app.jobs.archive_searches [--older-than-days N] [--batch-size 200] [--pause 0.5]
+
+Oldest searches move first, which keeps every archived search older than every
+hot one (SearchRepository relies on this for newest-first paging). Each batch
+is upserted into `searches_archive` before being deleted from `searches`, so
+an interrupted run is safe to repeat.
+"""
+
+import argparse
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from pymongo import ReadPreference, ReplaceOne
+
+from app.config.settings import get_settings
+from app.features.search.geometry_codec import encode_routes
+from app.features.search.repository import ARCHIVE_COLLECTION
+from app.jobs.context import job_database
+from app.utils.logger import logger
+
+
+async def archive(
+    db,
+    *,
+    older_than: datetime,
+    batch_size: int,
+    pause: float = 0.0,
+) -> int:
+    settings = get_settings()
+    hot = db.searches.with_options(read_preference=ReadPreference.PRIMARY)
+    archive_collection = db[ARCHIVE_COLLECTION]
+    moved = 0
+
+    while True:
+        batch = (
+            await hot.find({"created_at": {"$lt": older_than}})
+            .sort("created_at", 1)
+            .limit(batch_size)
+            .to_list(length=batch_size)
+        )
+        if not batch:
+            return moved
+
+        archived_at = datetime.now(timezone.utc)
+        await archive_collection.bulk_write(
+            [
+                ReplaceOne(
+                    {"_id": doc["_id"]},
+                    {
+                        **encode_routes(
+                            doc,
+                            precision=settings.SEARCH_GEOMETRY_PRECISION,
+                            compress=True,
+                            level=settings.SEARCH_GEOMETRY_COMPRESSION_LEVEL,
+                        ),
+                        "archived_at": archived_at,
+                    },
+                    upsert=True,
+                )
+                for doc in batch
+            ],
+            ordered=False,
+        )
+        await hot.delete_many({"_id": {"$in": [doc["_id"] for doc in batch]}})
+
+        moved += len(batch)
+        logger.info("Search archiving progress", moved=moved)
+        if pause:
+            await asyncio.sleep(pause)
+
+
+async def main(args: argparse.Namespace) -> None:
+    settings = get_settings()
+    days = args.older_than_days or settings.SEARCH_ARCHIVE_AFTER_DAYS
+    older_than = datetime.now(timezone.utc) - timedelta(days=days)
+
+    async with job_database() as db:
+        moved = await archive(
+            db,
+            older_than=older_than,
+            batch_size=args.batch_size,
+            pause=args.pause,
+        )
+    logger.info("Search archiving finished", moved=moved, older_than=older_than.isoformat())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--older-than-days", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--pause", type=float, default=0.5, help="seconds between batches")
+    asyncio.run(main(parser.parse_args()))
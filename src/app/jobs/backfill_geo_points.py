@@ -0,0 +1,76 @@
+"""
+Backfill GeoJSON origin_point/destination_point on existing searches.
+
+Usage:
+    python -m app.jobs.backfill_geo_points [--batch-size 1000] [--pause 0.1]
+
+The points are built server-side from origin/destination.coordinates with a
+pipeline update, so no document bodies are transferred.
+"""
+
+import argparse
+import asyncio
+
+from pymongo import ReadPreference
+
+from app.jobs.context import job_database
+from app.utils.logger import logger
+
+MISSING_POINTS = {
+    "$or": [
+        {"origin_point": {"$exists": False}},
+        {"destination_point": {"$exists": False}},
+    ]
+}
+SET_POINTS = [
+    {
+        "$set": {
+            "origin_point": {"type": "Point", "coordinates": "$origin.coordinates"},
+            "destination_point": {
+                "type": "Point",
+                "coordinates": "$destination.coordinates",
+            },
+        }
+    }
+]
+
+
+async def backfill(db, *, batch_size: int, pause: float = 0.0) -> int:
+    collection = db.searches.with_options(read_preference=ReadPreference.PRIMARY)
+    updated = 0
+    last_id = None
+
+    while True:
+        query = dict(MISSING_POINTS)
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+
+        ids = [
+            doc["_id"]
+            for doc in await collection.find(query, {"_id": 1})
+            .sort("_id", 1)
+            .limit(batch_size)
+            .to_list(length=batch_size)
+        ]
+        if not ids:
+            return updated
+
+        result = await collection.update_many({"_id": {"$in": ids}}, SET_POINTS)
+        updated += result.modified_count
+        last_id = ids[-1]
+        logger.info("Geo point backfill progress", updated=updated)
+        if pause:
+            await asyncio.sleep(pause)
+
+
+async def main(args: argparse.Namespace) -> None:
+    async with job_database() as db:
+        updated = await backfill(db, batch_size=args.batch_size, pause=args.pause)
+    logger.info("Geo point backfill finished", updated=updated)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--pause", type=float, default=0.1, help="seconds between batches")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,84 @@
+"""
+Backfill normalized place_tokens on existing searches (hot and archive).
+
+Usage:
+    python -m app.jobs.backfill_place_tokens [--batch-size 500] [--pause 0.1]
+
+Tokens need Unicode normalization, so they are computed here rather than in a
+server-side pipeline; only the two place names are read per document.
+"""
+
+import argparse
+import asyncio
+
+from pymongo import ReadPreference, UpdateOne
+
+from app.features.search.repository import ARCHIVE_COLLECTION
+from app.features.search.tokens import place_tokens
+from app.jobs.context import job_database
+from app.utils.logger import logger
+
+MISSING_TOKENS = {"place_tokens": {"$exists": False}}
+NAME_PROJECTION = {"origin.name": 1, "destination.name": 1}
+
+
+async def backfill(collection, *, batch_size: int, pause: float = 0.0) -> int:
+    collection = collection.with_options(read_preference=ReadPreference.PRIMARY)
+    updated = 0
+    last_id = None
+
+    while True:
+        query = dict(MISSING_TOKENS)
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+
+        batch = (
+            await collection.find(query, NAME_PROJECTION)
+            .sort("_id", 1)
+            .limit(batch_size)
+            .to_list(length=batch_size)
+        )
+        if not batch:
+            return updated
+
+        result = await collection.bulk_write(
+            [
+                UpdateOne(
+                    {"_id": doc["_id"]},
+                    {
+                        "$set": {
+                            "place_tokens": place_tokens(
+                                doc["origin"]["name"], doc["destination"]["name"]
+                            )
+                        }
+                    },
+                )
+                for doc in batch
+            ],
+            ordered=False,
+        )
+        updated += result.modified_count
+        last_id = batch[-1]["_id"]
+        logger.info("Place token backfill progress", collection=collection.name, updated=updated)
+        if pause:
+            await asyncio.sleep(pause)
+
+
+async def main(args: argparse.Namespace) -> None:
+    async with job_database() as db:
+        for collection in (db.searches, db[ARCHIVE_COLLECTION]):
+            updated = await backfill(
+                collection, batch_size=args.batch_size, pause=args.pause
+            )
+            logger.info(
+                "Place token backfill finished",
+                collection=collection.name,
+                updated=updated,
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--pause", type=float, default=0.1, help="seconds between batches")
+    asyncio.run(main(parser.parse_args()))
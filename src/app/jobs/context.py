@@ -0,0 +1,26 @@
+"""Shared setup for maintenance jobs run outside the web process."""
+
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.config.settings import get_settings
+from app.connections.mongodb import create_mongo_client
+from app.features.auth.model import User
+from app.features.search.model import ArchivedSearch, Search
+
+
+@asynccontextmanager
+async def job_database() -> AsyncIterator[AsyncIOMotorDatabase]:
+    """Open the application database with the same client options as the API."""
+    settings = get_settings()
+    client, db = await create_mongo_client(
+        uri=settings.MONGODB_URI,
+        db_name=settings.MONGODB_DB_NAME,
+        document_models=[User, Search, ArchivedSearch],
+    )
+    try:
+        yield db
+    finally:
+        client.close()
@@ -0,0 +1,158 @@
+"""
+Convert stored route geometries to the compact encoding in batches.
+
+Usage:
+    python -m app.jobs.migrate_geometry [--batch-size 200] [--pause 0.1] [--dry-run]
+
+Walks `searches` in _id order, only touching documents with a LineString
+geometry still stored as plain GeoJSON, so it is safe to stop and re-run at
+any point. LineStrings the codec can't represent (see geometry_codec) stay
+plain and are reported as skipped.
+"""
+
+import argparse
+import asyncio
+from dataclasses import dataclass
+
+import bson
+from pymongo import ReadPreference, UpdateOne
+
+from app.config.settings import get_settings
+from app.features.search.geometry_codec import encode_routes, zstd_available
+from app.jobs.context import job_database
+from app.utils.logger import logger
+
+ROUTE_KEYS = ("shortest_route", "efficient_route")
+# Encoded geometries keep type "LineString" but gain a codec field
+PLAIN_GEOMETRY = {
+    "$or": [
+        {
+            f"{route}.geometry.type": "LineString",
+            f"{route}.geometry.codec": {"$exists": False},
+        }
+        for route in ROUTE_KEYS
+    ]
+}
+ROUTE_PROJECTION = dict.fromkeys(ROUTE_KEYS, 1)
+
+
+@dataclass
+class MigrationReport:
+    documents: int = 0
+    skipped: int = 0
+    bytes_before: int = 0
+    bytes_after: int = 0
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.bytes_before - self.bytes_after
+
+    @property
+    def percent_saved(self) -> float:
+        return self.bytes_saved / self.bytes_before * 100 if self.bytes_before else 0.0
+
+
+async def migrate(
+    db,
+    *,
+    batch_size: int,
+    pause: float = 0.0,
+    dry_run: bool = False,
+) -> MigrationReport:
+    settings = get_settings()
+    collection = db.searches.with_options(read_preference=ReadPreference.PRIMARY)
+    report = MigrationReport()
+    last_id = None
+
+    while True:
+        query = dict(PLAIN_GEOMETRY)
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+
+        batch = (
+            await collection.find(query, ROUTE_PROJECTION)
+            .sort("_id", 1)
+            .limit(batch_size)
+            .to_list(length=batch_size)
+        )
+        if not batch:
+            break
+
+        updates = []
+        for doc in batch:
+            encoded = encode_routes(
+                doc,
+                precision=settings.SEARCH_GEOMETRY_PRECISION,
+                compress=settings.SEARCH_GEOMETRY_COMPRESSION,
+                level=settings.SEARCH_GEOMETRY_COMPRESSION_LEVEL,
+            )
+            # encode_geometry returns the geometry itself when it can't encode it
+            if all(
+                encoded[route]["geometry"] is doc[route]["geometry"]
+                for route in ROUTE_KEYS
+                if "geometry" in (doc.get(route) or {})
+            ):
+                report.skipped += 1
+                continue
+            report.documents += 1
+            report.bytes_before += len(bson.encode(doc))
+            report.bytes_after += len(bson.encode(encoded))
+            updates.append(
+                UpdateOne(
+                    {"_id": doc["_id"], **PLAIN_GEOMETRY},
+                    {
+                        "$set": {
+                            "shortest_route": encoded["shortest_route"],
+                            "efficient_route": encoded["efficient_route"],
+                        }
+                    },
+                )
+            )
+
+        if updates and not dry_run:
+            await collection.bulk_write(updates, ordered=False)
+
+        last_id = batch[-1]["_id"]
+        logger.info(
+            "Geometry migration progress",
+            documents=report.documents,
+            skipped=report.skipped,
+            bytes_saved=report.bytes_saved,
+        )
+        if pause:
+            await asyncio.sleep(pause)
+
+    return report
+
+
+async def main(args: argparse.Namespace) -> None:
+    settings = get_settings()
+    if settings.SEARCH_GEOMETRY_COMPRESSION and not zstd_available():
+        logger.warning("zstandard not installed, geometries will be stored uncompressed")
+
+    async with job_database() as db:
+        report = await migrate(
+            db,
+            batch_size=args.batch_size,
+            pause=args.pause,
+            dry_run=args.dry_run,
+        )
+
+    logger.info(
+        "Geometry migration finished",
+        dry_run=args.dry_run,
+        documents=report.documents,
+        skipped=report.skipped,
+        bytes_before=report.bytes_before,
+        bytes_after=report.bytes_after,
+        bytes_saved=report.bytes_saved,
+        percent_saved=round(report.percent_saved, 1),
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--pause", type=float, default=0.1, help="seconds between batches")
+    parser.add_argument("--dry-run", action="store_true", help="measure without writing")
+    asyncio.run(main(parser.parse_args()))
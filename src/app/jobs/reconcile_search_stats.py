@@ -0,0 +1,35 @@
+"""
+Rebuild materialized per-user search stats from the searches collection.
+
+Usage:
+    python -m app.jobs.reconcile_search_stats [--user-id <ObjectId>]
+
+Without --user-id every user's document is recomputed in a single
+server-side $group/$merge and stale documents are removed.
+"""
+
+import argparse
+import asyncio
+
+from bson import ObjectId
+
+from app.features.search.repository import SearchRepository
+from app.jobs.context import job_database
+from app.utils.logger import logger
+
+
+async def main(args: argparse.Namespace) -> None:
+    async with job_database() as db:
+        repo = SearchRepository(db)
+        if args.user_id:
+            totals = await repo.rebuild_stats(user_id=ObjectId(args.user_id))
+            logger.info("Search stats rebuilt", user_id=args.user_id, totals=totals)
+        else:
+            await repo.rebuild_all_stats()
+            logger.info("Search stats rebuilt for all users")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--user-id", help="only rebuild this user's stats")
+    asyncio.run(main(parser.parse_args()))
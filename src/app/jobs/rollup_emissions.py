@@ -0,0 +1,50 @@
+"""
+Fold new searches into the time-bucketed emissions rollups.
+
+Usage:
+    python -m app.jobs.rollup_emissions [--loop]
+
+Each run only aggregates searches created since the previous run's watermark.
+Run a single instance (cron, or --loop as a one-replica worker).
+"""
+
+import argparse
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from app.config.settings import get_settings
+from app.features.search.repository import EmissionsRollupRepository
+from app.jobs.context import job_database
+from app.utils.logger import logger
+
+
+async def run_once(repo: EmissionsRollupRepository) -> None:
+    settings = get_settings()
+    until = datetime.now(timezone.utc) - timedelta(
+        seconds=settings.SEARCH_ROLLUP_SETTLE_SECONDS
+    )
+    await repo.refresh(until=until)
+    logger.info("Emissions rollup refreshed", until=until.isoformat())
+
+
+async def main(args: argparse.Namespace) -> None:
+    settings = get_settings()
+    async with job_database() as db:
+        repo = EmissionsRollupRepository(db)
+        await run_once(repo)
+        while args.loop:
+            await asyncio.sleep(settings.SEARCH_ROLLUP_INTERVAL_SECONDS)
+            try:
+                await run_once(repo)
+            except Exception as e:
+                logger.error(f"Emissions rollup failed: {e}", exc_info=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--loop",
+        action="store_true",
+        help="keep running every SEARCH_ROLLUP_INTERVAL_SECONDS",
+    )
+    asyncio.run(main(parser.parse_args()))
@@ -9,7 +9,11 @@ from app.config.settings import get_settings
 from app.connections.mongodb import create_mongo_client
 from app.connections.redis import create_redis_client
 from app.features.auth.model import User
-from app.features.search.model import Search
+from app.features.auth.security import password_hasher
+from app.features.health.service import HealthSampler
+from app.features.search.model import ArchivedSearch, Search
+from app.middleware.server_middleware import cleanup_dead_workers, mark_worker_dead
+from app.utils.cache import ServiceCache
 from app.utils.logger import logger
 
 
@@ -24,13 +28,22 @@ async def lifespan(app: FastAPI) -> AsyncIterator[None]:
     mongo_client, db = await create_mongo_client(
         uri=settings.MONGODB_URI,
         db_name=settings.MONGODB_DB_NAME,
-        document_models=[User, Search],
+        document_models=[User, Search, ArchivedSearch],
     )
     app.state.mongo_client = mongo_client
     app.state.db = db
     # Redis: Connect and store in app.state
     redis = create_redis_client(settings.REDIS_URL)
     app.state.redis = redis
+    # Cache payloads are binary, so they get their own undecoded client
+    app.state.cache = ServiceCache(
+        create_redis_client(settings.REDIS_URL, decode_responses=False),
+        local_maxsize=settings.CACHE_LOCAL_MAXSIZE,
+        local_ttl=settings.CACHE_LOCAL_TTL,
+        compress_min_bytes=settings.CACHE_COMPRESS_MIN_BYTES,
+        beta=settings.CACHE_EARLY_REFRESH_BETA,
+        generation_ttl=settings.CACHE_TAG_GENERATION_TTL,
+    )
 
     # Force early server selection (fail fast if MongoDB unavailable)
     try:
@@ -53,6 +66,19 @@ async def lifespan(app: FastAPI) -> AsyncIterator[None]:
         logger.error(f"Redis connection failed: {e}", exc_info=True)
         # Don't raise - Redis is optional for some features
 
+    dead_workers = cleanup_dead_workers()
+    if dead_workers:
+        logger.info("Cleared metrics of dead workers", workers=dead_workers)
+
+    # Health: sampled in the background, probes read the snapshot
+    app.state.health_sampler = HealthSampler(
+        mongo_client,
+        redis,
+        interval=settings.HEALTH_SAMPLE_INTERVAL_SECONDS,
+        check_timeout=settings.HEALTH_CHECK_TIMEOUT_SECONDS,
+    )
+    await app.state.health_sampler.start()
+
     logger.info("Application ready", status="running")
 
     yield
@@ -61,6 +87,10 @@ async def lifespan(app: FastAPI) -> AsyncIterator[None]:
 
     logger.info("Application shutting down", status="stopping")
 
+    # Stop the sampler first, so /ready turns 503 while draining
+    if hasattr(app.state, "health_sampler"):
+        await app.state.health_sampler.stop()
+
     if hasattr(app.state, "mongo_client"):
         app.state.mongo_client.close()
         logger.info("MongoDB connection closed")
@@ -68,4 +98,10 @@ async def lifespan(app: FastAPI) -> AsyncIterator[None]:
     if hasattr(app.state, "redis"):
         await app.state.redis.close()
         logger.info("Redis connection closed")
+
+    if hasattr(app.state, "cache"):
+        await app.state.cache.redis.close()
+
+    password_hasher.shutdown()
+    mark_worker_dead()
     logger.info("Application shutdown complete", status="stopped")
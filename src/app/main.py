@@ -1,25 +1,27 @@
 from dotenv import load_dotenv
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.responses import ORJSONResponse, Response
 
 from app.config.settings import get_settings
 from app.features.auth.router import router as auth_router
 from app.features.health.router import router as health_router
+from app.features.leaderboard.router import router as leaderboard_router
 from app.features.routes.router import router as route_router
 from app.features.search.router import router as search_router
 from app.lifecycle.lifespan import lifespan
-from app.middleware.global_exception_handler import global_exception_handler
+from app.middleware.compression import CompressionMiddleware
+from app.middleware.global_exception_handler import (
+    global_exception_handler,
+    not_found,
+)
+from app.middleware.rate_limit import RateLimitMiddleware
 from app.middleware.server_middleware import (
-    MetricsMiddleware,
+    ServerMiddleware,
     TimeoutMiddleware,
-    correlation_middleware,
-    create_security_headers_middleware,
     get_metrics,
 )
-from app.utils.logger import logger
 
 # Load environment variables
 load_dotenv(".env.development")
@@ -62,28 +64,35 @@ def create_app() -> FastAPI:
     #     allowed_hosts=settings.CORS_ORIGINS,
     # )
 
-    # 3. Compression (Performance optimization)
-    app.add_middleware(GZipMiddleware, minimum_size=15000, compresslevel=6)
-
-    # 4. Timeout (Prevent hanging requests)
-    app.add_middleware(TimeoutMiddleware, timeout_seconds=30) # pyright: ignore[reportArgumentType]
-
-    # 5. Metrics collection (Monitor all requests)
-    app.add_middleware(MetricsMiddleware, project_name="langchain-fastapi") # pyright: ignore[reportArgumentType]
+    # 3. Compression (zstd/br/gzip, negotiated per request)
+    app.add_middleware(
+        CompressionMiddleware,  # pyright: ignore[reportArgumentType]
+        minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+        encodings=settings.COMPRESSION_ENCODINGS,
+    )
 
-    # ============================================================================
-    # CUSTOM MIDDLEWARES (Using decorator style for better performance)
-    # ============================================================================
+    # 4. Timeout (Prevent hanging requests; sets the deadline downstream calls share)
+    app.add_middleware(
+        TimeoutMiddleware,  # pyright: ignore[reportArgumentType]
+        timeout_seconds=settings.REQUEST_TIMEOUT_SECONDS,
+        routes=settings.REQUEST_TIMEOUT_ROUTES,
+    )
 
-    # 6. Security headers (Execute early)
-    @app.middleware("http")
-    async def add_security_headers(request: Request, call_next):
-        return await create_security_headers_middleware(request, call_next)
+    # 5. Rate limiting (inside ServerMiddleware, so 429s are counted)
+    if settings.RATE_LIMIT_ENABLED:
+        app.add_middleware(
+            RateLimitMiddleware,  # pyright: ignore[reportArgumentType]
+            limit=settings.RATE_LIMIT_REQUESTS,
+            period=settings.RATE_LIMIT_PERIOD,
+            routes=settings.RATE_LIMIT_ROUTES,
+            lease_size=settings.RATE_LIMIT_LEASE_SIZE,
+            lease_seconds=settings.RATE_LIMIT_LEASE_SECONDS,
+            client_ip_header=settings.RATE_LIMIT_CLIENT_IP_HEADER,
+            trusted_proxies=settings.RATE_LIMIT_TRUSTED_PROXIES,
+        )
 
-    # 7. Correlation ID (For distributed tracing)
-    @app.middleware("http")
-    async def add_correlation_id(request: Request, call_next):
-        return await correlation_middleware(request, call_next)
+    # 6. Correlation ID, security headers, timing and metrics in one pass
+    app.add_middleware(ServerMiddleware, project_name="langchain-fastapi") # pyright: ignore[reportArgumentType]
 
     # ============================================================================
     # EXCEPTION HANDLERS (Register after middleware, before routes)
@@ -114,6 +123,7 @@ def create_app() -> FastAPI:
     app.include_router(auth_router)
     app.include_router(search_router)
     app.include_router(route_router)
+    app.include_router(leaderboard_router)
 
     # 404 handler (Catch-all route)
     @app.api_route(
@@ -121,22 +131,9 @@ def create_app() -> FastAPI:
         methods=["GET", "POST", "PUT", "DELETE", "PATCH"],
         include_in_schema=False,
     )
-    async def catch_all(request: Request, path_name: str) -> ORJSONResponse:
+    async def catch_all(request: Request, path_name: str) -> Response:
         """Handle 404 errors for undefined routes."""
-        correlation_id = getattr(request.state, "correlation_id", "unknown")
-        logger.warning(
-            f"[{correlation_id}] 404 Not Found: {request.method} {request.url.path} {path_name}"
-        )
-
-        return ORJSONResponse(
-            status_code=404,
-            content={
-                "error": "Not Found",
-                "message": f"Can't find {request.url.path} on this server",
-                "path": request.url.path,
-                "correlation_id": correlation_id,
-            },
-        )
+        return not_found(request)
 
     return app
 
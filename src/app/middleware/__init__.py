@@ -2,18 +2,14 @@
 
 from .global_exception_handler import global_exception_handler
 from .server_middleware import (
-    MetricsMiddleware,
+    ServerMiddleware,
     TimeoutMiddleware,
-    correlation_middleware,
-    create_security_headers_middleware,
     get_metrics,
 )
 
 __all__ = [
-    "MetricsMiddleware",
+    "ServerMiddleware",
     "TimeoutMiddleware",
-    "correlation_middleware",
-    "create_security_headers_middleware",
     "get_metrics",
     "global_exception_handler",
 ]
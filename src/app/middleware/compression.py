@@ -0,0 +1,305 @@
+"""
+Negotiated response compression (zstd, br, gzip) as pure ASGI middleware.
+
+The encoding is the client's highest-q choice from Accept-Encoding, ties
+broken by server preference (zstd > br > gzip by default). zstd and br need
+the `compression` extra and are only offered when installed.
+
+Only compressible content types are touched (text/*, JSON, XML, GeoJSON,
+NDJSON...). The level depends on the payload: small bodies get a high level
+(cheap anyway), large ones a low level so CPU stays bounded, see LEVELS.
+Single-chunk bodies are compressed in one shot (on a worker thread when
+large); streamed bodies (StreamingResponse) are compressed chunk by chunk
+without buffering.
+
+Responses that already carry Content-Encoding pass through untouched;
+PrecompressedResponse uses that to serve cached bodies compressed once per
+encoding at high levels, negotiated from the same COMPRESSION_ENCODINGS and
+COMPRESSION_MINIMUM_SIZE settings the middleware is configured with.
+"""
+
+import gzip
+import hashlib
+import zlib
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from functools import lru_cache
+
+import anyio
+from fastapi.responses import Response
+
+from app.config.settings import get_settings
+
+try:
+    import zstandard
+except ImportError:  # optional: pip install .[compression]
+    zstandard = None
+
+try:
+    import brotli
+except ImportError:  # optional: pip install .[compression]
+    brotli = None
+
+ENCODINGS = tuple(
+    name
+    for name, module in (("zstd", zstandard), ("br", brotli), ("gzip", gzip))
+    if module is not None
+)
+
+# Upper body size (None: unbounded) -> level per encoding; first row that fits.
+# Streamed bodies have unknown size and use the last row.
+# Picked from tests/performance/bench_compression.py: past ~64 KB, higher
+# levels cost 2-5x the CPU for a few percent of size.
+LEVELS = (
+    (64 * 1024, {"zstd": 6, "br": 5, "gzip": 6}),
+    (1024 * 1024, {"zstd": 1, "br": 2, "gzip": 4}),
+    (None, {"zstd": 1, "br": 1, "gzip": 2}),
+)
+# Bodies compressed once and reused can afford slower settings (br 11 and
+# zstd 19 cost seconds per MB, too much even once)
+PRECOMPRESSED_LEVELS = {"zstd": 12, "br": 9, "gzip": 9}
+
+# One-shot bodies from this size are compressed off the event loop (all three
+# libraries release the GIL)
+THREAD_THRESHOLD = 256 * 1024
+
+COMPRESSIBLE_TYPES = frozenset(
+    {
+        "application/json",
+        "application/geo+json",
+        "application/x-ndjson",
+        "application/javascript",
+        "application/xml",
+        "image/svg+xml",
+    }
+)
+
+
+def is_compressible(content_type: str) -> bool:
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    return (
+        media_type.startswith("text/")
+        or media_type in COMPRESSIBLE_TYPES
+        or media_type.endswith(("+json", "+xml"))
+    )
+
+
+@lru_cache(maxsize=256)
+def negotiate(accept_encoding: str, available: tuple[str, ...] = ENCODINGS) -> str | None:
+    """Pick an encoding from an Accept-Encoding value, or None for identity."""
+    weights: dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.partition(";")
+        name = name.strip()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name] = q
+
+    wildcard = weights.get("*", 0.0)
+    best, best_q = None, 0.0
+    for encoding in available:
+        q = weights.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def level_for(encoding: str, size: int | None) -> int:
+    for limit, levels in LEVELS:
+        if limit is not None and size is not None and size <= limit:
+            return levels[encoding]
+    return LEVELS[-1][1][encoding]
+
+
+def compress(body: bytes, encoding: str, level: int) -> bytes:
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=level).compress(body)
+    if encoding == "br":
+        return brotli.compress(body, quality=level, mode=brotli.MODE_TEXT)
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+class _StreamCompressor:
+    """Incremental compressor with one compress(chunk)/finish() interface."""
+
+    def __init__(self, encoding: str, level: int):
+        if encoding == "zstd":
+            self._obj = zstandard.ZstdCompressor(level=level).compressobj()
+            self.compress = self._obj.compress
+            self.finish = self._obj.flush
+        elif encoding == "br":
+            self._obj = brotli.Compressor(quality=level, mode=brotli.MODE_TEXT)
+            self.compress = self._obj.process
+            self.finish = self._obj.finish
+        else:
+            # wbits=31: gzip container
+            self._obj = zlib.compressobj(level, zlib.DEFLATED, 31)
+            self.compress = self._obj.compress
+            self.finish = self._obj.flush
+
+
+def available_encodings(encodings: tuple[str, ...] | list[str]) -> tuple[str, ...]:
+    """Server preference order, limited to what is installed."""
+    return tuple(e for e in encodings if e in ENCODINGS)
+
+
+def _header(headers: list, name: bytes) -> bytes | None:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+def _add_vary(headers: list) -> list:
+    for i, (key, value) in enumerate(headers):
+        if key.lower() == b"vary":
+            if b"accept-encoding" not in value.lower():
+                headers[i] = (key, value + b", Accept-Encoding")
+            return headers
+    headers.append((b"vary", b"Accept-Encoding"))
+    return headers
+
+
+class CompressionMiddleware:
+    """Pure ASGI middleware compressing responses with the negotiated encoding."""
+
+    def __init__(
+        self,
+        app: Callable[[dict, Callable, Callable], Awaitable],
+        minimum_size: int = 1024,
+        encodings: tuple[str, ...] | list[str] = ENCODINGS,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encodings = available_encodings(encodings)
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
+        """ASGI interface."""
+        if scope["type"] != "http" or not self.encodings:
+            await self.app(scope, receive, send)
+            return
+
+        accept = _header(scope["headers"], b"accept-encoding")
+        encoding = negotiate(accept.decode("latin-1"), self.encodings) if accept else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: dict | None = None
+        compressor: _StreamCompressor | None = None
+        passthrough = False
+
+        async def send_wrapper(message: dict) -> None:
+            nonlocal start_message, compressor, passthrough
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", ()))
+                content_type = _header(headers, b"content-type")
+                if (
+                    message["status"] < 200
+                    or message["status"] in (204, 304)
+                    or _header(headers, b"content-encoding") is not None
+                    or content_type is None
+                    or not is_compressible(content_type.decode("latin-1"))
+                ):
+                    passthrough = True
+                    await send(message)
+                    return
+                message["headers"] = _add_vary(headers)
+                # Wait for the first body chunk to decide how to compress
+                start_message = message
+                return
+
+            if message["type"] != "http.response.body" or passthrough:
+                if start_message is not None:
+                    # e.g. http.response.pathsend: nothing for us to compress
+                    start, start_message = start_message, None
+                    await send(start)
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if start_message is not None:
+                start, start_message = start_message, None
+                headers = start["headers"]
+
+                if not more_body:
+                    # Whole body in one message
+                    if len(body) >= self.minimum_size:
+                        level = level_for(encoding, len(body))
+                        if len(body) >= THREAD_THRESHOLD:
+                            body = await anyio.to_thread.run_sync(compress, body, encoding, level)
+                        else:
+                            body = compress(body, encoding, level)
+                        headers = [h for h in headers if h[0].lower() != b"content-length"]
+                        headers.append((b"content-encoding", encoding.encode()))
+                        headers.append((b"content-length", str(len(body)).encode()))
+                        start["headers"] = headers
+                    await send(start)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+
+                compressor = _StreamCompressor(encoding, level_for(encoding, None))
+                headers = [h for h in headers if h[0].lower() != b"content-length"]
+                headers.append((b"content-encoding", encoding.encode()))
+                start["headers"] = headers
+                await send(start)
+
+            if compressor is None:
+                await send(message)
+                return
+            data = compressor.compress(body) if body else b""
+            if not more_body:
+                data += compressor.finish()
+            if data or not more_body:
+                await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
+
+
+class PrecompressedResponse(Response):
+    """
+    Response whose body is compressed once per encoding and then reused.
+
+    For bodies served many times unchanged (cached JSON): variants are kept
+    in a small LRU keyed by a digest of the body, at PRECOMPRESSED_LEVELS,
+    so repeat requests pay for a hash instead of a compression. The
+    middleware sees Content-Encoding and leaves the response alone.
+    """
+
+    maxsize = 256
+    _variants: OrderedDict[tuple[bytes, str], bytes] = OrderedDict()
+    # Same configuration as CompressionMiddleware in main.py
+    encodings = available_encodings(get_settings().COMPRESSION_ENCODINGS)
+    minimum_size = get_settings().COMPRESSION_MINIMUM_SIZE
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
+        accept = _header(scope["headers"], b"accept-encoding")
+        encoding = None
+        if accept and self.encodings:
+            encoding = negotiate(accept.decode("latin-1"), self.encodings)
+        if encoding is not None and len(self.body) >= self.minimum_size:
+            key = (hashlib.blake2b(self.body, digest_size=16).digest(), encoding)
+            variant = self._variants.get(key)
+            if variant is None:
+                variant = await anyio.to_thread.run_sync(
+                    compress, self.body, encoding, PRECOMPRESSED_LEVELS[encoding]
+                )
+                self._variants[key] = variant
+                if len(self._variants) > self.maxsize:
+                    self._variants.popitem(last=False)
+            else:
+                self._variants.move_to_end(key)
+            self.body = variant
+            self.headers["content-encoding"] = encoding
+            self.headers["content-length"] = str(len(variant))
+        self.headers["vary"] = "Accept-Encoding"
+        await super().__call__(scope, receive, send)
@@ -1,33 +1,128 @@
 import traceback
+from functools import lru_cache
+from typing import Any
 
+import orjson
 from fastapi import Request, status
-from fastapi.exceptions import HTTPException, RequestValidationError
-from fastapi.responses import ORJSONResponse
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import ORJSONResponse, Response
+from starlette.exceptions import HTTPException
 
 from app.config.settings import get_settings
+from app.middleware.server_middleware import _endpoint_label
 from app.utils.exceptions import APIException
+from app.utils.log_sampling import LogSampler
 from app.utils.logger import logger
 
+settings = get_settings()
 
-async def global_exception_handler(request: Request, exc: Exception) -> ORJSONResponse:
-    """
-    Unified exception handler for all errors.
-    Handles: APIException, RequestValidationError, HTTPException, and unexpected errors.
-    """
-    settings = get_settings()
-    correlation_id = getattr(request.state, "correlation_id", "unknown")
-    is_production = settings.ENVIRONMENT == "production"
+# 4xx logs (the catch-all 404): repeats of the same error on the same route are
+# logged once per window, and new ones at a bounded rate, so scans can't flood
+# the logs
+client_error_sampler = LogSampler(
+    rate=settings.ERROR_LOG_RATE,
+    burst=settings.ERROR_LOG_BURST,
+    window=settings.ERROR_LOG_DEDUPE_SECONDS,
+)
 
-    # Build base request info (reused across all error types)
+
+@lru_cache(maxsize=512)
+def _rendered_error(name: str, status_code: int, message: str) -> bytes:
+    """Error body minus "request" and the closing brace, rendered once per error."""
+    body = orjson.dumps(
+        {
+            "name": name,
+            "success": False,
+            "statusCode": status_code,
+            "message": message,
+            "data": None,
+        }
+    )
+    return body[:-1]
+
+
+def _request_info(request: Request, is_production: bool) -> dict[str, Any]:
+    # Built from the scope: request.url would parse and rebuild the full URL
+    scope = request.scope
+    url = scope["path"]
+    if scope["query_string"]:
+        url = f"{url}?{scope['query_string'].decode('latin-1')}"
     request_info = {
-        "method": request.method,
-        "url": str(request.url),
-        "correlationId": correlation_id,
+        "method": scope["method"],
+        "url": url,
+        "correlationId": getattr(request.state, "correlation_id", "unknown"),
     }
-    
     # Include IP only in non-production
     if not is_production and request.client:
         request_info["ip"] = request.client.host
+    return request_info
+
+
+def _log_error(
+    request: Request,
+    request_info: dict[str, Any],
+    status_code: int,
+    name: str,
+    message: str,
+    exc: Exception | None = None,
+) -> None:
+    context = {"status_code": status_code, "method": request_info["method"], "url": request_info["url"]}
+    if status_code < 500:
+        key = (status_code, name, request_info["method"], _endpoint_label(request.scope), message)
+        sampled = client_error_sampler.sample(key)
+        if sampled is None:
+            return
+        duplicates, rate_limited = sampled
+        if duplicates:
+            context["suppressed_duplicates"] = duplicates
+        if rate_limited:
+            context["suppressed_rate_limited"] = rate_limited
+        log = logger.bind(**context).warning
+    else:
+        # Loguru formats the traceback only if the line is actually written
+        log = logger.bind(**context).opt(exception=exc).error
+    log(f"[{request_info['correlationId']}] {name}: {message}")
+
+
+def not_found(request: Request) -> Response:
+    """Body for the catch-all route, with a sampled log line instead of one per hit."""
+    request_info = _request_info(request, settings.ENVIRONMENT == "production")
+    _log_error(request, request_info, 404, "NotFound", "Route not found")
+    path = request.scope["path"]
+    body = orjson.dumps(
+        {
+            "error": "Not Found",
+            "message": f"Can't find {path} on this server",
+            "path": path,
+            "correlation_id": request_info["correlationId"],
+        }
+    )
+    return Response(body, status_code=404, media_type="application/json")
+
+
+async def global_exception_handler(request: Request, exc: Exception) -> Response:
+    """
+    Unified exception handler for all errors.
+    Handles: APIException, RequestValidationError, HTTPException, and unexpected errors.
+    """
+    is_production = settings.ENVIRONMENT == "production"
+    request_info = _request_info(request, is_production)
+
+    # Common case in production: an unexpected error has a fixed body apart
+    # from the request info, rendered once per exception type
+    if is_production and not isinstance(exc, (HTTPException, RequestValidationError)):
+        name = type(exc).__name__
+        message = "An unexpected error occurred"
+        _log_error(request, request_info, status.HTTP_500_INTERNAL_SERVER_ERROR, name, message, exc)
+        body = (
+            _rendered_error(name, status.HTTP_500_INTERNAL_SERVER_ERROR, message)
+            + b',"request":'
+            + orjson.dumps(request_info)
+            + b"}"
+        )
+        return Response(body, status_code=500, media_type="application/json")
+
+    headers = None
 
     # Determine error type and build error response
     if isinstance(exc, APIException):
@@ -40,12 +135,11 @@ async def global_exception_handler(request: Request, exc: Exception) -> ORJSONRe
             "message": exc.message,
             "data": exc.data,
         }
-        
+        headers = exc.headers
+
         # Add trace for 5xx errors in non-production
         if exc.status_code >= 500 and not is_production:
-            error_obj["trace"] = traceback.format_exc()
-            
-        log_level = "error" if exc.status_code >= 500 else "warning"
+            error_obj["trace"] = "".join(traceback.format_exception(exc))
 
     elif isinstance(exc, RequestValidationError):
         # Pydantic validation errors (422)
@@ -66,10 +160,9 @@ async def global_exception_handler(request: Request, exc: Exception) -> ORJSONRe
             "message": "Validation failed",
             "data": {"errors": errors},
         }
-        log_level = "warning"
 
     elif isinstance(exc, HTTPException):
-        # FastAPI HTTP exceptions
+        # FastAPI/Starlette HTTP exceptions
         error_obj = {
             "name": "HTTPException",
             "success": False,
@@ -78,7 +171,7 @@ async def global_exception_handler(request: Request, exc: Exception) -> ORJSONRe
             "message": exc.detail if isinstance(exc.detail, str) else "HTTP error",
             "data": exc.detail if not isinstance(exc.detail, str) else None,
         }
-        log_level = "error" if exc.status_code >= 500 else "warning"
+        headers = exc.headers
 
     else:
         # Unexpected errors (500)
@@ -90,24 +183,24 @@ async def global_exception_handler(request: Request, exc: Exception) -> ORJSONRe
             "message": "An unexpected error occurred" if is_production else str(exc),
             "data": None,
         }
-        
+
         # Add trace in non-production
         if not is_production:
-            error_obj["trace"] = traceback.format_exc()
-            
-        log_level = "error"
-
-    # Log the error with appropriate level
-    log_func = getattr(logger, log_level)
-    log_func(
-        f"[{correlation_id}] {error_obj['name']}: {error_obj['message']}",
-        status_code=error_obj["statusCode"],
-        method=request_info["method"],
-        url=request_info["url"],
+            error_obj["trace"] = "".join(traceback.format_exception(exc))
+
+    # Tracebacks are logged for unexpected errors and APIException 5xx only
+    expected = isinstance(exc, HTTPException) and not isinstance(exc, APIException)
+    _log_error(
+        request,
+        request_info,
+        error_obj["statusCode"],
+        error_obj["name"],
+        error_obj["message"],
+        None if expected else exc,
     )
 
     return ORJSONResponse(
         status_code=error_obj["statusCode"],
         content=error_obj,
+        headers=headers,
     )
-
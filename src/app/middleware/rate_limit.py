@@ -0,0 +1,252 @@
+"""
+GCRA rate limiting as pure ASGI middleware.
+
+Each request is charged to one bucket: the first matching per-route budget
+("POST /api/v1/routes/calculate" -> 10 per 60 s) or the default budget
+(RATE_LIMIT_REQUESTS per RATE_LIMIT_PERIOD), keyed by the caller's user id
+when a valid bearer token is present and by client IP otherwise. Behind a
+proxy, the client IP is read from `client_ip_header` (e.g. X-Forwarded-For),
+taking the entry added by the outermost of `trusted_proxies` proxies;
+without it every anonymous caller shares the proxy's bucket.
+
+Bucket state is one GCRA "theoretical arrival time" per key in Redis, updated
+by an atomic script. To keep Redis off the hot path, a worker that sees a key
+use up its last lease before it expired leases a small batch of tokens and
+serves the next requests from it locally; other keys take one token per
+request, and budgets too small to share sensibly always do, so expensive
+routes stay exact. Leases expire quickly so an idle worker can't hoard
+budget, and tokens left in an expired lease are refunded on the key's next
+Redis call.
+
+Responses carry RateLimit-Limit/-Remaining/-Reset and RateLimit-Policy; 429s
+add Retry-After. If Redis is unavailable, requests are let through.
+"""
+
+import math
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+
+import orjson
+
+from app.features.auth.jwt_backend import TokenError
+from app.features.auth.security import decode_token
+from app.utils.logger import logger
+
+# KEYS: bucket; ARGV: emission interval ms, burst (= limit), tokens wanted,
+# unused tokens to give back first.
+# Returns granted, remaining, ms until the bucket is full, ms until next token
+GCRA_SCRIPT = """
+local interval = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local wanted = tonumber(ARGV[3])
+local refund = tonumber(ARGV[4])
+local clock = redis.call('TIME')
+local now = clock[1] * 1000 + math.floor(clock[2] / 1000)
+
+local tat = tonumber(redis.call('GET', KEYS[1]) or now) - refund * interval
+if tat < now then
+    tat = now
+end
+
+local available = math.floor((now + burst * interval - tat) / interval)
+local granted = math.max(math.min(wanted, available), 0)
+if granted > 0 or refund > 0 then
+    tat = tat + granted * interval
+    if tat > now then
+        redis.call('SET', KEYS[1], tat, 'PX', math.ceil(tat - now))
+    else
+        redis.call('DEL', KEYS[1])
+    end
+end
+
+local retry_after = 0
+if available - granted < 1 then
+    retry_after = tat - now - (burst - 1) * interval
+end
+return {granted, available - granted, math.ceil(tat - now), math.ceil(retry_after)}
+"""
+
+EXEMPT_PREFIXES = ("/api/v1/health", "/metrics")
+
+
+class Budget:
+    __slots__ = ("name", "limit", "period", "interval_ms", "lease_size")
+
+    def __init__(self, name: str, limit: int, period: int, lease_size: int):
+        self.name = name
+        self.limit = limit
+        self.period = period
+        self.interval_ms = period * 1000 / limit
+        # Lease at most 5% of the budget so workers can't starve each other
+        self.lease_size = max(1, min(lease_size, limit // 20))
+
+
+class _Lease:
+    __slots__ = ("tokens", "remaining", "reset_at", "expires_at")
+
+    def __init__(self, tokens: int, remaining: int, reset_at: float, expires_at: float):
+        self.tokens = tokens
+        self.remaining = remaining
+        self.reset_at = reset_at
+        self.expires_at = expires_at
+
+
+class RateLimitMiddleware:
+    """Pure ASGI middleware enforcing GCRA budgets stored in Redis."""
+
+    def __init__(
+        self,
+        app: Callable[[dict, Callable, Callable], Awaitable],
+        *,
+        limit: int,
+        period: int,
+        routes: dict[str, tuple[int, int]] | None = None,
+        lease_size: int = 5,
+        lease_seconds: float = 1.0,
+        max_leases: int = 10000,
+        prefix: str = "ratelimit",
+        client_ip_header: str | None = None,
+        trusted_proxies: int = 1,
+    ):
+        self.app = app
+        self.default = Budget("default", limit, period, lease_size)
+        # "METHOD /path/prefix" -> Budget, longest prefix first
+        self.routes = []
+        for rule, (route_limit, route_period) in (routes or {}).items():
+            method, path = rule.split(" ", 1)
+            budget = Budget(rule, route_limit, route_period, lease_size)
+            self.routes.append((method.upper(), path, budget))
+        self.routes.sort(key=lambda route: len(route[1]), reverse=True)
+        self.lease_seconds = lease_seconds
+        self.max_leases = max_leases
+        self.prefix = prefix
+        self.client_ip_header = client_ip_header.lower().encode() if client_ip_header else None
+        self.trusted_proxies = max(1, trusted_proxies)
+        self._leases: OrderedDict[str, _Lease] = OrderedDict()
+        self._script = None
+
+    def _budget(self, method: str, path: str) -> Budget:
+        for route_method, route_path, budget in self.routes:
+            if method == route_method and path.startswith(route_path):
+                return budget
+        return self.default
+
+    def _identity(self, scope: dict) -> str:
+        forwarded = None
+        for name, value in scope.get("headers", ()):
+            if name == b"authorization":
+                scheme, _, token = value.decode("latin-1").partition(" ")
+                if scheme.lower() == "bearer" and token:
+                    try:
+                        return f"user:{decode_token(token)['sub']}"
+                    except (TokenError, KeyError):
+                        pass
+            elif name == self.client_ip_header:
+                forwarded = value
+        if forwarded is not None:
+            # Entries left of the one our outermost proxy appended are
+            # client-supplied and can be spoofed
+            hops = [hop.strip() for hop in forwarded.decode("latin-1").split(",")]
+            ip = hops[max(len(hops) - self.trusted_proxies, 0)]
+            if ip:
+                return f"ip:{ip}"
+        client = scope.get("client")
+        return f"ip:{client[0] if client else 'unknown'}"
+
+    async def _acquire(self, scope: dict, key: str, budget: Budget):
+        """Return (allowed, remaining, reset seconds, retry-after seconds)."""
+        key = f"{self.prefix}:{budget.name}:{key}"
+        now = time.monotonic()
+        lease = self._leases.get(key)
+        if lease is not None and lease.tokens > 0 and lease.expires_at > now:
+            lease.tokens -= 1
+            self._leases.move_to_end(key)
+            return True, lease.remaining + lease.tokens, lease.reset_at - now, 0.0
+
+        redis = getattr(scope["app"].state, "redis", None)
+        if redis is None:
+            return True, budget.limit, 0.0, 0.0
+        if self._script is None:
+            self._script = redis.register_script(GCRA_SCRIPT)
+
+        refund, wanted = 0, 1
+        if lease is not None:
+            if lease.expires_at > now:
+                # Used up a lease within its lifetime: busy enough to batch
+                wanted = budget.lease_size
+            else:
+                refund = lease.tokens
+        try:
+            granted, remaining, reset_ms, retry_ms = await self._script(
+                keys=[key],
+                args=[budget.interval_ms, budget.limit, wanted, refund],
+            )
+        except Exception as e:
+            logger.warning(f"Rate limiter unavailable, allowing request: {e}")
+            return True, budget.limit, 0.0, 0.0
+
+        granted, remaining = int(granted), max(int(remaining), 0)
+        reset = int(reset_ms) / 1000
+        if granted == 0:
+            self._leases.pop(key, None)
+            return False, 0, reset, int(retry_ms) / 1000
+
+        self._leases[key] = _Lease(granted - 1, remaining, now + reset, now + self.lease_seconds)
+        self._leases.move_to_end(key)
+        if len(self._leases) > self.max_leases:
+            self._leases.popitem(last=False)
+        return True, remaining + granted - 1, reset, 0.0
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
+        """ASGI interface."""
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        if path.startswith(EXEMPT_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        budget = self._budget(scope["method"], path)
+        identity = self._identity(scope)
+        allowed, remaining, reset, retry_after = await self._acquire(scope, identity, budget)
+
+        headers = [
+            (b"ratelimit-limit", str(budget.limit).encode()),
+            (b"ratelimit-remaining", str(remaining).encode()),
+            (b"ratelimit-reset", str(math.ceil(reset)).encode()),
+            (b"ratelimit-policy", f"{budget.limit};w={budget.period}".encode()),
+        ]
+
+        if not allowed:
+            retry = str(max(math.ceil(retry_after), 1)).encode()
+            body = orjson.dumps(
+                {
+                    "error": "Too Many Requests",
+                    "message": "Rate limit exceeded, retry later",
+                    "path": path,
+                }
+            )
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": 429,
+                    "headers": [
+                        (b"content-type", b"application/json"),
+                        (b"content-length", str(len(body)).encode()),
+                        (b"retry-after", retry),
+                        *headers,
+                    ],
+                }
+            )
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        async def send_wrapper(message: dict) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), *headers]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -1,9 +1,12 @@
 import asyncio
+import os
+import re
 import time
 from collections.abc import Awaitable, Callable
 from contextvars import ContextVar
 
-from fastapi import Request, Response
+import psutil
+import pymongo
 from fastapi.responses import ORJSONResponse
 from nanoid import generate
 from prometheus_client import (
@@ -13,15 +16,23 @@ from prometheus_client import (
     Gauge,
     Histogram,
     generate_latest,
+    multiprocess,
 )
+from pymongo.errors import PyMongoError
 
+from app.utils.deadline import DeadlineExceededError, request_deadline
 from app.utils.logger import logger
+from app.utils.metrics import metrics_registry
 
 # Context variable for correlation ID (thread-safe)
 correlation_id_var: ContextVar[str] = ContextVar("correlation_id", default="")
 
-# Prometheus metrics registry
-metrics_registry = CollectorRegistry()
+# Multi-worker mode: when set before prometheus_client is imported, metric
+# values live in per-process mmap files in this directory and /metrics merges
+# them. Gauges declare how worker values combine (multiprocess_mode); "live*"
+# modes drop a worker's values once it is marked dead.
+MULTIPROC_DIR_ENV = "PROMETHEUS_MULTIPROC_DIR"
+_LIVE_GAUGE_FILE = re.compile(r"^gauge_live\w+_(\d+)\.db$")
 
 # Metrics
 http_requests_total = Counter(
@@ -42,54 +53,67 @@ http_request_duration_seconds = Histogram(
 http_requests_in_progress = Gauge(
     "http_requests_in_progress",
     "HTTP requests in progress",
-    ["method", "endpoint", "project"],
+    ["method", "project"],
+    multiprocess_mode="livesum",
     registry=metrics_registry,
 )
 
 app_up = Gauge(
-    "app_up", "Application up status", ["project"], registry=metrics_registry
+    "app_up",
+    "Application up status",
+    ["project"],
+    multiprocess_mode="livemax",
+    registry=metrics_registry,
 )
 
 
-def _normalize_path(path: str) -> str:
+UNMATCHED_ENDPOINT = "unmatched"
+
+
+def _endpoint_label(scope: dict) -> str:
     """
-    Normalize path for metrics to avoid high cardinality.
-    Converts /users/123 -> /users/{id}
+    Route template the router matched, e.g. /api/v1/searches/{search_id}.
+
+    Requests no route claimed, or that only hit a `{...:path}` catch-all
+    (scanners, typos), share one "unmatched" label so arbitrary paths can't
+    grow the series count.
     """
-    # Skip normalization for common paths
-    if path in {"/", "/health", "/metrics", "/docs", "/redoc", "/openapi.json"}:
-        return path
-    
-    # Simple normalization: replace UUIDs and numeric IDs
-    parts = path.split("/")
-    normalized = []
-    for part in parts:
-        if part.isdigit() or (len(part) == 36 and part.count("-") == 4):  # UUID
-            normalized.append("{id}")
-        else:
-            normalized.append(part)
-    
-    return "/".join(normalized)
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    if path is None or path.endswith(":path}"):
+        return UNMATCHED_ENDPOINT
+    return path
 
 
-async def correlation_middleware(request: Request, call_next: Callable) -> Response:
-    """Add correlation ID to requests for distributed tracing."""
-    # Check if correlation ID already exists (from upstream service)
-    correlation_id = request.headers.get("X-Correlation-ID") or generate(size=21)
-    
-    correlation_id_var.set(correlation_id)
-    request.state.correlation_id = correlation_id
+# Security headers (OWASP recommended), pre-encoded once
+SECURITY_HEADERS = (
+    (b"x-content-type-options", b"nosniff"),
+    (b"x-frame-options", b"DENY"),
+    (b"x-xss-protection", b"1; mode=block"),
+    (b"strict-transport-security", b"max-age=31536000; includeSubDomains; preload"),
+    (b"referrer-policy", b"strict-origin-when-cross-origin"),
+    (
+        b"permissions-policy",
+        b"geolocation=(), microphone=(), camera=(), payment=(), usb=(), magnetometer=()",
+    ),
+)
+
 
-    # Bind correlation_id to logger context for this request
-    with logger.contextualize(correlation_id=correlation_id, path=request.url.path, method=request.method):
-        response = await call_next(request)
-        response.headers["X-Correlation-ID"] = correlation_id
-        return response
+class ServerMiddleware:
+    """
+    Pure ASGI middleware for per-request plumbing, in one pass:
 
+    - correlation ID: reuses X-Correlation-ID from upstream or generates one,
+      exposes it via correlation_id_var, request.state and the logger context,
+      and echoes it on the response
+    - security headers
+    - X-Process-Time
+    - Prometheus request metrics (skipped for /metrics itself)
+
+    Replaces separate @app.middleware("http") layers, each of which wrapped
+    the request in its own task and response stream adapters.
+    """
 
-class MetricsMiddleware:
-    """Pure ASGI middleware for Prometheus metrics."""
-    
     def __init__(
         self,
         app: Callable[[dict, Callable, Callable], Awaitable],
@@ -97,146 +121,256 @@ class MetricsMiddleware:
     ):
         self.app = app
         self.project_name = project_name
+        # Labelled children, so steady-state requests skip .labels() lookups
+        self._in_progress: dict[str, Gauge] = {}
+        self._observers: dict[tuple[str, str, int], tuple[Counter, Histogram]] = {}
         # Set app up status on creation
         app_up.labels(project=project_name).set(1)
-    
+
+    def _in_progress_gauge(self, method: str) -> Gauge:
+        gauge = self._in_progress.get(method)
+        if gauge is None:
+            gauge = self._in_progress[method] = http_requests_in_progress.labels(
+                method=method, project=self.project_name
+            )
+        return gauge
+
+    def _observe(self, method: str, endpoint: str, status_code: int, duration: float) -> None:
+        key = (method, endpoint, status_code)
+        children = self._observers.get(key)
+        if children is None:
+            labels = {
+                "method": method,
+                "endpoint": endpoint,
+                "status_code": status_code,
+                "project": self.project_name,
+            }
+            children = self._observers[key] = (
+                http_requests_total.labels(**labels),
+                http_request_duration_seconds.labels(**labels),
+            )
+        total, duration_histogram = children
+        total.inc()
+        duration_histogram.observe(duration)
+
     async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
         """ASGI interface."""
         if scope["type"] != "http":
             await self.app(scope, receive, send)
             return
-        
-        # Skip metrics endpoint to avoid infinite loop
-        path = scope["path"]
-        if path == "/metrics":
-            await self.app(scope, receive, send)
-            return
-        
-        method = scope["method"]
-        endpoint = _normalize_path(path)
-        
-        # Track in-progress requests
-        http_requests_in_progress.labels(
-            method=method, endpoint=endpoint, project=self.project_name
-        ).inc()
-        
+
         start_time = time.perf_counter()
+        method = scope["method"]
+        path = scope["path"]
+
+        # Check if correlation ID already exists (from upstream service)
+        correlation_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-correlation-id":
+                correlation_id = value.decode("latin-1")
+                break
+        correlation_id = correlation_id or generate(size=21)
+        scope.setdefault("state", {})["correlation_id"] = correlation_id
+        context_token = correlation_id_var.set(correlation_id)
+        response_headers = (
+            *SECURITY_HEADERS,
+            (b"x-correlation-id", correlation_id.encode("latin-1")),
+        )
+
+        # Skip metrics endpoint to avoid infinite loop
+        in_progress = None
+        if path != "/metrics":
+            # The route (and so the endpoint label) is only known after routing
+            in_progress = self._in_progress_gauge(method)
+            in_progress.inc()
         status_code = 500  # Default to 500 in case of exception
-        
+
         async def send_wrapper(message: dict) -> None:
-            """Wrapper to capture status code and add headers."""
             nonlocal status_code
-            
             if message["type"] == "http.response.start":
                 status_code = message["status"]
-                
-                # Add process time header
                 process_time = time.perf_counter() - start_time
-                headers = list(message.get("headers", []))
-                headers.append((b"x-process-time", f"{process_time:.3f}".encode()))
-                message["headers"] = headers
-            
+                message["headers"] = [
+                    *message.get("headers", ()),
+                    *response_headers,
+                    (b"x-process-time", f"{process_time:.3f}".encode()),
+                ]
             await send(message)
-        
+
         try:
-            await self.app(scope, receive, send_wrapper)
+            # Bind correlation_id to logger context for this request
+            with logger.contextualize(correlation_id=correlation_id, path=path, method=method):
+                await self.app(scope, receive, send_wrapper)
         finally:
-            duration = time.perf_counter() - start_time
-            
-            # Record metrics
-            http_requests_total.labels(
-                method=method,
-                endpoint=endpoint,
-                status_code=status_code,
-                project=self.project_name,
-            ).inc()
-            
-            http_request_duration_seconds.labels(
-                method=method,
-                endpoint=endpoint,
-                status_code=status_code,
-                project=self.project_name,
-            ).observe(duration)
-            
-            # Decrement in-progress
-            http_requests_in_progress.labels(
-                method=method, endpoint=endpoint, project=self.project_name
-            ).dec()
+            if in_progress is not None:
+                self._observe(
+                    method,
+                    _endpoint_label(scope),
+                    status_code,
+                    time.perf_counter() - start_time,
+                )
+                in_progress.dec()
+            correlation_id_var.reset(context_token)
+
+
+# Headroom for the hard stop over the deadline, so a dependency that hits the
+# deadline can raise its own timeout (and be named) before the request is
+# cancelled outright.
+DEADLINE_GRACE_SECONDS = 0.25
 
 
 class TimeoutMiddleware:
-    """Pure ASGI middleware for request timeouts."""
-    
+    """
+    Pure ASGI middleware giving each request a deadline.
+
+    The budget is the first matching per-route entry ("GET /api/v1/searches/export"
+    -> 600) or timeout_seconds. It is published as the request deadline
+    (app.utils.deadline) and as pymongo's operation timeout, so Mapbox calls,
+    Redis commands and Mongo queries (as maxTimeMS) get whatever is left
+    instead of their own fixed timeouts.
+
+    If a dependency runs the budget out the response is a 504 naming it in
+    "dependency" and X-Deadline-Exceeded-By; if the request's own work does,
+    a 408 as before.
+    """
+
     def __init__(
         self,
         app: Callable[[dict, Callable, Callable], Awaitable],
-        timeout_seconds: int = 30,
+        timeout_seconds: float = 30,
+        routes: dict[str, float] | None = None,
     ):
         self.app = app
         self.timeout_seconds = timeout_seconds
-    
+        # "METHOD /path/prefix" -> seconds, longest prefix first
+        self.routes = []
+        for rule, seconds in (routes or {}).items():
+            method, path = rule.split(" ", 1)
+            self.routes.append((method.upper(), path, seconds))
+        self.routes.sort(key=lambda route: len(route[1]), reverse=True)
+
+    def _budget(self, method: str, path: str) -> float:
+        for route_method, route_path, seconds in self.routes:
+            if method == route_method and path.startswith(route_path):
+                return seconds
+        return self.timeout_seconds
+
     async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
         """ASGI interface."""
         if scope["type"] != "http":
             await self.app(scope, receive, send)
             return
-        
-        try:
-            await asyncio.wait_for(
-                self.app(scope, receive, send),
-                timeout=self.timeout_seconds,
-            )
-        except asyncio.TimeoutError:
-            # Get correlation ID from scope if available
-            correlation_id = "unknown"
-            for key, value in scope.get("headers", []):
-                if key == b"x-correlation-id":
-                    correlation_id = value.decode()
-                    break
-            
-            path = scope["path"]
-            method = scope["method"]
-            
-            logger.error(
-                f"[{correlation_id}] Request timeout: {method} {path} "
-                f"exceeded {self.timeout_seconds}s"
+
+        path = scope["path"]
+        method = scope["method"]
+        budget = self._budget(method, path)
+        response_started = False
+
+        async def send_wrapper(message: dict) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        with request_deadline(budget) as deadline, pymongo.timeout(budget):
+            try:
+                async with asyncio.timeout(budget + DEADLINE_GRACE_SECONDS):
+                    await self.app(scope, receive, send_wrapper)
+                return
+            except DeadlineExceededError as e:
+                dependency = e.dependency
+            except PyMongoError as e:
+                # Only timeouts caused by the deadline, not e.g. server selection
+                if not e.timeout or deadline.remaining() > DEADLINE_GRACE_SECONDS:
+                    raise
+                dependency = "mongodb"
+            except TimeoutError:
+                dependency = deadline.exceeded_by
+
+        correlation_id = correlation_id_var.get() or "unknown"
+        logger.error(
+            f"[{correlation_id}] Request timeout: {method} {path} "
+            f"exceeded {budget}s" + (f" waiting on {dependency}" if dependency else "")
+        )
+        if response_started:
+            # Headers are already out; all we can do is stop the stream
+            return
+
+        if dependency:
+            response = ORJSONResponse(
+                status_code=504,
+                content={
+                    "error": "Gateway Timeout",
+                    "message": f"{dependency} did not respond within the {budget}s request budget",
+                    "dependency": dependency,
+                    "path": path,
+                    "correlationId": correlation_id,
+                },
+                headers={"X-Deadline-Exceeded-By": dependency},
             )
-            
-            # Send timeout response
+        else:
             response = ORJSONResponse(
                 status_code=408,
                 content={
                     "error": "Request Timeout",
-                    "message": f"Request took longer than {self.timeout_seconds} seconds",
+                    "message": f"Request took longer than {budget} seconds",
                     "path": path,
                     "correlationId": correlation_id,
                 },
             )
-            
-            await response(scope, receive, send)
 
+        await response(scope, receive, send)
+
+
+def multiprocess_dir() -> str | None:
+    return os.environ.get(MULTIPROC_DIR_ENV)
 
-async def create_security_headers_middleware(
-    request: Request, call_next: Callable
-) -> Response:
-    """Add security headers to all responses."""
-    response = await call_next(request)
 
-    # Security headers (OWASP recommended)
-    response.headers["X-Content-Type-Options"] = "nosniff"
-    response.headers["X-Frame-Options"] = "DENY"
-    response.headers["X-XSS-Protection"] = "1; mode=block"
-    response.headers["Strict-Transport-Security"] = (
-        "max-age=31536000; includeSubDomains; preload"
-    )
-    response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-    response.headers["Permissions-Policy"] = (
-        "geolocation=(), microphone=(), camera=(), payment=(), usb=(), magnetometer=()"
-    )
+def prepare_multiprocess_metrics(path: str) -> None:
+    """
+    Enable multi-worker metrics for worker processes started after this call.
+
+    Run once in the parent process before workers spawn: it clears value files
+    left by a previous run, so counters restart at zero like the processes do.
+    """
+    path = os.environ.setdefault(MULTIPROC_DIR_ENV, path)
+    os.makedirs(path, exist_ok=True)
+    for name in os.listdir(path):
+        if name.endswith(".db"):
+            os.remove(os.path.join(path, name))
+
 
-    return response
+def mark_worker_dead(pid: int | None = None) -> None:
+    """Drop a worker's live gauge values (in-progress requests, app_up)."""
+    path = multiprocess_dir()
+    if path:
+        multiprocess.mark_process_dead(pid or os.getpid(), path)
+
+
+def cleanup_dead_workers() -> int:
+    """
+    Mark workers that exited without shutting down cleanly (crash, OOM kill)
+    as dead. Their counter and histogram files are kept, since those totals
+    are still part of the cumulative series.
+    """
+    path = multiprocess_dir()
+    if not path:
+        return 0
+    dead = set()
+    for name in os.listdir(path):
+        match = _LIVE_GAUGE_FILE.match(name)
+        if match and not psutil.pid_exists(int(match[1])):
+            dead.add(int(match[1]))
+    for pid in dead:
+        multiprocess.mark_process_dead(pid, path)
+    return len(dead)
 
 
 def get_metrics() -> tuple[bytes, str]:
     """Get Prometheus metrics in text format."""
+    if multiprocess_dir():
+        # Merge every worker's value files, not just this process's
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
     return generate_latest(metrics_registry), CONTENT_TYPE_LATEST
@@ -5,6 +5,7 @@ import uvicorn
 from app.config.settings import get_settings
 from app.lifecycle.signals import setup_signal_handlers
 from app.main import app
+from app.middleware.server_middleware import prepare_multiprocess_metrics
 from app.utils.logger import logger
 
 
@@ -15,6 +16,10 @@ def main() -> None:
 
     logger.info(f"Starting server in {settings.ENVIRONMENT} mode...")
 
+    workers = settings.WORKERS if settings.ENVIRONMENT == "production" else 1
+    if workers > 1:
+        prepare_multiprocess_metrics(settings.METRICS_MULTIPROC_DIR)
+
     uvicorn.run(
         "app.main:app",  # Import string for hot reload
         host=settings.HOST,
@@ -22,7 +27,7 @@ def main() -> None:
         reload=settings.ENVIRONMENT != "production",
         log_config=None,  # Use custom logging
         access_log=False,  # Custom access logging via middleware
-        workers=settings.WORKERS if settings.ENVIRONMENT == "production" else 1,
+        workers=workers,
     )
 
 
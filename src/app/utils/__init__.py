@@ -1,17 +1,19 @@
 """Utility modules for the application."""
 
-from .apiFeatures import APIFeatures
+from .apiFeatures import APIFeatures, QuerySchema
 from .exceptions import APIException
 from .httpResponse import http_response
-from .logger import logger, setup_logging
+from .logger import logger, setup_logging, shutdown_logging
 from .request_logger import get_request_logger
 
 
 __all__ = [
     "APIFeatures",
+    "QuerySchema",
     "APIException",
     "get_request_logger",
     "http_response",
     "logger",
     "setup_logging",
+    "shutdown_logging",
 ]
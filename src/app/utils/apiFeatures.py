@@ -1,125 +1,271 @@
 import re
+from collections import OrderedDict
+from collections.abc import Callable, Iterable
+from datetime import datetime, timezone
 from typing import Any
 
+from bson import ObjectId
+from bson.errors import InvalidId
 from motor.motor_asyncio import AsyncIOMotorCollection
 
+from app.utils.exceptions import APIException
+
+RESERVED_PARAMS = frozenset(
+    {"page", "sort", "limit", "fields", "cursor", "direction", "sortField"}
+)
+OPERATORS = ("gte", "gt", "lte", "lt")
+# `price[gte]=10` style keys; `price=gte:10` style values are handled in _parse
+_BRACKET_KEY = re.compile(r"^(\w+)\[(gte|gt|lte|lt)\]$")
+
+
+def _to_bool(value: str) -> bool:
+    lowered = value.lower()
+    if lowered in ("true", "1", "yes"):
+        return True
+    if lowered in ("false", "0", "no"):
+        return False
+    raise ValueError(f"not a boolean: {value!r}")
+
+
+def _to_datetime(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+COERCERS: dict[type, Callable[[str], Any]] = {
+    bool: _to_bool,
+    datetime: _to_datetime,
+    ObjectId: ObjectId,
+}
+
+
+class QuerySchema:
+    """
+    What a collection may be queried by.
+
+    `fields` maps filterable/projectable field names to their types, used to
+    coerce query-string values. Only `indexed` fields may be sorted on or used
+    as a cursor, so a request can't force an in-memory sort. Compiled plans are
+    cached per query shape (which params/operators are present, not their
+    values) on the schema, so define schemas once at module level.
+    """
+
+    def __init__(
+        self,
+        fields: dict[str, type],
+        *,
+        indexed: Iterable[str] = ("_id",),
+        default_sort: str = "-_id",
+        max_limit: int = 100,
+        plan_cache_size: int = 256,
+    ):
+        self.fields = {"_id": ObjectId, **fields}
+        self.indexed = frozenset(indexed) | {"_id"}
+        self.default_sort = default_sort
+        self.max_limit = max_limit
+        self.plan_cache_size = plan_cache_size
+        self._plans: OrderedDict[tuple, QueryPlan] = OrderedDict()
+
+    def coercer(self, field: str) -> Callable[[str], Any]:
+        kind = self.fields[field]
+        return COERCERS.get(kind, kind)
+
+    def plan(self, shape: tuple) -> "QueryPlan":
+        plan = self._plans.get(shape)
+        if plan is not None:
+            self._plans.move_to_end(shape)
+            return plan
+        plan = QueryPlan(self, *shape)
+        self._plans[shape] = plan
+        if len(self._plans) > self.plan_cache_size:
+            self._plans.popitem(last=False)
+        return plan
+
+
+class QueryPlan:
+    """Validated, value-free form of a query; bind() fills in the values."""
+
+    def __init__(
+        self,
+        schema: QuerySchema,
+        filters: tuple[tuple[str, str, str | None, bool], ...],
+        sort: str | None,
+        fields: str | None,
+        cursor_field: str | None,
+        cursor_direction: str,
+    ):
+        # filters: (param key, field, operator or None, operator given as value prefix)
+        self.filters = []
+        for key, field, op, prefixed in filters:
+            if field not in schema.fields:
+                raise APIException(400, f"Filtering on '{field}' is not supported")
+            skip = len(op) + 1 if prefixed else 0
+            self.filters.append((key, field, f"${op}" if op else None, skip, schema.coercer(field)))
+
+        self.cursor = None
+        if cursor_field is not None:
+            if cursor_field not in schema.indexed:
+                raise APIException(400, f"Cannot page by '{cursor_field}'")
+            order = 1 if cursor_direction == "next" else -1
+            self.cursor = (cursor_field, "$gt" if order == 1 else "$lt", schema.coercer(cursor_field))
+            self.sort = {cursor_field: order}
+        else:
+            self.sort = {}
+            for part in (sort or schema.default_sort).split(","):
+                part = part.strip()
+                name = part.lstrip("-")
+                if name not in schema.indexed:
+                    raise APIException(400, f"Sorting by '{name}' is not supported")
+                self.sort[name] = -1 if part.startswith("-") else 1
+        # Tie-break on _id so pages are stable
+        self.sort.setdefault("_id", next(reversed(self.sort.values())))
+
+        if fields:
+            names = [name.strip() for name in fields.split(",")]
+            unknown = [name for name in names if name not in schema.fields]
+            if unknown:
+                raise APIException(400, f"Unknown fields: {', '.join(unknown)}")
+            self.projection = dict.fromkeys(names, 1)
+        else:
+            self.projection = {"__v": 0}
+
+    def bind(self, params: dict[str, Any]) -> tuple[dict, dict | None]:
+        """Return (base filter, cursor filter) with coerced values."""
+        query: dict[str, Any] = {}
+        for key, field, op, skip, coerce in self.filters:
+            value = self._coerce(coerce, params[key], skip, field)
+            if op is None:
+                query[field] = value
+            else:
+                existing = query.get(field)
+                if not isinstance(existing, dict):
+                    existing = query[field] = {}
+                existing[op] = value
+
+        cursor_query = None
+        if self.cursor is not None and params.get("cursor"):
+            field, op, coerce = self.cursor
+            cursor_query = {field: {op: self._coerce(coerce, params["cursor"], 0, field)}}
+        return query, cursor_query
+
+    @staticmethod
+    def _coerce(coerce, value, skip, field):
+        if not isinstance(value, str):
+            return value
+        try:
+            return coerce(value[skip:])
+        except (ValueError, TypeError, InvalidId):
+            raise APIException(400, f"Invalid value for '{field}'") from None
+
 
 class APIFeatures:
-    """MongoDB query builder with filtering, sorting, and pagination."""
+    """
+    MongoDB query builder with filtering, sorting, and pagination.
+
+    Query parameters are compiled against a QuerySchema into a cached plan,
+    and execute() runs a single $facet aggregation returning the page and
+    the total count together.
+    """
 
     def __init__(
-        self, collection: AsyncIOMotorCollection, query_params: dict[str, Any]
+        self,
+        collection: AsyncIOMotorCollection,
+        query_params: dict[str, Any],
+        schema: QuerySchema,
     ):
         self.collection = collection
         self.query_params = query_params
-        self.filter_query: dict[str, Any] = {}
-        self.sort_query: list = [("createdAt", -1)]
-        self.projection: dict[str, int] | None = None
+        self.schema = schema
+        self._filter = False
+        self._sort = False
+        self._fields = False
+        self._cursor = False
         self.skip_count: int = 0
-        self.limit_count: int = 100
+        self.limit_count: int = schema.max_limit
 
     def filter(self) -> "APIFeatures":
         """Apply filtering to query."""
-        query_obj = {**self.query_params}
-        excluded_fields = [
-            "page",
-            "sort",
-            "limit",
-            "fields",
-            "cursor",
-            "direction",
-            "sortField",
-        ]
-
-        for field in excluded_fields:
-            query_obj.pop(field, None)
-
-        # Advanced filtering: gte, gt, lte, lt
-        query_str = str(query_obj)
-        query_str = re.sub(r"\b(gte|gt|lte|lt)\b", r"$\1", query_str)
-
-        # Convert operators
-        for key, value in query_obj.items():
-            if isinstance(value, str):
-                if "gte:" in value:
-                    self.filter_query[key] = {"$gte": value.replace("gte:", "")}
-                elif "gt:" in value:
-                    self.filter_query[key] = {"$gt": value.replace("gt:", "")}
-                elif "lte:" in value:
-                    self.filter_query[key] = {"$lte": value.replace("lte:", "")}
-                elif "lt:" in value:
-                    self.filter_query[key] = {"$lt": value.replace("lt:", "")}
-                else:
-                    self.filter_query[key] = value
-            else:
-                self.filter_query[key] = value
-
+        self._filter = True
         return self
 
     def sort(self) -> "APIFeatures":
         """Apply sorting to query."""
-        if self.query_params.get("sort"):
-            sort_fields = self.query_params["sort"].split(",")
-            self.sort_query = []
-            for field in sort_fields:
-                if field.startswith("-"):
-                    self.sort_query.append((field[1:], -1))
-                else:
-                    self.sort_query.append((field, 1))
-
+        self._sort = True
         return self
 
     def limit_fields(self) -> "APIFeatures":
         """Apply field limiting (projection)."""
-        if self.query_params.get("fields"):
-            fields = self.query_params["fields"].split(",")
-            self.projection = {field: 1 for field in fields}
-        else:
-            self.projection = {"__v": 0}
-
+        self._fields = True
         return self
 
     def paginate(self) -> "APIFeatures":
         """Apply offset-based pagination."""
-        page = int(self.query_params.get("page", 1))
-        limit = int(self.query_params.get("limit", 100))
-        self.skip_count = (page - 1) * limit
-        self.limit_count = limit
-
+        page = max(self._int_param("page", 1), 1)
+        self.limit_count = self._limit(100)
+        self.skip_count = (page - 1) * self.limit_count
         return self
 
     def cursor_paginate(self) -> "APIFeatures":
         """Apply cursor-based pagination."""
-        limit = int(self.query_params.get("limit", 10))
-        cursor = self.query_params.get("cursor")
-        direction = self.query_params.get("direction", "next").lower()
-        sort_field = self.query_params.get("sortField", "_id")
-
-        if cursor:
-            if direction == "next":
-                self.filter_query[sort_field] = {"$gt": cursor}
-                self.sort_query = [(sort_field, 1)]
-            else:
-                self.filter_query[sort_field] = {"$lt": cursor}
-                self.sort_query = [(sort_field, -1)]
-        else:
-            self.sort_query = [(sort_field, 1 if direction == "next" else -1)]
+        self._cursor = True
+        self.skip_count = 0
+        self.limit_count = self._limit(10)
+        return self
 
-        self.limit_count = limit
+    def _int_param(self, name: str, default: int) -> int:
+        try:
+            return int(self.query_params.get(name, default))
+        except (TypeError, ValueError):
+            raise APIException(400, f"Invalid value for '{name}'") from None
 
-        return self
+    def _limit(self, default: int) -> int:
+        return min(max(self._int_param("limit", default), 1), self.schema.max_limit)
 
-    async def execute(self) -> list:
-        """Execute the query and return results."""
-        cursor = self.collection.find(self.filter_query, self.projection)
+    def _shape(self) -> tuple:
+        filters = []
+        if self._filter:
+            for key, value in self.query_params.items():
+                if key in RESERVED_PARAMS:
+                    continue
+                match = _BRACKET_KEY.match(key)
+                if match:
+                    filters.append((key, match[1], match[2], False))
+                    continue
+                op = None
+                if isinstance(value, str) and ":" in value:
+                    prefix = value.split(":", 1)[0]
+                    op = prefix if prefix in OPERATORS else None
+                filters.append((key, key, op, op is not None))
+        filters.sort()
 
-        if self.sort_query:
-            cursor = cursor.sort(self.sort_query)
+        params = self.query_params
+        return (
+            tuple(filters),
+            params.get("sort") if self._sort else None,
+            params.get("fields") if self._fields else None,
+            params.get("sortField", "_id") if self._cursor else None,
+            str(params.get("direction", "next")).lower(),
+        )
 
+    def pipeline(self) -> list[dict]:
+        """Build the aggregation pipeline for the current parameters."""
+        plan = self.schema.plan(self._shape())
+        query, cursor_query = plan.bind(self.query_params)
+
+        page = [{"$match": cursor_query}] if cursor_query else []
         if self.skip_count:
-            cursor = cursor.skip(self.skip_count)
+            page.append({"$skip": self.skip_count})
+        page += [{"$limit": self.limit_count}, {"$project": plan.projection}]
 
-        if self.limit_count:
-            cursor = cursor.limit(self.limit_count)
+        return [
+            {"$match": query},
+            {"$sort": plan.sort},
+            {"$facet": {"data": page, "total": [{"$count": "count"}]}},
+        ]
 
-        return await cursor.to_list(length=None)
+    async def execute(self) -> tuple[list, int]:
+        """Execute the query and return (page of documents, total matches)."""
+        result = await self.collection.aggregate(self.pipeline()).to_list(length=1)
+        facet = result[0] if result else {"data": [], "total": []}
+        total = facet["total"][0]["count"] if facet["total"] else 0
+        return facet["data"], total
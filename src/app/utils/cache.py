@@ -0,0 +1,365 @@
+"""
+Read-through cache for service methods.
+
+    class SearchService:
+        @cached("search.stats", ttl=300, tags=("user:{user_id}:searches",))
+        async def get_stats(self, *, user_id): ...
+
+        @invalidates("user:{user_id}:searches")
+        async def delete_search(self, *, search_id, user_id): ...
+
+Lookups go through a bounded in-process LRU (short TTL), then Redis, then the
+wrapped method. Keys are derived from the method's keyword arguments, values
+are stored as orjson (zlib-compressed above a size threshold) or raw bytes.
+Values must be JSON-serializable and come back as JSON types.
+
+Stampede protection is XFetch-style early probabilistic refresh: each entry
+records how long it took to compute, and a reader may recompute it shortly
+before expiry with a probability that rises as expiry approaches, so a hot key
+is refreshed by one caller instead of all of them at once. Concurrent misses
+within a process are also coalesced into a single call; if that call is
+cancelled or hits its request's deadline, the waiting callers retry it rather
+than failing with it.
+
+Tags (e.g. "user:{user_id}:searches") are generation counters in Redis; writes
+decorated with @invalidates bump the counter. Every entry records the
+generations of its tags as read *before* computing, and is treated as a miss
+once they have moved on, so a computation that overlaps a write can't store a
+stale value past the invalidation. Invalidated entries are left to expire.
+Other workers' local LRUs are only bounded by the local TTL.
+"""
+
+import asyncio
+import hashlib
+import math
+import random
+import struct
+import time
+import zlib
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Iterable
+from functools import wraps
+from typing import Any
+
+import orjson
+from redis.asyncio import Redis
+
+from app.utils.deadline import DeadlineExceededError
+from app.utils.logger import logger
+
+# format flag, expires_at (epoch), compute seconds, tag generations stamp
+_HEADER = struct.Struct("<cddQ")
+_JSON, _JSON_ZLIB, _BYTES, _BYTES_ZLIB = b"j", b"J", b"b", b"B"
+
+
+def _stamp(generations: tuple[int, ...]) -> int:
+    """64-bit fingerprint of the tag generations an entry was computed under."""
+    packed = struct.pack(f"<{len(generations)}q", *generations)
+    return int.from_bytes(hashlib.blake2b(packed, digest_size=8).digest(), "little")
+
+
+class _Entry:
+    __slots__ = ("value", "expires_at", "delta", "tags")
+
+    def __init__(self, value: Any, expires_at: float, delta: float, tags: tuple[str, ...]):
+        self.value = value
+        self.expires_at = expires_at
+        self.delta = delta
+        self.tags = tags
+
+
+class ServiceCache:
+    """Process-wide cache state: local LRU, in-flight calls and Redis tier."""
+
+    def __init__(
+        self,
+        redis: Redis | None,
+        *,
+        prefix: str = "cache",
+        local_maxsize: int = 1024,
+        local_ttl: float = 5.0,
+        compress_min_bytes: int = 1024,
+        beta: float = 1.0,
+        generation_ttl: float = 86400,
+    ):
+        self.redis = redis
+        self.prefix = prefix
+        self.local_maxsize = local_maxsize
+        self.local_ttl = local_ttl
+        self.compress_min_bytes = compress_min_bytes
+        self.beta = beta
+        # Must outlive the longest entry TTL, or a reset counter could match
+        # an old stamp again
+        self.generation_ttl = generation_ttl
+        self._local: OrderedDict[str, _Entry] = OrderedDict()
+        self._local_tags: dict[str, set[str]] = {}
+        self._inflight: dict[str, asyncio.Future] = {}
+        # Bumped by every local invalidation; a computation that overlapped
+        # one isn't put in the local LRU
+        self._epoch = 0
+
+    # --- keys ---------------------------------------------------------------
+
+    def key(self, namespace: str, params: dict) -> str:
+        digest = hashlib.blake2b(
+            orjson.dumps(params, option=orjson.OPT_SORT_KEYS, default=str),
+            digest_size=16,
+        ).hexdigest()
+        return f"{self.prefix}:{namespace}:{digest}"
+
+    def generation_key(self, tag: str) -> str:
+        return f"{self.prefix}:gen:{tag}"
+
+    # --- read-through -------------------------------------------------------
+
+    async def get_or_set(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        *,
+        ttl: float,
+        tags: tuple[str, ...] = (),
+    ) -> Any:
+        entry, generations = self._local_get(key), None
+        if entry is None:
+            entry, generations = await self._redis_get(key, tags)
+        if entry is not None and not self._should_refresh(entry):
+            return entry.value
+
+        # Miss or early refresh: one computation per key per process
+        while (inflight := self._inflight.get(key)) is not None:
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                # The leader was cancelled or ran out of its request's
+                # deadline; that's not ours to raise, so compute it ourselves
+                # (or follow whoever got there first)
+                if not inflight.cancelled() or asyncio.current_task().cancelling():
+                    raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            epoch = self._epoch
+            if generations is None:
+                generations = await self._generations(tags)
+            start = time.perf_counter()
+            value = await compute()
+            delta = time.perf_counter() - start
+            await self._set(
+                key,
+                value,
+                ttl=ttl,
+                delta=delta,
+                tags=tags,
+                generations=generations,
+                local=self._epoch == epoch,
+            )
+            future.set_result(value)
+            return value
+        except (asyncio.CancelledError, DeadlineExceededError):
+            # Specific to this caller: let followers retry instead
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody else is waiting
+            raise
+        finally:
+            del self._inflight[key]
+
+    def _should_refresh(self, entry: _Entry) -> bool:
+        # XFetch: refresh early with probability growing towards expiry
+        jitter = -entry.delta * self.beta * math.log(random.random() or 1e-12)
+        return time.time() + jitter >= entry.expires_at
+
+    # --- local tier ---------------------------------------------------------
+
+    def _local_get(self, key: str) -> _Entry | None:
+        entry = self._local.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.time():
+            self._local_drop(key)
+            return None
+        self._local.move_to_end(key)
+        return entry
+
+    def _local_put(self, key: str, entry: _Entry) -> None:
+        local = _Entry(
+            entry.value,
+            min(entry.expires_at, time.time() + self.local_ttl),
+            entry.delta,
+            entry.tags,
+        )
+        self._local_drop(key)
+        self._local[key] = local
+        for tag in local.tags:
+            self._local_tags.setdefault(tag, set()).add(key)
+        while len(self._local) > self.local_maxsize:
+            self._local_drop(next(iter(self._local)))
+
+    def _local_drop(self, key: str) -> None:
+        entry = self._local.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry.tags:
+            keys = self._local_tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._local_tags[tag]
+
+    # --- redis tier ---------------------------------------------------------
+
+    def _encode(self, value: Any, expires_at: float, delta: float, stamp: int) -> bytes:
+        if isinstance(value, bytes):
+            flag, body = _BYTES, value
+        else:
+            flag, body = _JSON, orjson.dumps(value, default=str)
+        if len(body) >= self.compress_min_bytes:
+            flag, body = flag.upper(), zlib.compress(body, 1)
+        return _HEADER.pack(flag, expires_at, delta, stamp) + body
+
+    def _decode(self, payload: bytes, stamp: int) -> tuple[Any, float, float] | None:
+        """(value, expires_at, delta), or None if computed under other generations."""
+        flag, expires_at, delta, entry_stamp = _HEADER.unpack_from(payload)
+        if entry_stamp != stamp:
+            return None
+        body = payload[_HEADER.size :]
+        if flag in (_JSON_ZLIB, _BYTES_ZLIB):
+            body = zlib.decompress(body)
+        value = body if flag in (_BYTES, _BYTES_ZLIB) else orjson.loads(body)
+        return value, expires_at, delta
+
+    async def _redis_get(
+        self, key: str, tags: tuple[str, ...]
+    ) -> tuple[_Entry | None, tuple[int, ...] | None]:
+        """The entry if still valid, and the current tag generations (None on error)."""
+        if self.redis is None:
+            return None, None
+        try:
+            # One round trip: the entry and the generations to check it against
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.get(key)
+                for tag in tags:
+                    pipe.get(self.generation_key(tag))
+                payload, *values = await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Cache read failed for {key}: {e}")
+            return None, None
+        generations = tuple(int(value or 0) for value in values)
+        if payload is None:
+            return None, generations
+        decoded = self._decode(payload, _stamp(generations))
+        if decoded is None:
+            return None, generations
+        entry = _Entry(*decoded, tags)
+        self._local_put(key, entry)
+        return entry, generations
+
+    async def _generations(self, tags: tuple[str, ...]) -> tuple[int, ...] | None:
+        if self.redis is None:
+            return None
+        if not tags:
+            return ()
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for tag in tags:
+                    pipe.get(self.generation_key(tag))
+                values = await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Cache generation read failed for {tags}: {e}")
+            return None
+        return tuple(int(value or 0) for value in values)
+
+    async def _set(
+        self,
+        key: str,
+        value: Any,
+        *,
+        ttl: float,
+        delta: float,
+        tags: tuple[str, ...],
+        generations: tuple[int, ...] | None,
+        local: bool = True,
+    ) -> None:
+        expires_at = time.time() + ttl
+        if local:
+            self._local_put(key, _Entry(value, expires_at, delta, tags))
+        # Without the generations read before computing, the value can't be
+        # checked against later invalidations: keep it out of Redis
+        if self.redis is None or generations is None:
+            return
+        payload = self._encode(value, expires_at, delta, _stamp(generations))
+        try:
+            await self.redis.set(key, payload, ex=math.ceil(ttl))
+        except Exception as e:
+            logger.warning(f"Cache write failed for {key}: {e}")
+
+    # --- invalidation -------------------------------------------------------
+
+    async def invalidate_tags(self, tags: Iterable[str]) -> None:
+        tags = tuple(tags)
+        self._epoch += 1
+        for tag in tags:
+            for key in list(self._local_tags.get(tag, ())):
+                self._local_drop(key)
+        if self.redis is None or not tags:
+            return
+        # Single-key commands only, so tags may live on any cluster slot
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for tag in tags:
+                    pipe.incr(self.generation_key(tag))
+                    pipe.expire(self.generation_key(tag), math.ceil(self.generation_ttl))
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Cache invalidation failed for tags {tags}: {e}")
+
+
+def _render(templates: Iterable[str], params: dict) -> tuple[str, ...]:
+    return tuple(template.format(**params) for template in templates)
+
+
+def cached(namespace: str, *, ttl: float, tags: Iterable[str] = ()):
+    """
+    Cache an async, keyword-only service method through `self.cache`.
+
+    Services without a cache (self.cache is None) call straight through.
+    """
+    tag_templates = tuple(tags)
+
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(self, **kwargs):
+            cache: ServiceCache | None = getattr(self, "cache", None)
+            if cache is None:
+                return await func(self, **kwargs)
+            return await cache.get_or_set(
+                cache.key(namespace, kwargs),
+                lambda: func(self, **kwargs),
+                ttl=ttl,
+                tags=_render(tag_templates, kwargs),
+            )
+
+        return wrapper
+
+    return decorator
+
+
+def invalidates(*tags: str):
+    """Invalidate the rendered tags after the decorated write succeeds."""
+
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(self, **kwargs):
+            result = await func(self, **kwargs)
+            cache: ServiceCache | None = getattr(self, "cache", None)
+            if cache is not None:
+                await cache.invalidate_tags(_render(tags, kwargs))
+            return result
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,92 @@
+"""
+Per-request deadlines shared with downstream calls.
+
+TimeoutMiddleware opens a Deadline for each request; clients read it through
+waiting_on() so a Mapbox call, Redis command or Mongo query never outlives the
+request that made it. When a dependency's timeout was cut short by the
+deadline and fires, waiting_on() raises DeadlineExceededError naming that
+dependency, and the middleware turns it into a 504 saying who used up the
+budget.
+"""
+
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+
+class DeadlineExceededError(Exception):
+    """The request deadline ran out while waiting on a dependency."""
+
+    def __init__(self, dependency: str):
+        self.dependency = dependency
+        super().__init__(f"Request deadline exceeded waiting on {dependency}")
+
+
+class Deadline:
+    __slots__ = ("budget", "expires_at", "exceeded_by")
+
+    def __init__(self, budget: float):
+        self.budget = budget
+        self.expires_at = time.monotonic() + budget
+        # Dependency that was being awaited when the deadline ran out
+        self.exceeded_by: str | None = None
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+
+_deadline_var: ContextVar[Deadline | None] = ContextVar("deadline", default=None)
+
+
+def current_deadline() -> Deadline | None:
+    return _deadline_var.get()
+
+
+@contextmanager
+def request_deadline(budget: float) -> Iterator[Deadline]:
+    deadline = Deadline(budget)
+    token = _deadline_var.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _deadline_var.reset(token)
+
+
+@contextmanager
+def waiting_on(
+    dependency: str,
+    cap: float | None = None,
+    timeout_errors: tuple[type[BaseException], ...] = (TimeoutError,),
+) -> Iterator[float | None]:
+    """
+    Bound one dependency call by the request deadline.
+
+    Yields the timeout to use: `cap`, or what is left of the deadline if that
+    is shorter (None outside a request with neither). A `timeout_errors`
+    exception raised once the deadline was the binding limit becomes
+    DeadlineExceededError(dependency).
+    """
+    deadline = _deadline_var.get()
+    if deadline is None:
+        yield cap
+        return
+
+    remaining = deadline.remaining()
+    if remaining <= 0:
+        deadline.exceeded_by = deadline.exceeded_by or dependency
+        raise DeadlineExceededError(dependency)
+    bounded = cap is None or remaining < cap
+
+    try:
+        yield remaining if bounded else cap
+    except timeout_errors as e:
+        if bounded or deadline.remaining() <= 0:
+            deadline.exceeded_by = deadline.exceeded_by or dependency
+            raise DeadlineExceededError(dependency) from e
+        raise
+    except BaseException:
+        # e.g. cancelled by the request-level timeout mid-call
+        if deadline.remaining() <= 0:
+            deadline.exceeded_by = deadline.exceeded_by or dependency
+        raise
@@ -0,0 +1,303 @@
+"""
+Non-blocking log output for loguru.
+
+LogPipeline is a loguru sink that only puts the record on a bounded queue;
+a background thread drains it in batches, renders each record for every
+output (JSON lines for files, text for the console) and writes each batch
+with one buffered write per output. The event loop never waits on
+serialization or disk.
+
+Large payloads are cut down before rendering: long strings, big collections
+and deep nesting in `extra` are truncated, and a line still over the byte
+limit keeps only its message. When the queue is full, records below ERROR
+are dropped at once; ERROR and above wait briefly for room (backpressure)
+before being dropped. Drops, waits and truncations are counted in
+Prometheus.
+
+Note that records are rendered on the writer thread: values passed as
+`extra` should not be mutated after logging.
+"""
+
+import os
+import queue
+import re
+import threading
+import time
+import zipfile
+from collections.abc import Callable
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+import orjson
+from prometheus_client import Counter
+
+from app.utils.metrics import metrics_registry
+
+log_records_dropped_total = Counter(
+    "log_records_dropped_total",
+    "Log records dropped because the log queue was full",
+    ["level"],
+    registry=metrics_registry,
+)
+log_backpressure_total = Counter(
+    "log_backpressure_total",
+    "Times an ERROR+ log record waited for room in the log queue",
+    registry=metrics_registry,
+)
+log_records_truncated_total = Counter(
+    "log_records_truncated_total",
+    "Log records whose fields or line were truncated",
+    registry=metrics_registry,
+)
+
+ERROR_LEVEL = 40
+MAX_DEPTH = 6
+MAX_ITEMS = 50
+
+_STOP = object()
+
+Render = Callable[[dict[str, Any], str], bytes]
+
+
+class Limits:
+    __slots__ = ("max_field_chars", "max_line_bytes")
+
+    def __init__(self, max_field_chars: int, max_line_bytes: int):
+        self.max_field_chars = max_field_chars
+        self.max_line_bytes = max_line_bytes
+
+
+def truncate(value: Any, max_chars: int, depth: int = 0) -> tuple[Any, bool]:
+    """Return (value cut down to size, whether anything was cut)."""
+    if isinstance(value, str):
+        if len(value) > max_chars:
+            return f"{value[:max_chars]}...[{len(value) - max_chars} more chars]", True
+        return value, False
+    if isinstance(value, (bytes, bytearray)):
+        return f"<{len(value)} bytes>", False
+    if isinstance(value, dict):
+        if depth >= MAX_DEPTH:
+            return f"<dict of {len(value)}>", True
+        cut = len(value) > MAX_ITEMS
+        out = {}
+        for i, (k, v) in enumerate(value.items()):
+            if i == MAX_ITEMS:
+                out["..."] = f"{len(value) - MAX_ITEMS} more keys"
+                break
+            out[k], item_cut = truncate(v, max_chars, depth + 1)
+            cut = cut or item_cut
+        return out, cut
+    if isinstance(value, (list, tuple, set, frozenset)):
+        if depth >= MAX_DEPTH:
+            return f"<{type(value).__name__} of {len(value)}>", True
+        items = list(value)
+        cut = len(items) > MAX_ITEMS
+        out = []
+        for v in items[:MAX_ITEMS]:
+            v, item_cut = truncate(v, max_chars, depth + 1)
+            out.append(v)
+            cut = cut or item_cut
+        if len(items) > MAX_ITEMS:
+            out.append(f"...{len(items) - MAX_ITEMS} more items")
+        return out, cut
+    return value, False
+
+
+def json_renderer(limits: Limits) -> Render:
+    """One JSON object per line: time, level, message, source, extra, exception."""
+
+    def render(record: dict[str, Any], exception: str) -> bytes:
+        extra = {k: v for k, v in record["extra"].items() if not k.startswith("_")}
+        extra, cut = truncate(extra, limits.max_field_chars)
+        message, message_cut = truncate(record["message"], limits.max_field_chars)
+        entry = {
+            "time": record["time"].astimezone(timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record["level"].name,
+            "message": message,
+            "logger": record["name"],
+            "function": record["function"],
+            "line": record["line"],
+            "process": record["process"].id,
+            "extra": extra,
+        }
+        if exception:
+            entry["exception"] = exception
+        line = orjson.dumps(entry, default=str, option=orjson.OPT_NON_STR_KEYS)
+        if len(line) > limits.max_line_bytes:
+            entry["extra"] = {"_truncated": f"{len(line)} bytes"}
+            if exception:
+                entry["exception"] = exception[-limits.max_field_chars :]
+            line = orjson.dumps(entry, default=str, option=orjson.OPT_NON_STR_KEYS)
+            cut = True
+        if cut or message_cut:
+            log_records_truncated_total.inc()
+        return line + b"\n"
+
+    return render
+
+
+def _parse_size(value: str) -> int:
+    match = re.fullmatch(r"\s*([\d.]+)\s*([KMG]?B)\s*", value.upper())
+    if not match:
+        raise ValueError(f"Invalid size {value!r}, expected e.g. '5 MB'")
+    number, unit = match.groups()
+    return int(float(number) * {"B": 1, "KB": 1024, "MB": 1024**2, "GB": 1024**3}[unit])
+
+
+def _parse_duration(value: str) -> float:
+    match = re.fullmatch(r"\s*([\d.]+)\s*(second|minute|hour|day|week)s?\s*", value.lower())
+    if not match:
+        raise ValueError(f"Invalid duration {value!r}, expected e.g. '30 days'")
+    number, unit = match.groups()
+    seconds = {"second": 1, "minute": 60, "hour": 3600, "day": 86400, "week": 604800}
+    return float(number) * seconds[unit]
+
+
+class RotatingFile:
+    """
+    Daily log file ({prefix}_YYYY-MM-DD.log), rotated when it exceeds
+    `rotation` ("5 MB") or the day changes. Rotated files are zipped when
+    compression is "zip" and deleted once older than `retention` ("30 days").
+    Only used from the writer thread.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        *,
+        prefix: str = "app",
+        rotation: str = "5 MB",
+        retention: str | None = "30 days",
+        compression: str | None = "zip",
+    ):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.prefix = prefix
+        self.max_bytes = _parse_size(rotation)
+        self.retention = _parse_duration(retention) if retention else None
+        self.compression = compression
+        self._file = None
+        self._day = ""
+        self._size = 0
+
+    def _open(self) -> None:
+        self._day = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        path = self.directory / f"{self.prefix}_{self._day}.log"
+        self._file = open(path, "ab", buffering=1024 * 1024)
+        self._size = path.stat().st_size
+
+    def _rotate(self) -> None:
+        self._file.close()
+        path = Path(self._file.name)
+        stamp = datetime.now(timezone.utc).strftime("%H%M%S_%f")
+        rotated = path.with_name(f"{path.stem}.{stamp}.log")
+        os.replace(path, rotated)
+        if self.compression == "zip":
+            with zipfile.ZipFile(f"{rotated}.zip", "w", zipfile.ZIP_DEFLATED) as archive:
+                archive.write(rotated, rotated.name)
+            rotated.unlink()
+        if self.retention is not None:
+            cutoff = time.time() - self.retention
+            for old in self.directory.glob(f"{self.prefix}_*.log*"):
+                if old.stat().st_mtime < cutoff:
+                    old.unlink(missing_ok=True)
+        self._open()
+
+    def write(self, data: bytes) -> None:
+        if self._file is None:
+            self._open()
+        elif self._size >= self.max_bytes or (
+            datetime.now(timezone.utc).strftime("%Y-%m-%d") != self._day
+        ):
+            self._rotate()
+        self._file.write(data)
+        self._size += len(data)
+
+    def flush(self) -> None:
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class LogPipeline:
+    """Loguru sink: enqueue records, render and write them on a background thread."""
+
+    def __init__(
+        self,
+        outputs: list[tuple[Render, Any]],
+        *,
+        queue_size: int = 10000,
+        batch_size: int = 256,
+        block_seconds: float = 0.05,
+    ):
+        # (render, stream) pairs; streams need write(bytes) and flush()
+        self.outputs = outputs
+        self.batch_size = batch_size
+        self.block_seconds = block_seconds
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def sink(self, message) -> None:
+        """Loguru sink; `message` is formatted as just the exception text."""
+        record = message.record
+        item = (record, str(message) if record["exception"] else "")
+        try:
+            self._queue.put_nowait(item)
+            return
+        except queue.Full:
+            pass
+        if record["level"].no >= ERROR_LEVEL:
+            log_backpressure_total.inc()
+            try:
+                self._queue.put(item, timeout=self.block_seconds)
+                return
+            except queue.Full:
+                pass
+        log_records_dropped_total.labels(record["level"].name).inc()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = False
+            for render, stream in self.outputs:
+                lines = []
+                for item in batch:
+                    if item is _STOP:
+                        stop = True
+                        continue
+                    try:
+                        lines.append(render(*item))
+                    except Exception as e:
+                        lines.append(f"log render failed: {e!r}\n".encode())
+                try:
+                    stream.write(b"".join(lines))
+                    stream.flush()
+                except Exception:
+                    pass
+            if stop:
+                return
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Write out what is queued and stop the writer thread."""
+        if not self._thread.is_alive():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+        for _, stream in self.outputs:
+            if isinstance(stream, RotatingFile):
+                stream.close()
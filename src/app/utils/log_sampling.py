@@ -0,0 +1,70 @@
+"""
+Sampling for high-volume, low-value log lines (client errors during scans).
+
+LogSampler decides per event key whether to log:
+
+- duplicates: after a key is logged, repeats within `window` seconds are
+  only counted, and the next line logged for it reports how many were
+  suppressed
+- rate: new keys spend a token from a bucket refilled at `rate` per second
+  (up to `burst`); without a token the line is dropped and counted
+
+so a flood of 404s costs a dict lookup per request instead of a log line.
+"""
+
+import time
+from collections import OrderedDict
+from collections.abc import Hashable
+
+from prometheus_client import Counter
+
+from app.utils.metrics import metrics_registry
+
+log_lines_suppressed_total = Counter(
+    "log_lines_suppressed_total",
+    "Log lines not written by a sampler",
+    ["reason"],
+    registry=metrics_registry,
+)
+
+
+class LogSampler:
+    def __init__(self, rate: float, burst: int, window: float, max_keys: int = 4096):
+        self.rate = rate
+        self.burst = burst
+        self.window = window
+        self.max_keys = max_keys
+        self._tokens = float(burst)
+        self._refilled_at = time.monotonic()
+        # key -> [logged_at, suppressed since]
+        self._seen: OrderedDict[Hashable, list] = OrderedDict()
+        self._rate_limited = 0
+
+    def sample(self, key: Hashable) -> tuple[int, int] | None:
+        """
+        None if this event shouldn't be logged, else (duplicates suppressed
+        for this key, lines dropped by the rate limit) since the last logged
+        line.
+        """
+        now = time.monotonic()
+        seen = self._seen.get(key)
+        if seen is not None and now - seen[0] < self.window:
+            seen[1] += 1
+            log_lines_suppressed_total.labels("duplicate").inc()
+            return None
+
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+        if self._tokens < 1:
+            self._rate_limited += 1
+            log_lines_suppressed_total.labels("rate").inc()
+            return None
+        self._tokens -= 1
+
+        duplicates = seen[1] if seen is not None else 0
+        self._seen[key] = [now, 0]
+        self._seen.move_to_end(key)
+        if len(self._seen) > self.max_keys:
+            self._seen.popitem(last=False)
+        rate_limited, self._rate_limited = self._rate_limited, 0
+        return duplicates, rate_limited
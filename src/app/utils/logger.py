@@ -1,87 +1,121 @@
+import atexit
 import sys
-from datetime import datetime, timezone
+from datetime import timezone
 from typing import Any
 
 from loguru import logger as loguru_logger
 
 from app.config.settings import get_settings
+from app.utils.log_pipeline import (
+    Limits,
+    LogPipeline,
+    Render,
+    RotatingFile,
+    json_renderer,
+    truncate,
+)
+
+COLORS = {
+    "DEBUG": "\x1b[36m",
+    "INFO": "\x1b[32m",
+    "WARNING": "\x1b[33m",
+    "ERROR": "\x1b[31m",
+    "CRITICAL": "\x1b[31m\x1b[1m",
+}
+DIM, CYAN, RESET = "\x1b[2m", "\x1b[36m", "\x1b[0m"
+
+
+def console_renderer(limits: Limits, colorize: bool = True) -> Render:
+    """Format logs for console with INFO/META structure."""
 
+    def paint(code: str, text: str) -> str:
+        return f"{code}{text}{RESET}" if colorize else text
 
-def console_format(record: dict[str, Any]) -> str:
-    """Format logs for console with INFO/META structure."""
-    level = record["level"].name
-    time_utc = record["time"].astimezone(timezone.utc)
-    time = time_utc.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
-    message = record["message"]
-
-    # Color mapping
-    colors = {
-        "DEBUG": "<cyan>",
-        "INFO": "<green>",
-        "WARNING": "<yellow>",
-        "ERROR": "<red>",
-        "CRITICAL": "<red><bold>",
-    }
-    color = colors.get(level, "<white>")
-    end_color = "</>"
-
-    # Base format
-    fmt = f"{color}{level}{end_color} <dim>[{time}]</dim> {message}"
-
-    # Add extra data (filter out internal loguru keys)
-    extra_data = {k: v for k, v in record["extra"].items() if not k.startswith("_")}
-
-    if extra_data:
-        # Use double curly braces to escape format string interpretation
+    def render(record: dict[str, Any], exception: str) -> bytes:
+        level = record["level"].name
+        time_utc = record["time"].astimezone(timezone.utc)
+        time = time_utc.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+        message, _ = truncate(record["message"], limits.max_field_chars)
+
+        # Base format
+        line = f"{paint(COLORS.get(level, ''), level)} {paint(DIM, f'[{time}]')} {message}"
+
+        # Add extra data (filter out internal loguru keys)
         meta_parts = []
-        for k, v in extra_data.items():
-            # Escape curly braces in the repr to prevent format string issues
-            v_repr = repr(v).replace("{", "{{").replace("}", "}}")
-            meta_parts.append(f"<cyan>{k}</>={v_repr}")
-        meta_str = " ".join(meta_parts)
-        fmt += f" <dim>|</dim> {meta_str}"
+        for k, v in record["extra"].items():
+            if k.startswith("_"):
+                continue
+            v, _ = truncate(v, limits.max_field_chars)
+            meta_parts.append(f"{paint(CYAN, k)}={v!r}")
+        if meta_parts:
+            line += f" {paint(DIM, '|')} " + " ".join(meta_parts)
+
+        # Add exception if present
+        if exception:
+            line += "\n" + exception.rstrip("\n")
+
+        return (line + "\n").encode("utf-8", "replace")
 
-    # Add exception if present
-    if record["exception"]:
-        fmt += "\n{exception}"
+    return render
 
-    return fmt + "\n"
+
+_pipeline: LogPipeline | None = None
+
+
+def shutdown_logging() -> None:
+    """Remove all handlers and write out queued records."""
+    global _pipeline
+    loguru_logger.remove()
+    if _pipeline is not None:
+        _pipeline.close()
+        _pipeline = None
 
 
 def setup_logging() -> None:
-    """Configure loguru logger with console and file handlers."""
+    """
+    Configure loguru to log to the console and JSON files through a
+    LogPipeline, so logging calls don't block on formatting or I/O.
+    """
+    global _pipeline
     settings = get_settings()
 
-    # Remove default handler
-    loguru_logger.remove()
+    # Remove default handler (and a previous pipeline)
+    shutdown_logging()
 
-    # Console handler with colors and custom format
-    loguru_logger.add(
-        sys.stderr,
-        format=console_format,  # type: ignore[arg-type]
-        level=settings.LOG_LEVEL,
-        colorize=True,
-        backtrace=settings.LOG_BACKTRACE,
-        diagnose=settings.LOG_DIAGNOSE,
+    limits = Limits(settings.LOG_MAX_FIELD_CHARS, settings.LOG_MAX_LINE_BYTES)
+    # File handler with JSON lines
+    log_file = RotatingFile(
+        settings.LOG_DIR,
+        rotation=settings.LOG_ROTATION,
+        retention=settings.LOG_RETENTION,
+        compression=settings.LOG_COMPRESSION,
+    )
+    _pipeline = LogPipeline(
+        [
+            (console_renderer(limits, colorize=True), sys.stderr.buffer),
+            (json_renderer(limits), log_file),
+        ],
+        queue_size=settings.LOG_QUEUE_SIZE,
+        batch_size=settings.LOG_BATCH_SIZE,
+        block_seconds=settings.LOG_BLOCK_SECONDS,
     )
 
-    # File handler with JSON serialization
-    settings.LOG_DIR.mkdir(parents=True, exist_ok=True)
+    # Loguru only formats the exception (if any); the pipeline renders the rest.
+    # A format function, since loguru appends the exception to format strings
     loguru_logger.add(
-        settings.LOG_DIR / "app_{time:YYYY-MM-DD}.log",
-        format="{message}",
+        _pipeline.sink,
+        format=lambda record: "{exception}",
         level=settings.LOG_LEVEL,
-        rotation=settings.LOG_ROTATION,
-        retention=settings.LOG_RETENTION,
-        compression=settings.LOG_COMPRESSION,
-        serialize=True,
+        colorize=False,
         backtrace=settings.LOG_BACKTRACE,
         diagnose=settings.LOG_DIAGNOSE,
+        catch=True,
     )
 
 
 # Initialize logger with setup
 setup_logging()
+atexit.register(shutdown_logging)
 
 # Export configured logger
 logger = loguru_logger
@@ -0,0 +1,6 @@
+"""Prometheus registry shared by middleware, features and utilities."""
+
+from prometheus_client import CollectorRegistry
+
+# Application metrics registry, served by /metrics in single-process mode
+metrics_registry = CollectorRegistry()
@@ -0,0 +1,16 @@
+"""Text normalization shared by search tokens and leaderboard keys."""
+
+import re
+import unicodedata
+
+_WORD = re.compile(r"\w+")
+
+
+def normalize(text: str) -> str:
+    """Casefold and strip accents: "São Paulo" -> "sao paulo"."""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def tokenize(text: str) -> list[str]:
+    return _WORD.findall(normalize(text))
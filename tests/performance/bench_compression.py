@@ -0,0 +1,98 @@
+"""
+Benchmark: compression CPU vs bytes saved on route payloads.
+
+Payloads mimic what the API actually returns: a /routes/calculate result
+(two routes with full GeoJSON geometry) and a cached search document, at a few
+route lengths. For each encoding and level it prints compress time and output
+size; "*" marks the level CompressionMiddleware picks for that body size,
+"p" the PrecompressedResponse level. The first row is the previous setup
+(GZipMiddleware, level 6).
+
+Run from the repo root (zstd/br need the `compression` extra):
+    PYTHONPATH=src python tests/performance/bench_compression.py
+"""
+
+import random
+import timeit
+
+import orjson
+
+from app.middleware.compression import (
+    ENCODINGS,
+    PRECOMPRESSED_LEVELS,
+    compress,
+    level_for,
+)
+
+POINT_COUNTS = (1_000, 5_000, 20_000)
+LEVELS = {"zstd": (1, 3, 6, 12), "br": (1, 2, 4, 5, 9), "gzip": (2, 4, 6, 9)}
+
+
+def make_route(points: int) -> dict:
+    lng, lat = 4.47, 51.92
+    coordinates = []
+    for _ in range(points):
+        lng += random.uniform(-0.001, 0.001)
+        lat += random.uniform(-0.001, 0.001)
+        coordinates.append([round(lng, 6), round(lat, 6)])
+    return {
+        "distance_km": 512.3,
+        "duration_hours": 6.1,
+        "co2_emissions_kg": 317.6,
+        "geometry": {"type": "LineString", "coordinates": coordinates},
+    }
+
+
+def make_payloads(points: int) -> dict[str, bytes]:
+    efficient = make_route(points)
+    efficient["savings"] = {"co2_saved_kg": 12.4, "percentage": 3.9}
+    calculate = {"shortest_route": make_route(points), "efficient_route": efficient}
+    search = {
+        "id": "665f1c2e8b3e4a0012345678",
+        "origin": {"name": "Rotterdam", "coordinates": [4.47, 51.92]},
+        "destination": {"name": "Hamburg", "coordinates": [9.99, 53.55]},
+        "cargo_weight_kg": 12_000.0,
+        "transport_mode": "land",
+        **calculate,
+        "created_at": "2025-06-04T10:12:30Z",
+    }
+    return {"calculate": orjson.dumps(calculate), "search": orjson.dumps(search)}
+
+
+def measure(body: bytes, encoding: str, level: int) -> tuple[float, int]:
+    number = max(1, 2_000_000 // len(body))
+    if encoding == "br" and level >= 9:
+        number = 1
+    seconds = min(timeit.repeat(lambda: compress(body, encoding, level), number=number, repeat=3))
+    return seconds / number * 1000, len(compress(body, encoding, level))
+
+
+def main() -> None:
+    random.seed(7)
+    print(f"encodings available: {', '.join(ENCODINGS)}")
+    print(f"{'payload':>16} {'KB':>7} {'encoding':>9} {'level':>6} {'ms':>8} {'out KB':>8} {'ratio':>6} {'MB/s':>7}")
+    for points in POINT_COUNTS:
+        for name, body in make_payloads(points).items():
+            label = f"{name}/{points}"
+            size_kb = len(body) / 1024
+
+            def row(encoding, level, mark=""):
+                ms, out = measure(body, encoding, level)
+                print(
+                    f"{label:>16} {size_kb:>7.0f} {encoding:>9} {f'{level}{mark}':>6} "
+                    f"{ms:>8.2f} {out / 1024:>8.1f} {len(body) / out:>6.1f} "
+                    f"{len(body) / 1e6 / (ms / 1000):>7.0f}"
+                )
+
+            row("gzip", 6, " old")
+            for encoding in ENCODINGS:
+                chosen = level_for(encoding, len(body))
+                for level in LEVELS[encoding]:
+                    mark = "*" if level == chosen else ""
+                    mark += "p" if level == PRECOMPRESSED_LEVELS[encoding] else ""
+                    row(encoding, level, mark)
+            print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark: JWT encode/decode throughput per backend and algorithm.
+
+Covers every installed backend from app.features.auth.jwt_backend across
+HMAC (HS256/384/512), RSA (RS256) and EC (ES256) signing, plus the
+TokenVerifier cache-hit path that get_current_user takes for a reused token.
+Asymmetric keys are passed as PEM strings, so RS256/ES256 encode includes
+private key loading on every call.
+
+Run from the repo root:
+    PYTHONPATH=src python tests/performance/bench_jwt.py
+"""
+
+import time
+import timeit
+from uuid import uuid4
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+
+from app.features.auth.jwt_backend import BACKENDS, TokenVerifier, get_backend
+
+ROUNDS = 2_000
+SECRET = "bench-secret-" + "x" * 51  # 64 bytes, enough for HS512
+
+
+def pem_pair(private_key) -> tuple[str, str]:
+    private = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+    public = (
+        private_key.public_key()
+        .public_bytes(
+            serialization.Encoding.PEM,
+            serialization.PublicFormat.SubjectPublicKeyInfo,
+        )
+        .decode()
+    )
+    return private, public
+
+
+RSA_PRIVATE, RSA_PUBLIC = pem_pair(rsa.generate_private_key(public_exponent=65537, key_size=2048))
+EC_PRIVATE, EC_PUBLIC = pem_pair(ec.generate_private_key(ec.SECP256R1()))
+
+# algorithm -> (signing key, verification key)
+ALGORITHMS = {
+    "HS256": (SECRET, SECRET),
+    "HS384": (SECRET, SECRET),
+    "HS512": (SECRET, SECRET),
+    "RS256": (RSA_PRIVATE, RSA_PUBLIC),
+    "ES256": (EC_PRIVATE, EC_PUBLIC),
+}
+
+
+def payload() -> dict:
+    now = int(time.time())
+    return {
+        "sub": "665f1c2e8b3e4a0012345678",
+        "email": "bench@example.com",
+        "type": "access",
+        "jti": str(uuid4()),
+        "iat": now,
+        "exp": now + 3600,
+    }
+
+
+def ops_per_sec(fn, rounds: int) -> float:
+    return rounds / min(timeit.repeat(fn, number=rounds, repeat=3))
+
+
+def main() -> None:
+    backends = []
+    for name in BACKENDS:
+        try:
+            backends.append(get_backend(name))
+        except RuntimeError:
+            print(f"skipping {name}: not installed")
+
+    print(f"{'backend':>8} {'alg':>6} {'encode/s':>11} {'decode/s':>11} {'cached/s':>11}")
+    for backend in backends:
+        for alg, (sign_key, verify_key) in ALGORITHMS.items():
+            claims = payload()
+            # Asymmetric signing is far slower; keep the run time bounded
+            rounds = ROUNDS if alg.startswith("HS") else ROUNDS // 10
+            token = backend.encode(claims, sign_key, alg)
+            assert backend.decode(token, verify_key, [alg])["jti"] == claims["jti"]
+
+            verifier = TokenVerifier(backend, verify_key, [alg])
+            verifier.decode(token)
+
+            encode = ops_per_sec(lambda: backend.encode(claims, sign_key, alg), rounds)
+            decode = ops_per_sec(lambda: backend.decode(token, verify_key, [alg]), rounds)
+            cached = ops_per_sec(lambda: verifier.decode(token), ROUNDS * 10)
+            print(f"{backend.name:>8} {alg:>6} {encode:>11,.0f} {decode:>11,.0f} {cached:>11,.0f}")
+
+
+if __name__ == "__main__":
+    main()
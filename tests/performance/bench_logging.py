@@ -0,0 +1,126 @@
+"""
+Benchmark: throughput of log-heavy requests, inline loguru sinks vs LogPipeline.
+
+Each simulated request logs what a typical handler does here: a few bound
+INFO lines plus a CONTROLLER_RESPONSE carrying the response body (a route
+with geometry), on the event loop. Output goes to a temp dir and /dev/null.
+
+- before:   console sink with the previous console_format (reproduced
+            below) and a serialize=True file sink, both run inline
+- pipeline: app.utils.log_pipeline.LogPipeline (queue + writer thread,
+            orjson lines, truncation)
+
+"loop ms" is time spent on the event loop, i.e. what requests wait for;
+"total ms" includes the writer thread draining the queue.
+
+Run from the repo root:
+    PYTHONPATH=src python tests/performance/bench_logging.py
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+from datetime import timezone
+
+from loguru import logger
+
+from app.utils.log_pipeline import Limits, LogPipeline, RotatingFile, json_renderer
+from app.utils.logger import console_renderer, shutdown_logging
+
+REQUESTS = 2_000
+POINTS = 500
+
+
+def legacy_console_format(record) -> str:
+    level = record["level"].name
+    time_utc = record["time"].astimezone(timezone.utc)
+    stamp = time_utc.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+    fmt = f"<green>{level}</> <dim>[{stamp}]</dim> {record['message']}"
+    extra_data = {k: v for k, v in record["extra"].items() if not k.startswith("_")}
+    if extra_data:
+        meta_parts = []
+        for k, v in extra_data.items():
+            v_repr = repr(v).replace("{", "{{").replace("}", "}}")
+            meta_parts.append(f"<cyan>{k}</>={v_repr}")
+        fmt += " <dim>|</dim> " + " ".join(meta_parts)
+    if record["exception"]:
+        fmt += "\n{exception}"
+    return fmt + "\n"
+
+
+def setup_before(directory: str, devnull) -> None:
+    logger.add(devnull, format=legacy_console_format, level="INFO", colorize=True)
+    logger.add(
+        os.path.join(directory, "app_{time:YYYY-MM-DD}.log"),
+        format="{message}",
+        level="INFO",
+        rotation="5 MB",
+        serialize=True,
+    )
+
+
+def setup_pipeline(directory: str, devnull) -> LogPipeline:
+    limits = Limits(2048, 16384)
+    pipeline = LogPipeline(
+        [
+            (console_renderer(limits), devnull),
+            (json_renderer(limits), RotatingFile(directory, rotation="5 MB", compression=None)),
+        ],
+        queue_size=100_000,
+    )
+    logger.add(pipeline.sink, format=lambda record: "{exception}", level="INFO")
+    return pipeline
+
+
+async def handle(i: int, body: dict) -> None:
+    log = logger.bind(correlation_id=f"req-{i}", path="/api/v1/routes/calculate", method="POST")
+    log.info("Calculating route", user_id="665f1c2e8b3e4a0012345678")
+    log.info("Mapbox directions fetched", routes=2)
+    log.info("Search saved", search_id="665f1c2e8b3e4a0012345679")
+    log.info("CONTROLLER_RESPONSE", response=body)
+    await asyncio.sleep(0)
+
+
+async def run(body: dict) -> float:
+    start = time.perf_counter()
+    for i in range(REQUESTS):
+        await handle(i, body)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    shutdown_logging()
+
+    coordinates = [[4.47 + i * 1e-4, 51.92 + i * 1e-4] for i in range(POINTS)]
+    body = {
+        "success": True,
+        "statusCode": 200,
+        "data": {"geometry": {"type": "LineString", "coordinates": coordinates}},
+    }
+
+    print(f"{'variant':>9} {'loop ms':>9} {'total ms':>9} {'req/s (loop)':>13}")
+    for name in ("before", "pipeline"):
+        with tempfile.TemporaryDirectory() as directory, open(os.devnull, "wb") as devnull:
+            if name == "before":
+                text = open(os.devnull, "w")
+                setup_before(directory, text)
+                pipeline = None
+            else:
+                pipeline = setup_pipeline(directory, devnull)
+            start = time.perf_counter()
+            loop_seconds = asyncio.run(run(body))
+            if pipeline is not None:
+                pipeline.close(timeout=60)
+            total_seconds = time.perf_counter() - start
+            logger.remove()
+            if name == "before":
+                text.close()
+        print(
+            f"{name:>9} {loop_seconds * 1000:>9.0f} {total_seconds * 1000:>9.0f} "
+            f"{REQUESTS / loop_seconds:>13.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
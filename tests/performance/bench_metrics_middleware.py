@@ -0,0 +1,121 @@
+"""
+Benchmark: per-request overhead of the metrics middleware.
+
+Drives the middleware directly with a minimal ASGI app (no server, no
+routing) so the numbers are the middleware's own cost:
+- bare:    the app alone
+- legacy:  the previous implementation (path normalization + three
+           .labels() lookups per request), reproduced below
+- current: app.middleware.server_middleware.ServerMiddleware (route
+           template label, cached labelled children; also does correlation
+           ID and security headers, see bench_middleware_stack.py)
+
+Run from the repo root:
+    PYTHONPATH=src python tests/performance/bench_metrics_middleware.py
+"""
+
+import asyncio
+import time
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram
+
+from app.middleware.server_middleware import ServerMiddleware
+
+REQUESTS = 50_000
+
+
+class FakeRoute:
+    path = "/api/v1/searches/{search_id}"
+
+
+async def endpoint(scope, receive, send):
+    scope["route"] = FakeRoute
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+def legacy_middleware(app):
+    registry = CollectorRegistry()
+    labels = ["method", "endpoint", "status_code", "project"]
+    total = Counter("legacy_requests_total", "", labels, registry=registry)
+    duration = Histogram(
+        "legacy_duration_seconds",
+        "",
+        labels,
+        buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0),
+        registry=registry,
+    )
+    in_progress = Gauge(
+        "legacy_in_progress", "", ["method", "endpoint", "project"], registry=registry
+    )
+
+    def normalize(path):
+        return "/".join(
+            "{id}" if part.isdigit() or (len(part) == 36 and part.count("-") == 4) else part
+            for part in path.split("/")
+        )
+
+    async def middleware(scope, receive, send):
+        method, endpoint_label = scope["method"], normalize(scope["path"])
+        in_progress.labels(method=method, endpoint=endpoint_label, project="bench").inc()
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"x-process-time", f"{time.perf_counter() - start:.3f}".encode()))
+                message["headers"] = headers
+            await send(message)
+
+        try:
+            await app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            kwargs = dict(method=method, endpoint=endpoint_label, status_code=status_code, project="bench")
+            total.labels(**kwargs).inc()
+            duration.labels(**kwargs).observe(elapsed)
+            in_progress.labels(method=method, endpoint=endpoint_label, project="bench").dec()
+
+    return middleware
+
+
+async def run(app) -> float:
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for _ in range(REQUESTS):
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "path": "/api/v1/searches/665f1c2e8b3e4a0012345678",
+            "headers": [],
+        }
+        await app(scope, receive, send)
+    return (time.perf_counter() - start) / REQUESTS * 1e6
+
+
+async def main() -> None:
+    apps = {
+        "bare": endpoint,
+        "legacy": legacy_middleware(endpoint),
+        "current": ServerMiddleware(endpoint, project_name="bench"),
+    }
+    results = {}
+    for name, app in apps.items():
+        await run(app)  # warm up
+        results[name] = min([await run(app) for _ in range(3)])
+
+    print(f"{'variant':>8} {'us/request':>11} {'overhead us':>12}")
+    for name, micros in results.items():
+        print(f"{name:>8} {micros:>11.2f} {micros - results['bare']:>12.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,150 @@
+"""
+Benchmark: request overhead of the middleware stack, before and after fusing.
+
+Two FastAPI apps with the same trivial route, driven directly over ASGI (no
+server or HTTP client), so the difference is middleware cost:
+- before: correlation ID and security headers as @app.middleware("http")
+          functions (BaseHTTPMiddleware) around a pure-ASGI metrics
+          middleware, as main.py was wired previously (reproduced below)
+- fused:  app.middleware.server_middleware.ServerMiddleware doing all of it
+          in one pure-ASGI pass
+- bare:   the route with no middleware, for reference
+
+Run from the repo root:
+    PYTHONPATH=src python tests/performance/bench_middleware_stack.py
+"""
+
+import asyncio
+import time
+
+from fastapi import FastAPI, Request
+from nanoid import generate
+from prometheus_client import CollectorRegistry, Counter, Histogram
+
+from app.middleware.server_middleware import ServerMiddleware, _endpoint_label
+
+REQUESTS = 10_000
+
+
+def make_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/v1/items/{item_id}")
+    async def item(item_id: str) -> dict:
+        return {"id": item_id}
+
+    return app
+
+
+class LegacyMetricsMiddleware:
+    """Pure-ASGI metrics with cached children, as it was before fusing."""
+
+    def __init__(self, app):
+        self.app = app
+        registry = CollectorRegistry()
+        labels = ["method", "endpoint", "status_code"]
+        self.total = Counter("before_requests_total", "", labels, registry=registry)
+        self.duration = Histogram("before_duration_seconds", "", labels, registry=registry)
+        self.children = {}
+
+    async def __call__(self, scope, receive, send):
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = [
+                    *message.get("headers", ()),
+                    (b"x-process-time", f"{time.perf_counter() - start:.3f}".encode()),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            key = (scope["method"], _endpoint_label(scope), status_code)
+            children = self.children.get(key)
+            if children is None:
+                children = self.children[key] = (
+                    self.total.labels(*key),
+                    self.duration.labels(*key),
+                )
+            children[0].inc()
+            children[1].observe(time.perf_counter() - start)
+
+
+def before_app() -> FastAPI:
+    app = make_app()
+    app.add_middleware(LegacyMetricsMiddleware)
+
+    @app.middleware("http")
+    async def add_security_headers(request: Request, call_next):
+        response = await call_next(request)
+        response.headers["X-Content-Type-Options"] = "nosniff"
+        response.headers["X-Frame-Options"] = "DENY"
+        response.headers["X-XSS-Protection"] = "1; mode=block"
+        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains; preload"
+        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
+        response.headers["Permissions-Policy"] = "geolocation=(), microphone=(), camera=()"
+        return response
+
+    @app.middleware("http")
+    async def add_correlation_id(request: Request, call_next):
+        correlation_id = request.headers.get("X-Correlation-ID") or generate(size=21)
+        request.state.correlation_id = correlation_id
+        response = await call_next(request)
+        response.headers["X-Correlation-ID"] = correlation_id
+        return response
+
+    return app
+
+
+def fused_app() -> FastAPI:
+    app = make_app()
+    app.add_middleware(ServerMiddleware, project_name="bench")
+    return app
+
+
+async def run(app) -> float:
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for _ in range(REQUESTS):
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": "/api/v1/items/665f1c2e8b3e4a0012345678",
+            "raw_path": b"/api/v1/items/665f1c2e8b3e4a0012345678",
+            "query_string": b"",
+            "root_path": "",
+            "headers": [(b"host", b"bench")],
+            "client": ("127.0.0.1", 50000),
+            "server": ("bench", 80),
+        }
+        await app(scope, receive, send)
+    return (time.perf_counter() - start) / REQUESTS * 1e6
+
+
+async def main() -> None:
+    apps = {"bare": make_app(), "before": before_app(), "fused": fused_app()}
+    results = {}
+    for name, app in apps.items():
+        await run(app)  # warm up (also builds the middleware stack)
+        results[name] = min([await run(app) for _ in range(3)])
+
+    print(f"{'stack':>7} {'us/request':>11} {'middleware us':>14}")
+    for name, micros in results.items():
+        print(f"{name:>7} {micros:>11.1f} {micros - results['bare']:>14.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,90 @@
+"""
+Benchmark: search document read path, decoded dicts vs raw BSON passthrough.
+
+Compares, per document:
+- current path: bson.decode -> SearchService._serialize_search ->
+  jsonable_encoder (what FastAPI does with a returned dict) -> orjson.dumps
+- raw path: RawBSONDocument -> app.features.search.raw.search_json
+
+Run from the repo root:
+    PYTHONPATH=src python tests/performance/bench_search_read_path.py
+"""
+
+import random
+import timeit
+from datetime import datetime, timezone
+
+import bson
+import orjson
+from bson import ObjectId
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
+from fastapi.encoders import jsonable_encoder
+
+from app.features.search.raw import search_json
+from app.features.search.service import SearchService
+
+POINT_COUNTS = (100, 1_000, 5_000, 20_000)
+DECODED = CodecOptions(tz_aware=True)
+RAW = CodecOptions(document_class=RawBSONDocument, tz_aware=True)
+
+
+def make_route(points: int) -> dict:
+    lng, lat = 4.47, 51.92
+    coordinates = []
+    for _ in range(points):
+        lng += random.uniform(-0.001, 0.001)
+        lat += random.uniform(-0.001, 0.001)
+        coordinates.append([round(lng, 6), round(lat, 6)])
+    return {
+        "distance_km": 512.3,
+        "duration_hours": 6.1,
+        "co2_emissions_kg": 317.6,
+        "geometry": {"type": "LineString", "coordinates": coordinates},
+    }
+
+
+def make_document(points: int) -> bytes:
+    return bson.encode(
+        {
+            "_id": ObjectId(),
+            "user_id": ObjectId(),
+            "origin": {"name": "Rotterdam", "coordinates": [4.47, 51.92]},
+            "destination": {"name": "Hamburg", "coordinates": [9.99, 53.55]},
+            "cargo_weight_kg": 12_000.0,
+            "transport_mode": "land",
+            "shortest_route": make_route(points),
+            "efficient_route": make_route(points),
+            "metadata": {"api_version": "v1", "calculation_method": "mapbox"},
+            "created_at": datetime.now(timezone.utc),
+        }
+    )
+
+
+def main() -> None:
+    service = SearchService(repo=None, redis=None)
+
+    print(f"{'points/route':>12} {'doc KB':>8} {'current ms':>11} {'raw ms':>8} {'speedup':>8}")
+    for points in POINT_COUNTS:
+        raw = make_document(points)
+
+        def current():
+            doc = bson.decode(raw, DECODED)
+            return orjson.dumps(jsonable_encoder(service._serialize_search(doc)))
+
+        def passthrough():
+            return search_json(RawBSONDocument(raw, RAW))
+
+        assert orjson.loads(current()) == orjson.loads(passthrough())
+
+        number = max(1, 20_000 // points)
+        current_ms = min(timeit.repeat(current, number=number, repeat=5)) / number * 1000
+        raw_ms = min(timeit.repeat(passthrough, number=number, repeat=5)) / number * 1000
+        print(
+            f"{points:>12} {len(raw) / 1024:>8.1f} {current_ms:>11.3f} "
+            f"{raw_ms:>8.3f} {current_ms / raw_ms:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import pytest
+
+from app.features.search.geometry_codec import (
+    decode_geometry,
+    encode_geometry,
+    is_encoded,
+)
+
+pytestmark = pytest.mark.unit
+
+
+def line(*coordinates):
+    return {"type": "LineString", "coordinates": [list(c) for c in coordinates]}
+
+
+ROUTES = {
+    "rotterdam_hamburg": line((4.47, 51.92), (6.5, 52.8), (9.99, 53.55)),
+    "antimeridian": line((179.9, 10.0), (-179.9, 10.0), (179.5, -10.0)),
+    "north_pole": line((0.0, 89.9), (180.0, 90.0), (-180.0, 90.0), (90.0, 89.9)),
+    "south_pole": line((-180.0, -90.0), (180.0, -90.0), (0.0, -89.5)),
+}
+
+
+@pytest.mark.parametrize("precision", [0, 5, 6, 7])
+@pytest.mark.parametrize("compress", [True, False])
+@pytest.mark.parametrize("name", ROUTES)
+def test_round_trip(name, precision, compress):
+    geometry = ROUTES[name]
+    encoded = encode_geometry(geometry, precision=precision, compress=compress)
+    decoded = decode_geometry(encoded)
+
+    assert decoded["type"] == "LineString"
+    assert len(decoded["coordinates"]) == len(geometry["coordinates"])
+    for (lng, lat), (lng2, lat2) in zip(
+        geometry["coordinates"], decoded["coordinates"], strict=True
+    ):
+        assert lng2 == pytest.approx(lng, abs=0.5 / 10**precision)
+        assert lat2 == pytest.approx(lat, abs=0.5 / 10**precision)
+
+
+def test_antimeridian_at_precision_7_is_stored_plain():
+    geometry = line((179.9, 10.0), (-179.9, 10.0))
+
+    encoded = encode_geometry(geometry, precision=7)
+
+    assert not is_encoded(encoded)
+    assert encoded == geometry
+
+
+def test_antimeridian_at_precision_6_is_encoded():
+    assert is_encoded(encode_geometry(ROUTES["antimeridian"], precision=6))
+
+
+def test_precision_out_of_range():
+    with pytest.raises(ValueError):
+        encode_geometry(ROUTES["rotterdam_hamburg"], precision=8)